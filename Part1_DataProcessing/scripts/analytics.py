@@ -0,0 +1,239 @@
+"""Incremental, mergeable statistics over exporter event streams."""
+from __future__ import annotations
+
+import math
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from output_writer import read_csv_rows
+
+# (DayOfYear, MinuteOfDay, duration in minutes)
+Event = Tuple[int, int, float]
+
+DURATION_COLUMNS = ("Duration", "CallDuration")
+# Divisors turning a CSV duration into minutes.
+DURATION_UNITS = {"seconds": 60.0, "minutes": 1.0}
+# The YouTube exporter writes seconds; chat, calls, TikTok and Reels write minutes.
+SOURCE_DURATION_UNITS = {"youtube": "seconds"}
+
+
+def iter_csv_events(path: str | Path, duration_unit: str = "minutes") -> Iterator[Event]:
+    """Yield events from an exporter CSV (plain or compressed), with durations in minutes."""
+    if duration_unit not in DURATION_UNITS:
+        raise ValueError(f"Unknown duration_unit: {duration_unit}")
+    divisor = DURATION_UNITS[duration_unit]
+    for row in read_csv_rows(path):
+        column = next((name for name in DURATION_COLUMNS if name in row), None)
+        if column is None:
+            raise ValueError(f"{path} has no duration column")
+        yield int(row["DayOfYear"]), int(row["MinuteOfDay"]), float(row[column]) / divisor
+
+
+class HistogramSketch:
+    """Log-bucketed histogram giving quantiles within ``relative_accuracy``.
+
+    Two sketches with the same accuracy merge by adding bucket counts, so
+    per-shard sketches combine into the sketch of the whole stream.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01) -> None:
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._buckets: Dict[int, int] = defaultdict(int)
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value: float) -> None:
+        if value < 0:
+            raise ValueError("HistogramSketch only accepts non-negative values")
+        self.count += 1
+        if value == 0:
+            self.zero_count += 1
+        else:
+            self._buckets[math.ceil(math.log(value) / self._log_gamma)] += 1
+
+    def merge(self, other: "HistogramSketch") -> None:
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        for key, count in other._buckets.items():
+            self._buckets[key] += count
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def scale(self, factor: int) -> None:
+        """Multiply every count by ``factor``, as if each value had been seen ``factor`` times."""
+        for key in self._buckets:
+            self._buckets[key] *= factor
+        self.zero_count *= factor
+        self.count *= factor
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Return the approximate ``q``-quantile, or ``None`` for an empty sketch."""
+        if not 0 <= q <= 1:
+            raise ValueError("q must be between 0 and 1")
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self._buckets):
+            seen += self._buckets[key]
+            if rank < seen:
+                return 2 * self._gamma**key / (self._gamma + 1)
+        return 2 * self._gamma ** max(self._buckets) / (self._gamma + 1)  # pragma: no cover - rounding guard
+
+
+@dataclass
+class ActivityStats:
+    """Running sums for one source; every update costs O(new events)."""
+
+    event_count: int = 0
+    total_minutes: float = 0.0
+    daily_minutes: Dict[int, float] = field(default_factory=lambda: defaultdict(float))
+    hour_minutes: List[float] = field(default_factory=lambda: [0.0] * 24)
+    hour_events: List[int] = field(default_factory=lambda: [0] * 24)
+    durations: HistogramSketch = field(default_factory=HistogramSketch)
+    # Runs of consecutive active days, indexed from both ends so a new day joins them in O(1).
+    _run_end: Dict[int, int] = field(default_factory=dict, repr=False)
+    _run_start: Dict[int, int] = field(default_factory=dict, repr=False)
+
+    def add(self, day: int, minute_of_day: int, duration_minutes: float) -> None:
+        self.event_count += 1
+        self.total_minutes += duration_minutes
+        if day not in self.daily_minutes:
+            self._mark_active(day)
+        self.daily_minutes[day] += duration_minutes
+        hour = min(max(minute_of_day // 60, 0), 23)
+        self.hour_minutes[hour] += duration_minutes
+        self.hour_events[hour] += 1
+        self.durations.add(duration_minutes)
+
+    def update(self, events: Iterable[Event]) -> "ActivityStats":
+        for day, minute_of_day, duration_minutes in events:
+            self.add(day, minute_of_day, duration_minutes)
+        return self
+
+    def _mark_active(self, day: int) -> None:
+        start = self._run_start.pop(day - 1, day)
+        end = self._run_end.pop(day + 1, day)
+        self._run_end[start] = end
+        self._run_start[end] = start
+
+    def merge(self, other: "ActivityStats") -> "ActivityStats":
+        """Fold ``other`` into this accumulator, e.g. results from another shard."""
+        self.event_count += other.event_count
+        self.total_minutes += other.total_minutes
+        for day, minutes in other.daily_minutes.items():
+            if day not in self.daily_minutes:
+                self._mark_active(day)
+            self.daily_minutes[day] += minutes
+        for hour in range(24):
+            self.hour_minutes[hour] += other.hour_minutes[hour]
+            self.hour_events[hour] += other.hour_events[hour]
+        self.durations.merge(other.durations)
+        return self
+
+    def scale(self, factor: int) -> "ActivityStats":
+        """Weight every event ``factor`` times, e.g. to estimate totals from a 1-in-``factor`` sample.
+
+        All additive statistics are scaled so that the summary stays consistent;
+        active days and streaks are left as observed.
+        """
+        self.event_count *= factor
+        self.total_minutes *= factor
+        for day in self.daily_minutes:
+            self.daily_minutes[day] *= factor
+        self.hour_minutes = [minutes * factor for minutes in self.hour_minutes]
+        self.hour_events = [events * factor for events in self.hour_events]
+        self.durations.scale(factor)
+        return self
+
+    def rolling_average(self, window_days: int, end_day: Optional[int] = None) -> float:
+        """Average minutes per day over the ``window_days`` ending at ``end_day`` (inclusive)."""
+        if window_days <= 0:
+            raise ValueError("window_days must be positive")
+        if end_day is None:
+            if not self.daily_minutes:
+                return 0.0
+            end_day = max(self.daily_minutes)
+        total = sum(self.daily_minutes.get(day, 0.0) for day in range(end_day - window_days + 1, end_day + 1))
+        return total / window_days
+
+    def streaks(self) -> List[Tuple[int, int]]:
+        """Return the ``(first_day, last_day)`` runs of consecutive active days, in order."""
+        return sorted(self._run_end.items())
+
+    def longest_streak(self) -> int:
+        return max((end - start + 1 for start, end in self._run_end.items()), default=0)
+
+    def hour_distribution(self) -> List[float]:
+        """Share of total minutes that falls in each hour of the day."""
+        if self.total_minutes <= 0:
+            return [0.0] * 24
+        return [minutes / self.total_minutes for minutes in self.hour_minutes]
+
+    def summary(self, percentiles: Iterable[float] = (0.5, 0.9, 0.99)) -> Dict[str, object]:
+        return {
+            "events": self.event_count,
+            "total_minutes": round(self.total_minutes, 2),
+            "active_days": len(self.daily_minutes),
+            "rolling_7d_minutes": round(self.rolling_average(7), 2),
+            "rolling_30d_minutes": round(self.rolling_average(30), 2),
+            "longest_streak_days": self.longest_streak(),
+            "duration_percentiles": {f"p{round(q * 100)}": self.durations.quantile(q) for q in percentiles},
+        }
+
+
+class AnalyticsEngine:
+    """Per-source :class:`ActivityStats`, mergeable across sources and shards."""
+
+    def __init__(self) -> None:
+        self.sources: Dict[str, ActivityStats] = {}
+
+    def stats(self, source: str) -> ActivityStats:
+        return self.sources.setdefault(source, ActivityStats())
+
+    def ingest(self, source: str, events: Iterable[Event]) -> ActivityStats:
+        """Append new ``events`` for ``source``."""
+        return self.stats(source).update(events)
+
+    def ingest_csv(self, source: str, path: str | Path, duration_unit: Optional[str] = None) -> ActivityStats:
+        """Append the events of an exporter CSV.
+
+        ``duration_unit`` defaults to the unit the exporter for ``source`` writes
+        (see :data:`SOURCE_DURATION_UNITS`), otherwise minutes.
+        """
+        unit = duration_unit or SOURCE_DURATION_UNITS.get(source, "minutes")
+        return self.ingest(source, iter_csv_events(path, unit))
+
+    def merge(self, other: "AnalyticsEngine") -> "AnalyticsEngine":
+        for source, stats in other.sources.items():
+            self.stats(source).merge(stats)
+        return self
+
+    def combined(self) -> ActivityStats:
+        """Statistics over every source together."""
+        total = ActivityStats()
+        for stats in self.sources.values():
+            total.merge(stats)
+        return total
+
+    def report(self) -> Dict[str, Dict[str, object]]:
+        return {source: stats.summary() for source, stats in sorted(self.sources.items())}
+
+
+__all__ = [
+    "ActivityStats",
+    "AnalyticsEngine",
+    "DURATION_UNITS",
+    "Event",
+    "HistogramSketch",
+    "SOURCE_DURATION_UNITS",
+    "iter_csv_events",
+]
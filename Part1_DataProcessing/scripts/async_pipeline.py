@@ -0,0 +1,136 @@
+"""asyncio runner that overlaps YouTube lookups with the CPU-bound exporters."""
+from __future__ import annotations
+
+import asyncio
+import logging
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from process_yt_watchtime import (
+    YOUTUBE_BATCH_SIZE,
+    DurationCheckpoint,
+    VideoDurationFetcher,
+    fetch_video_durations,
+    process_yt_watchtime,
+)
+from tasks import file_exists, run_task, youtube_arguments
+from youtube_client import close_all
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENT_REQUESTS = 4
+
+
+async def fetch_video_durations_async(
+    video_ids: Sequence[str],
+    api_key: str,
+    fetcher: Optional[VideoDurationFetcher] = None,
+    max_concurrent_requests: int = DEFAULT_MAX_CONCURRENT_REQUESTS,
+    batch_size: int = YOUTUBE_BATCH_SIZE,
+    checkpoint: Optional[DurationCheckpoint] = None,
+) -> Dict[str, float]:
+    """Look up durations one API batch per task, with at most ``max_concurrent_requests`` in flight.
+
+    ``fetcher`` is a blocking :data:`VideoDurationFetcher`; each batch runs in a
+    worker thread so the event loop stays free while requests are outstanding.
+    With a ``checkpoint`` only the IDs it does not know yet are requested, and
+    every batch is recorded as soon as it completes.
+    """
+    if max_concurrent_requests <= 0:
+        raise ValueError("max_concurrent_requests must be positive")
+    duration_fetcher = fetcher or fetch_video_durations
+    store = checkpoint or DurationCheckpoint()
+    unique_ids = store.missing(video_ids)
+    limit = asyncio.Semaphore(max_concurrent_requests)
+
+    async def fetch_batch(batch: Sequence[str]) -> None:
+        async with limit:
+            store.record(batch, await asyncio.to_thread(duration_fetcher, batch, api_key))
+
+    # Let every batch finish (and be recorded) before surfacing the first failure.
+    results = await asyncio.gather(
+        *(fetch_batch(unique_ids[i : i + batch_size]) for i in range(0, len(unique_ids), batch_size)),
+        return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    durations, _ = store.resolve(video_ids)
+    return durations
+
+
+async def _run_youtube_async(
+    config: Dict[str, Any],
+    output_folder: Path,
+    fetcher: Optional[VideoDurationFetcher],
+    max_concurrent_requests: int,
+) -> int:
+    """Run :func:`process_yt_watchtime` in a thread, with its lookups running concurrently on the event loop."""
+    loop = asyncio.get_running_loop()
+
+    def lookup(video_ids: Sequence[str], api_key: str, checkpoint: DurationCheckpoint) -> None:
+        request = fetch_video_durations_async(
+            video_ids, api_key, fetcher, max_concurrent_requests, checkpoint=checkpoint
+        )
+        asyncio.run_coroutine_threadsafe(request, loop).result()
+
+    try:
+        if not file_exists(config["youtube_watch_time"]["input_file"]):
+            return 0
+        arguments = youtube_arguments(config, output_folder)
+        await asyncio.to_thread(process_yt_watchtime, **arguments, lookup=lookup)
+        LOGGER.info("YouTube data -> %s", arguments["output_csv"])
+    except KeyError:
+        LOGGER.info("Task 'youtube_watch_time' not configured; skipping")
+    except Exception:  # pragma: no cover - defensive
+        LOGGER.exception("Task 'youtube_watch_time' failed")
+        return 1
+    return 0
+
+
+async def _run_in_executor(executor: Executor, names: Sequence[str], config: Dict[str, Any], output_folder: Path) -> int:
+    """Run ``names`` one after another in ``executor`` (for tasks that depend on each other)."""
+    loop = asyncio.get_running_loop()
+    status_code = 0
+    for name in names:
+        status_code |= await loop.run_in_executor(executor, run_task, name, config, output_folder)
+    return status_code
+
+
+async def run_pipeline_async(
+    config: Dict[str, Any],
+    output_folder: Path,
+    fetcher: Optional[VideoDurationFetcher] = None,
+    max_concurrent_requests: int = DEFAULT_MAX_CONCURRENT_REQUESTS,
+    executor: Optional[Executor] = None,
+) -> int:
+    """Run every task concurrently and return the combined status code.
+
+    CPU-bound exporters run in ``executor`` (a process pool by default) while the
+    YouTube lookups proceed on the event loop. Chat processing still waits for the
+    combine step whose output it reads.
+    """
+    owns_executor = executor is None
+    pool = executor or ProcessPoolExecutor()
+    try:
+        chains: List[Sequence[str]] = [
+            ("clean_and_combine_json_files", "process_chat_data"),
+            ("export_tiktok_watch_time",),
+            ("export_reels_watch_time",),
+        ]
+        statuses = await asyncio.gather(
+            _run_youtube_async(config, output_folder, fetcher, max_concurrent_requests),
+            *(_run_in_executor(pool, chain, config, output_folder) for chain in chains),
+        )
+    finally:
+        close_all()
+        if owns_executor:
+            pool.shutdown()
+    status_code = 0
+    for status in statuses:
+        status_code |= status
+    return status_code
+
+
+__all__ = ["fetch_video_durations_async", "run_pipeline_async"]
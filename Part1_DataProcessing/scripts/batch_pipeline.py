@@ -0,0 +1,452 @@
+"""Run the pipeline for many accounts on one shared worker pool."""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, MutableMapping, Optional, Sequence, Set, Tuple
+
+from async_pipeline import DEFAULT_MAX_CONCURRENT_REQUESTS, fetch_video_durations_async
+from pipeline import ensure_output_folder, load_config, setup_logging
+from process_yt_watchtime import (
+    DurationCheckpoint,
+    VideoDurationFetcher,
+    prepare_watch_history,
+    resolve_api_key,
+    write_unresolved,
+    write_watch_time,
+)
+from tasks import TASKS, coalesce_gap_minutes, file_exists, run_task, youtube_paths
+from youtube_client import close_all
+
+LOGGER = logging.getLogger(__name__)
+
+YOUTUBE_TASK = "youtube_watch_time"
+# Tasks that can start straight away; chat processing waits for its account's combine step.
+INDEPENDENT_TASKS = ("clean_and_combine_json_files", "export_tiktok_watch_time", "export_reels_watch_time")
+DEPENDENT_TASKS = {"clean_and_combine_json_files": "process_chat_data"}
+# Task config keys naming files written below the account's output folder.
+OUTPUT_KEYS = ("output_file", "output_csv", "calls_csv", "participants_csv")
+
+
+@dataclass
+class AccountRun:
+    """Configuration and per-task results of one account in a batch."""
+
+    name: str
+    config_path: Path
+    config: Optional[Dict[str, Any]] = None
+    output_folder: Optional[Path] = None
+    error: Optional[str] = None
+    tasks: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    def record(self, task: str, status: int, seconds: float, error: Optional[str] = None) -> None:
+        result: Dict[str, Any] = {"status": "ok" if status == 0 else "failed", "seconds": round(seconds, 3)}
+        if error:
+            result["error"] = error
+        self.tasks[task] = result
+
+    @property
+    def status(self) -> str:
+        if self.error:
+            return "invalid"
+        return "failed" if any(task["status"] != "ok" for task in self.tasks.values()) else "ok"
+
+    def summary(self) -> Dict[str, Any]:
+        summary: Dict[str, Any] = {"config": str(self.config_path), "status": self.status, "tasks": self.tasks}
+        if self.error:
+            summary["error"] = self.error
+        return summary
+
+
+def discover_account_configs(source: str | Path) -> List[Tuple[str, Path]]:
+    """Return ``(account name, config path)`` pairs from a directory or manifest.
+
+    A directory contributes every ``*.json`` file in it, named after the file. A
+    manifest is a JSON list (or ``{"accounts": [...]}``) of config paths or
+    ``{"name": ..., "config": ...}`` objects; relative paths are resolved against
+    the manifest's folder.
+    """
+    source_path = Path(source)
+    if source_path.is_dir():
+        return [(path.stem, path) for path in sorted(source_path.glob("*.json"))]
+
+    manifest = json.loads(source_path.read_text(encoding="utf-8"))
+    entries = manifest.get("accounts", []) if isinstance(manifest, dict) else manifest
+    accounts: List[Tuple[str, Path]] = []
+    for entry in entries:
+        config_path = Path(entry["config"] if isinstance(entry, dict) else entry)
+        if not config_path.is_absolute():
+            config_path = source_path.parent / config_path
+        name = entry.get("name", config_path.stem) if isinstance(entry, dict) else config_path.stem
+        accounts.append((str(name), config_path))
+
+    names = [name for name, _ in accounts]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate account names in manifest: {', '.join(duplicates)}")
+    return accounts
+
+
+def load_accounts(source: str | Path) -> List[AccountRun]:
+    """Load every account config, recording (rather than raising) invalid ones."""
+    accounts: List[AccountRun] = []
+    for name, config_path in discover_account_configs(source):
+        account = AccountRun(name, config_path)
+        try:
+            account.config = load_config(config_path)
+            account.output_folder = ensure_output_folder(account.config["global"]["output_folder"])
+        except (OSError, ValueError) as exc:
+            LOGGER.error("Account '%s': invalid config %s (%s)", name, config_path, exc)
+            account.error = str(exc)
+        accounts.append(account)
+    return accounts
+
+
+def _output_paths(account: AccountRun) -> Set[Path]:
+    """Return the resolved paths of the files ``account``'s tasks write."""
+    assert account.config is not None and account.output_folder is not None
+    folder = account.output_folder
+    paths: Set[Path] = set()
+    for task in TASKS:
+        section = account.config.get(task)
+        if not isinstance(section, dict):
+            continue
+        paths.update(folder / section[key] for key in OUTPUT_KEYS if key in section)
+        if task == "process_chat_data" and "output_csv" in section and "participants_csv" not in section:
+            paths.add((folder / section["output_csv"]).with_name("participants.csv"))
+        if task == YOUTUBE_TASK:
+            paths.update(youtube_paths(section, folder))
+    return {path.resolve() for path in paths}
+
+
+def check_output_collisions(accounts: Sequence[AccountRun]) -> List[str]:
+    """Mark valid accounts that would write the same output file as invalid.
+
+    Every account sharing a path is rejected, since none of them can be told
+    apart as the intended owner; the other accounts are left to run. Returns
+    the names of the rejected accounts.
+    """
+    owners: Dict[Path, List[str]] = {}
+    for account in accounts:
+        if account.config is None or account.error:
+            continue
+        for path in sorted(_output_paths(account)):
+            owners.setdefault(path, []).append(account.name)
+    clashes: Dict[str, List[str]] = {}
+    for path, names in owners.items():
+        if len(names) > 1:
+            for name in names:
+                others = ", ".join(other for other in names if other != name)
+                clashes.setdefault(name, []).append(f"{path} (also written by {others})")
+    for account in accounts:
+        if account.name in clashes:
+            account.error = f"Output files collide with other accounts: {'; '.join(clashes[account.name])}"
+            LOGGER.error("Account '%s': %s", account.name, account.error)
+    return sorted(clashes)
+
+
+def _timed_task(name: str, config: Dict[str, Any], output_folder: Path) -> Tuple[int, float]:
+    started = time.perf_counter()
+    status = run_task(name, config, output_folder)
+    return status, time.perf_counter() - started
+
+
+def _youtube_settings(config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Return the YouTube task settings, or ``None`` when there is nothing to do."""
+    try:
+        global_config = config["global"]
+        ycfg = config[YOUTUBE_TASK]
+        output_csv, checkpoint_file, unresolved_file = youtube_paths(ycfg, Path(global_config["output_folder"]))
+        settings = {
+            "input_file": ycfg["input_file"],
+            "output_csv": output_csv,
+            "checkpoint_file": checkpoint_file,
+            "unresolved_file": unresolved_file,
+            "allow_partial": bool(ycfg.get("allow_partial", False)),
+            "playback_speed": float(ycfg["playback_speed"]),
+            "api_key_env": str(ycfg["api_key_env"]),
+            "start_date": global_config["start_date"],
+            "end_date": global_config["end_date"],
+            "timezone_name": global_config.get("timezone"),
+            "coalesce_gap_minutes": coalesce_gap_minutes(config),
+        }
+    except KeyError:
+        LOGGER.info("Task '%s' not configured; skipping", YOUTUBE_TASK)
+        return None
+    if settings["playback_speed"] <= 0:
+        raise ValueError("playback_speed must be positive")
+    return settings if file_exists(settings["input_file"]) else None
+
+
+def _prepare_youtube(settings: Mapping[str, Any]) -> Tuple[List[MutableMapping[str, object]], List[str]]:
+    return prepare_watch_history(
+        settings["input_file"], settings["start_date"], settings["end_date"], settings["timezone_name"]
+    )
+
+
+def _write_youtube(
+    settings: Mapping[str, Any],
+    filtered: Sequence[MutableMapping[str, object]],
+    durations: Mapping[str, float],
+    unresolved: Sequence[str],
+) -> int:
+    if settings["allow_partial"]:
+        write_unresolved(settings["unresolved_file"], unresolved)
+    return write_watch_time(
+        filtered,
+        durations,
+        settings["output_csv"],
+        settings["playback_speed"],
+        settings["start_date"],
+        settings["end_date"],
+        settings["timezone_name"],
+        settings["coalesce_gap_minutes"],
+    )
+
+
+class SharedCheckpoint(DurationCheckpoint):
+    """In-memory union of the duration checkpoints of the accounts sharing an API key.
+
+    Every batch looked up is also appended to each account's own checkpoint,
+    restricted to that account's video IDs, so accounts never see each other's
+    history and a single-account rerun resumes from its own file.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._accounts: List[Tuple[DurationCheckpoint, Set[str]]] = []
+
+    def add_account(self, checkpoint: DurationCheckpoint, video_ids: Sequence[str]) -> None:
+        self._accounts.append((checkpoint, set(video_ids)))
+        self.looked_up.update(checkpoint.looked_up)
+        self.durations.update(checkpoint.durations)
+
+    def share_known(self) -> None:
+        """Copy IDs already known from another account into each account's checkpoint."""
+        for checkpoint, wanted in self._accounts:
+            known = [video_id for video_id in wanted if video_id in self.looked_up]
+            self._record_into(checkpoint, known)
+
+    def _record_into(self, checkpoint: DurationCheckpoint, batch: Sequence[str]) -> None:
+        own = [video_id for video_id in batch if video_id not in checkpoint.looked_up]
+        if own:
+            checkpoint.record(own, {video_id: self.durations[video_id] for video_id in own if video_id in self.durations})
+
+    def record(self, batch: Sequence[str], durations: Mapping[str, float]) -> None:
+        super().record(batch, durations)
+        for checkpoint, wanted in self._accounts:
+            self._record_into(checkpoint, [video_id for video_id in batch if video_id in wanted])
+
+
+def _lookup_durations(
+    video_ids: Sequence[str],
+    api_key: str,
+    fetcher: Optional[VideoDurationFetcher],
+    max_concurrent_requests: int,
+    checkpoint: DurationCheckpoint,
+) -> Dict[str, float]:
+    return asyncio.run(
+        fetch_video_durations_async(video_ids, api_key, fetcher, max_concurrent_requests, checkpoint=checkpoint)
+    )
+
+
+def run_batch(
+    accounts: Sequence[AccountRun],
+    executor: Optional[Executor] = None,
+    fetcher: Optional[VideoDurationFetcher] = None,
+    max_concurrent_requests: int = DEFAULT_MAX_CONCURRENT_REQUESTS,
+) -> Dict[str, Any]:
+    """Run every task of every valid account and return the consolidated report.
+
+    All ``(account, task)`` pairs share ``executor`` (a process pool by default).
+    YouTube histories are parsed first, then the union of their video IDs is
+    looked up once per API key and the per-account CSVs are written from the shared
+    durations. Lookups go through each account's duration checkpoint (see
+    :class:`SharedCheckpoint`); when they fail, accounts with ``allow_partial``
+    still write their resolved videos. A failing task only marks its own account
+    as failed. Accounts whose outputs would overwrite each other are reported
+    as invalid and skipped (see :func:`check_output_collisions`).
+    """
+    check_output_collisions(accounts)
+    started = time.perf_counter()
+    owns_executor = executor is None
+    pool = executor or ProcessPoolExecutor()
+    lookup_pool = ThreadPoolExecutor(max_workers=1)
+    pending: Dict[Future, Tuple[str, Optional[AccountRun], Any]] = {}
+    task_started: Dict[Tuple[str, str], float] = {}
+    prepared: Dict[str, Tuple[AccountRun, Dict[str, Any], str, Sequence[Any], List[str]]] = {}
+    awaiting_prepare: Set[str] = set()
+    shared: Dict[str, SharedCheckpoint] = {}
+    youtube_stats = {"accounts": 0, "requested_ids": 0, "unique_ids": 0, "resolved_ids": 0}
+
+    def submit(kind: str, account: Optional[AccountRun], payload: Any, fn, *args) -> None:
+        if kind in ("prepare", "write"):
+            task_started.setdefault((account.name, YOUTUBE_TASK), time.perf_counter())
+        target = lookup_pool if kind == "lookup" else pool
+        pending[target.submit(fn, *args)] = (kind, account, payload)
+
+    def fail_youtube(account: AccountRun, exc: BaseException) -> None:
+        LOGGER.error("Account '%s': task '%s' failed: %s", account.name, YOUTUBE_TASK, exc)
+        seconds = time.perf_counter() - task_started.get((account.name, YOUTUBE_TASK), time.perf_counter())
+        account.record(YOUTUBE_TASK, 1, seconds, str(exc))
+
+    def start_lookups() -> None:
+        ids_by_key: Dict[str, List[str]] = {}
+        for other, settings, api_key, _, video_ids in list(prepared.values()):
+            youtube_stats["requested_ids"] += len(video_ids)
+            ids_by_key.setdefault(api_key, []).extend(video_ids)
+            try:
+                checkpoint = DurationCheckpoint(settings["checkpoint_file"])
+            except (OSError, ValueError) as exc:
+                fail_youtube(other, exc)
+                del prepared[other.name]
+                continue
+            shared.setdefault(api_key, SharedCheckpoint()).add_account(checkpoint, video_ids)
+        for api_key, video_ids in ids_by_key.items():
+            checkpoint = shared.setdefault(api_key, SharedCheckpoint())
+            checkpoint.share_known()
+            unique_ids = list(dict.fromkeys(video_ids))
+            youtube_stats["unique_ids"] += len(unique_ids)
+            submit(
+                "lookup",
+                None,
+                api_key,
+                _lookup_durations,
+                unique_ids,
+                api_key,
+                fetcher,
+                max_concurrent_requests,
+                checkpoint,
+            )
+
+    def write_accounts(api_key: str, error: Optional[BaseException] = None) -> None:
+        for other, settings, key, filtered, video_ids in list(prepared.values()):
+            if key != api_key:
+                continue
+            if error is not None and not settings["allow_partial"]:
+                fail_youtube(other, error)
+                del prepared[other.name]
+                continue
+            if error is not None:
+                LOGGER.warning("Account '%s': YouTube lookups failed (%s); writing partial output", other.name, error)
+            durations, unresolved = shared[api_key].resolve(video_ids)
+            youtube_stats["accounts"] += 1
+            submit("write", other, settings, _write_youtube, settings, filtered, durations, unresolved)
+
+    try:
+        for account in accounts:
+            if account.config is None or account.error:
+                continue
+            for name in INDEPENDENT_TASKS:
+                submit("task", account, name, _timed_task, name, account.config, account.output_folder)
+            try:
+                settings = _youtube_settings(account.config)
+                if settings is not None:
+                    api_key = resolve_api_key(settings["api_key_env"])
+                    awaiting_prepare.add(account.name)
+                    prepared[account.name] = (account, settings, api_key, [], [])
+                    submit("prepare", account, settings, _prepare_youtube, settings)
+            except (RuntimeError, ValueError) as exc:
+                fail_youtube(account, exc)
+
+        while pending:
+            done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            for future in done:
+                kind, account, payload = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as exc:  # pylint: disable=broad-except
+                    if kind == "task":
+                        LOGGER.error("Account '%s': task '%s' failed: %s", account.name, payload, exc)
+                        account.record(payload, 1, 0.0, str(exc))
+                    elif kind == "lookup":
+                        write_accounts(payload, exc)
+                    else:
+                        fail_youtube(account, exc)
+                        prepared.pop(account.name, None)
+                        if kind == "prepare":
+                            awaiting_prepare.discard(account.name)
+                            if not awaiting_prepare:
+                                start_lookups()
+                    continue
+
+                if kind == "task":
+                    status, seconds = result
+                    account.record(payload, status, seconds)
+                    follow_up = DEPENDENT_TASKS.get(payload)
+                    if follow_up is not None:
+                        submit("task", account, follow_up, _timed_task, follow_up, account.config, account.output_folder)
+                elif kind == "prepare":
+                    filtered, video_ids = result
+                    _, settings, api_key, _, _ = prepared[account.name]
+                    prepared[account.name] = (account, settings, api_key, filtered, video_ids)
+                    awaiting_prepare.discard(account.name)
+                    if not awaiting_prepare:
+                        start_lookups()
+                elif kind == "lookup":
+                    youtube_stats["resolved_ids"] += len(result)
+                    write_accounts(payload)
+                else:
+                    seconds = time.perf_counter() - task_started[(account.name, YOUTUBE_TASK)]
+                    account.record(YOUTUBE_TASK, 0, seconds)
+                    LOGGER.info("Account '%s': YouTube data (events=%s)", account.name, result)
+    finally:
+        lookup_pool.shutdown()
+        close_all()
+        if owns_executor:
+            pool.shutdown()
+
+    for account in accounts:
+        if account.config is not None:
+            account.tasks = {name: account.tasks[name] for name in TASKS if name in account.tasks}
+    return {
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+        "accounts": {account.name: account.summary() for account in accounts},
+        "failed_accounts": [account.name for account in accounts if account.status != "ok"],
+        "youtube": youtube_stats,
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Run a batch from the command line and write the JSON report."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("accounts", help="Directory of per-account configs or a JSON manifest listing them")
+    parser.add_argument("--report", default="batch_report.json", help="Where to write the consolidated run report")
+    parser.add_argument("--max-workers", type=int, default=None, help="Size of the shared process pool")
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    accounts = load_accounts(args.accounts)
+    if not accounts:
+        LOGGER.error("No account configs found in %s", args.accounts)
+        return 1
+    with ProcessPoolExecutor(max_workers=args.max_workers) as executor:
+        report = run_batch(accounts, executor=executor)
+
+    report_path = Path(args.report)
+    report_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    LOGGER.info(
+        "Processed %s account(s), %s failed -> %s", len(accounts), len(report["failed_accounts"]), report_path
+    )
+    return 1 if report["failed_accounts"] else 0
+
+
+__all__ = [
+    "AccountRun",
+    "SharedCheckpoint",
+    "check_output_collisions",
+    "discover_account_configs",
+    "load_accounts",
+    "main",
+    "run_batch",
+]
+
+
+if __name__ == "__main__":  # pragma: no cover - manual invocation
+    raise SystemExit(main())
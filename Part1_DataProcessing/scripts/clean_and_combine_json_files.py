@@ -2,15 +2,37 @@
 from __future__ import annotations
 
 import json
+import re
+import struct
+from collections import OrderedDict
+from contextlib import ExitStack
 from dataclasses import dataclass
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from itertools import compress
 from pathlib import Path
-from typing import Iterable, List, MutableMapping, Sequence
+from typing import Callable, Dict, Iterable, Iterator, List, MutableMapping, Optional, Sequence, Tuple
 
 import logging
 
+from dedup_index import DedupIndex, message_fingerprint
+from external_sort import external_sort, int_sort_key
+from json_stream import Buffer, iter_message_spans, object_member, open_mapped
+from local_time import build_converter, epoch_seconds
+
 logger = logging.getLogger(__name__)
 
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_DAY_SECONDS = 86400
+# file id, start offset, end offset of a spilled :class:`MessageRef`.
+_REF_STRUCT = struct.Struct("<IQQ")
+# Keys :func:`_parse_timestamp` reads, which are all the zero-copy scan extracts.
+_TIMESTAMP_KEYS = ("timestamp_ms", "timestamp")
+_INTEGER = re.compile(rb"-?[0-9]+")
+# Maps the timestamps of one file's messages to whether each lies in the requested window.
+_RangeFilter = Callable[[Sequence[datetime]], Sequence[bool]]
+# Payload keys holding attachments in Instagram message exports.
+MEDIA_FIELDS = ("photos", "videos", "audio_files", "gifs", "files", "share", "sticker")
+
 
 @dataclass
 class Message:
@@ -25,6 +47,49 @@ class Message:
         return self.timestamp.date()
 
 
+class MessageRef:
+    """Location of a message inside its source export, without the decoded payload."""
+
+    __slots__ = ("timestamp_us", "file_id", "start", "end")
+
+    def __init__(self, timestamp_us: int, file_id: int, start: int, end: int) -> None:
+        self.timestamp_us = timestamp_us
+        self.file_id = file_id
+        self.start = start
+        self.end = end
+
+
+class _MappedFiles:
+    """Keep a bounded number of source files memory-mapped while raw messages are copied."""
+
+    def __init__(self, paths: Sequence[Path], max_open: int = 64) -> None:
+        self._paths = paths
+        self._max_open = max_open
+        self._open: "OrderedDict[int, ExitStack]" = OrderedDict()
+        self._buffers: dict = {}
+
+    def get(self, file_id: int):
+        if file_id in self._open:
+            self._open.move_to_end(file_id)
+            return self._buffers[file_id]
+        if len(self._open) >= self._max_open:
+            evicted, stack = self._open.popitem(last=False)
+            del self._buffers[evicted]
+            stack.close()
+        stack = ExitStack()
+        self._buffers[file_id] = stack.enter_context(open_mapped(self._paths[file_id]))
+        self._open[file_id] = stack
+        return self._buffers[file_id]
+
+    def __enter__(self) -> "_MappedFiles":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._buffers.clear()
+        while self._open:
+            self._open.popitem()[1].close()
+
+
 def _discover_json_files(input_folder: Path) -> Sequence[Path]:
     """Return a sorted list of JSON files within ``input_folder``."""
     candidates = sorted(Path(input_folder).rglob("*.json"))
@@ -80,11 +145,187 @@ def _normalise_messages(raw_messages: Iterable[MutableMapping[str, object]]) ->
     return normalised
 
 
+def _iter_file_messages(candidates: Iterable[Path], in_range: _RangeFilter) -> Iterator[Message]:
+    """Yield the in-range messages of every readable file in ``candidates``, one file at a time."""
+    for file_path in candidates:
+        try:
+            raw_messages = _load_messages(file_path)
+        except ValueError as exc:
+            logger.warning("Skipping %s: %s", file_path, exc)
+            continue
+        messages = _normalise_messages(raw_messages)
+        yield from compress(messages, in_range([msg.timestamp for msg in messages]))
+
+
+def message_metrics(payload: MutableMapping[str, object]) -> Dict[str, object]:
+    """Return the ``char_count``, ``word_count`` and ``has_media`` of a message payload.
+
+    ``char_count`` is what the chat stage measures reading and writing time by;
+    calls keep their exported ``call_duration``.
+    """
+    content = str(payload.get("content", ""))
+    return {
+        "char_count": len(content),
+        "word_count": len(content.split()),
+        "has_media": any(field in payload for field in MEDIA_FIELDS),
+    }
+
+
+def _add_text_metrics(msg: Message, keep_content: bool) -> Message:
+    msg.payload.update(message_metrics(msg.payload))
+    if not keep_content:
+        msg.payload.pop("content", None)
+        for field in MEDIA_FIELDS:
+            msg.payload.pop(field, None)
+    return msg
+
+
+def _timestamp_micros(timestamp: datetime) -> int:
+    """Return microseconds since the epoch; naive values count as UTC."""
+    epoch = _EPOCH if timestamp.tzinfo is not None else _EPOCH.replace(tzinfo=None)
+    return (timestamp - epoch) // timedelta(microseconds=1)
+
+
+def _timestamp_sort_key(timestamp: datetime) -> bytes:
+    """Encode ``timestamp`` so that byte order matches chronological order."""
+    return int_sort_key(_timestamp_micros(timestamp))
+
+
+def _scan_refs(buffer: Buffer, file_id: int) -> Iterator[Tuple[datetime, MessageRef]]:
+    """Yield the timestamp and location of every message, decoding only its timestamp."""
+    for start, end in iter_message_spans(buffer):
+        if buffer[start : start + 1] != b"{":
+            continue
+        fields = {}
+        for key in _TIMESTAMP_KEYS:
+            span = object_member(buffer, start, end, key)
+            if span is not None:
+                raw = buffer[span[0] : span[1]]
+                fields[key] = int(raw) if _INTEGER.fullmatch(raw) else json.loads(raw)
+                break
+        try:
+            timestamp = _parse_timestamp(fields)
+        except ValueError as exc:
+            logger.debug("Skipping message without timestamp: %s", exc)
+            continue
+        yield timestamp, MessageRef(_timestamp_micros(timestamp), file_id, start, end)
+
+
+def _iter_message_refs(
+    candidates: Sequence[Path],
+    in_range: _RangeFilter,
+    index: Optional[DedupIndex] = None,
+) -> Iterator[MessageRef]:
+    """Yield the location of each kept message without decoding the message.
+
+    Only the timestamp is read from each message's bytes; a message is decoded
+    only to fingerprint it for ``index``, and only once it lies in range. A file
+    is scanned completely before its refs are yielded, so a file that fails to
+    parse part-way is skipped as a whole, as in the eager path.
+    """
+    for file_id, file_path in enumerate(candidates):
+        file_refs: List[MessageRef] = []
+        fingerprints: List[int] = []
+        try:
+            with open_mapped(file_path) as buffer:
+                scanned = list(_scan_refs(buffer, file_id))
+                mask = in_range([timestamp for timestamp, _ in scanned])
+                for (_, ref), keep in zip(scanned, mask):
+                    if not keep:
+                        continue
+                    file_refs.append(ref)
+                    if index is not None:
+                        fingerprints.append(message_fingerprint(json.loads(buffer[ref.start : ref.end])))
+        except ValueError as exc:
+            logger.warning("Skipping %s: %s", file_path, exc)
+            continue
+        if index is None:
+            yield from file_refs
+        else:
+            yield from (ref for ref, fingerprint in zip(file_refs, fingerprints) if index.add_fingerprint(fingerprint))
+
+
+def _iter_ref_payloads(candidates: Sequence[Path], in_range: _RangeFilter) -> Iterator[MutableMapping[str, object]]:
+    """Decode the in-range messages for the first deduplication pass of the zero-copy path."""
+    for file_id, file_path in enumerate(candidates):
+        try:
+            with open_mapped(file_path) as buffer:
+                scanned = list(_scan_refs(buffer, file_id))
+                mask = in_range([timestamp for timestamp, _ in scanned])
+                for (_, ref), keep in zip(scanned, mask):
+                    if keep:
+                        yield json.loads(buffer[ref.start : ref.end])
+        except ValueError as exc:
+            # The second pass reports and skips the file.
+            logger.debug("Skipping %s: %s", file_path, exc)
+
+
+def _sort_refs(refs: Iterable[MessageRef], memory_budget_bytes: Optional[int]) -> Iterable[MessageRef]:
+    """Order ``refs`` chronologically, spilling to disk beyond ``memory_budget_bytes``."""
+    if not memory_budget_bytes:
+        return sorted(refs, key=lambda ref: ref.timestamp_us)
+    records = ((int_sort_key(ref.timestamp_us), _REF_STRUCT.pack(ref.file_id, ref.start, ref.end)) for ref in refs)
+    return (
+        MessageRef(0, *_REF_STRUCT.unpack(payload)) for _, payload in external_sort(records, memory_budget_bytes)
+    )
+
+
+def _write_raw_messages(refs: Iterable[MessageRef], candidates: Sequence[Path], output_path: Path) -> int:
+    """Write a JSON array by copying each referenced message's bytes from its source file."""
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    count = 0
+    with _MappedFiles(candidates) as files, output_path.open("wb") as handle:
+        for ref in refs:
+            handle.write(b"[\n" if count == 0 else b",\n")
+            with memoryview(files.get(ref.file_id))[ref.start : ref.end] as raw:
+                handle.write(raw)
+            count += 1
+        handle.write(b"\n]" if count else b"[]")
+    return count
+
+
+def _external_sorted_payloads(
+    messages: Iterable[Message],
+    memory_budget_bytes: int,
+) -> Iterator[MutableMapping[str, object]]:
+    """Sort ``messages`` by timestamp within ``memory_budget_bytes``, spilling runs to disk."""
+    records = (
+        (
+            _timestamp_sort_key(msg.timestamp),
+            json.dumps(msg.payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+        )
+        for msg in messages
+    )
+    for _, payload in external_sort(records, memory_budget_bytes):
+        yield json.loads(payload)
+
+
+def _write_json_array(payloads: Iterable[MutableMapping[str, object]], output_path: Path) -> int:
+    """Stream ``payloads`` into ``output_path`` formatted like ``json.dump(..., indent=2)``."""
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    count = 0
+    with output_path.open("w", encoding="utf-8") as handle:
+        for payload in payloads:
+            handle.write("[\n" if count == 0 else ",\n")
+            encoded = json.dumps(payload, ensure_ascii=False, indent=2)
+            handle.write("\n".join("  " + line for line in encoded.split("\n")))
+            count += 1
+        handle.write("\n]" if count else "[]")
+    return count
+
+
 def clean_and_combine_json_files(
     input_folder: str | Path,
     output_file: str | Path,
     start_date: str,
     end_date: str,
+    deduplicate: bool = False,
+    bloom_filter_capacity: Optional[int] = None,
+    timezone_name: Optional[str] = None,
+    memory_budget_bytes: Optional[int] = None,
+    zero_copy: bool = False,
+    text_metrics: bool = False,
+    keep_content: bool = True,
 ) -> int:
     """Combine Instagram message archives into a single JSON file.
 
@@ -97,6 +338,31 @@ def clean_and_combine_json_files(
     start_date, end_date:
         Date boundaries in ``YYYY-MM-DD`` format. Messages on or after
         ``start_date`` and strictly before ``end_date`` are kept.
+    deduplicate:
+        Drop messages whose timestamp, sender and content/call fields match a
+        message already seen, e.g. from overlapping exports or re-downloads.
+    bloom_filter_capacity:
+        Expected number of messages; when given, the inputs are scanned twice
+        and Bloom filters of that size keep all but the repeated messages out
+        of the exact deduplication index (see :class:`DedupIndex`), bounding
+        its memory for very large archives.
+    timezone_name:
+        Apply the date boundaries to local days in this timezone instead of UTC.
+    memory_budget_bytes:
+        Approximate memory allowed for sorting. Messages beyond it are spilled
+        to disk in sorted runs and merged while the output is written.
+    zero_copy:
+        Keep only a :class:`MessageRef` per message and copy each message's
+        original bytes into the output instead of re-encoding the payload.
+        Only the timestamp is read from each message; whole messages are
+        decoded just for ``deduplicate``. The output holds the same JSON values
+        in the source formatting.
+    text_metrics:
+        Add the :func:`message_metrics` columns to every message, so that the
+        chat stage does not need to measure the text again.
+    keep_content:
+        With ``text_metrics``, ``False`` drops the message text and attachment
+        lists and writes only the metrics.
 
     Returns
     -------
@@ -104,28 +370,50 @@ def clean_and_combine_json_files(
         The number of messages written to ``output_file``.
     """
 
+    if not keep_content and not text_metrics:
+        raise ValueError("keep_content=False requires text_metrics")
+    if zero_copy and text_metrics:
+        raise ValueError("text_metrics rewrites messages and cannot be combined with zero_copy")
     start = datetime.strptime(start_date, "%Y-%m-%d").date()
     end = datetime.strptime(end_date, "%Y-%m-%d").date()
+    converter = build_converter(timezone_name, start_date, end_date)
+
+    start_day, end_day = (start - _EPOCH.date()).days, (end - _EPOCH.date()).days
+
+    def in_range(timestamps: Sequence[datetime]) -> Sequence[bool]:
+        if converter is None:
+            return [start <= timestamp.date() < end for timestamp in timestamps]
+        # Local day numbers of the whole batch from one vectorised offset lookup.
+        days = converter.local_epochs(epoch_seconds(timestamp) for timestamp in timestamps) // _DAY_SECONDS
+        return ((days >= start_day) & (days < end_day)).tolist()
 
     candidates = _discover_json_files(Path(input_folder))
-    combined: List[Message] = []
-    for file_path in candidates:
-        try:
-            raw_messages = _load_messages(file_path)
-        except ValueError as exc:
-            logger.warning("Skipping %s: %s", file_path, exc)
-            continue
-        combined.extend(_normalise_messages(raw_messages))
+    index = DedupIndex(bloom_capacity=bloom_filter_capacity) if deduplicate else None
 
-    filtered = [msg for msg in combined if start <= msg.day < end]
-    filtered.sort(key=lambda msg: msg.timestamp)
 
-    output_path = Path(output_file)
-    output_path.parent.mkdir(parents=True, exist_ok=True)
+    if index is not None and index.needs_prepass:
+        if zero_copy:
+            index.observe_all(_iter_ref_payloads(candidates, in_range))
+        else:
+            index.observe_all(msg.payload for msg in _iter_file_messages(candidates, in_range))
 
-    serialisable = [msg.payload for msg in filtered]
-    with output_path.open("w", encoding="utf-8") as handle:
-        json.dump(serialisable, handle, ensure_ascii=False, indent=2)
+    output_path = Path(output_file)
+    if zero_copy:
+        refs = _iter_message_refs(candidates, in_range, index)
+        count = _write_raw_messages(_sort_refs(refs, memory_budget_bytes), candidates, output_path)
+    else:
+        messages = _iter_file_messages(candidates, in_range)
+        if index is not None:
+            messages = (msg for msg in messages if index.add(msg.payload))
+        if text_metrics:
+            messages = (_add_text_metrics(msg, keep_content) for msg in messages)
+        if memory_budget_bytes:
+            payloads = _external_sorted_payloads(messages, memory_budget_bytes)
+        else:
+            payloads = (msg.payload for msg in sorted(messages, key=lambda msg: msg.timestamp))
+        count = _write_json_array(payloads, output_path)
+    if index is not None:
+        logger.info("Dropped %s duplicate messages (%s exact lookups)", index.duplicates, index.probes)
 
-    logger.info("Wrote %s messages to %s", len(serialisable), output_path)
-    return len(serialisable)
+    logger.info("Wrote %s messages to %s", count, output_path)
+    return count
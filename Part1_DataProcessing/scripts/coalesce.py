@@ -0,0 +1,145 @@
+"""Merge small adjacent exporter events without changing per-bin totals."""
+from __future__ import annotations
+
+import math
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Protocol, Sequence, Tuple
+
+from output_writer import CsvOutputWriter
+
+# Width of the time bins the visualisation aggregates events into.
+BIN_MINUTES = 5
+SESSION_GAP_SECONDS = 60
+# Digits kept when summing durations; drops float noise without shifting totals.
+_DURATION_DIGITS = 10
+
+
+class RowSink(Protocol):
+    def writerow(self, row: Mapping[str, Any]) -> None: ...
+
+
+def group_sessions(
+    timestamps: Iterable[datetime],
+    default_video_duration_seconds: int,
+    session_gap_seconds: float = SESSION_GAP_SECONDS,
+) -> List[Dict[str, Any]]:
+    """Group timestamps at most ``session_gap_seconds`` apart into viewing sessions.
+
+    Each timestamp counts as one video of ``default_video_duration_seconds``; a
+    session starts at its first timestamp and lasts for the sum of its videos.
+    """
+    sessions: List[Dict[str, Any]] = []
+    sorted_times = sorted(timestamps)
+    if not sorted_times:
+        return sessions
+
+    session_start = sorted_times[0]
+    duration_seconds = default_video_duration_seconds
+
+    for previous, current in zip(sorted_times, sorted_times[1:]):
+        gap = (current - previous).total_seconds()
+        if gap <= session_gap_seconds:
+            duration_seconds += default_video_duration_seconds
+        else:
+            sessions.append(
+                {
+                    "start": session_start,
+                    "duration_minutes": duration_seconds / 60,
+                }
+            )
+            session_start = current
+            duration_seconds = default_video_duration_seconds
+
+    sessions.append({"start": session_start, "duration_minutes": duration_seconds / 60})
+    return sessions
+
+
+class EventCoalescer:
+    """Merge consecutive rows of one exporter into fewer, longer events.
+
+    A row joins the open event when it falls in the same ``DayOfYear`` and
+    ``bin_minutes`` bin, starts at most ``gap_minutes`` after the previous row and
+    agrees on every column other than the time and duration. The merged event
+    keeps the first row's start and the summed duration, so the total time of each
+    bin is unchanged. Rows are expected in chronological order; out-of-order rows
+    simply merge less. With ``gap_minutes=None`` rows pass through untouched.
+    """
+
+    def __init__(
+        self,
+        sink: RowSink,
+        gap_minutes: Optional[float],
+        duration_field: str = "Duration",
+        bin_minutes: int = BIN_MINUTES,
+    ) -> None:
+        if gap_minutes is not None and gap_minutes < 0:
+            raise ValueError("gap_minutes must not be negative")
+        if bin_minutes <= 0:
+            raise ValueError("bin_minutes must be positive")
+        self.sink = sink
+        self.gap_minutes = gap_minutes
+        self.duration_field = duration_field
+        self.bin_minutes = bin_minutes
+        self.rows_in = 0
+        self.rows_out = 0
+        self._open: Optional[Dict[str, Any]] = None
+        self._open_key: Optional[Tuple[Any, ...]] = None
+        self._durations: List[float] = []
+        self._last_minute = 0
+
+    def _key(self, row: Mapping[str, Any]) -> Tuple[Any, ...]:
+        extra = tuple(sorted((k, v) for k, v in row.items() if k not in ("MinuteOfDay", self.duration_field)))
+        return (int(row["MinuteOfDay"]) // self.bin_minutes,) + extra
+
+    def writerow(self, row: Mapping[str, Any]) -> None:
+        self.rows_in += 1
+        if self.gap_minutes is None:
+            self.sink.writerow(row)
+            self.rows_out += 1
+            return
+        minute = int(row["MinuteOfDay"])
+        key = self._key(row)
+        if self._open is not None and key == self._open_key and minute - self._last_minute <= self.gap_minutes:
+            self._durations.append(float(row[self.duration_field]))
+            self._last_minute = minute
+            return
+        self.flush()
+        self._open = dict(row)
+        self._open_key = key
+        self._durations = [float(row[self.duration_field])]
+        self._last_minute = minute
+
+    def writerows(self, rows: Iterable[Mapping[str, Any]]) -> None:
+        for row in rows:
+            self.writerow(row)
+
+    def flush(self) -> None:
+        """Emit the open event, if any."""
+        if self._open is None:
+            return
+        if len(self._durations) > 1:
+            self._open[self.duration_field] = round(math.fsum(self._durations), _DURATION_DIGITS)
+        self.sink.writerow(self._open)
+        self.rows_out += 1
+        self._open = None
+        self._open_key = None
+        self._durations = []
+
+
+def write_events(
+    path: str | Path,
+    fieldnames: Sequence[str],
+    rows: Iterable[Mapping[str, Any]],
+    gap_minutes: Optional[float] = None,
+    duration_field: str = "Duration",
+) -> int:
+    """Write ``rows`` to ``path`` through an :class:`EventCoalescer`; return the rows written."""
+    with CsvOutputWriter(path, fieldnames) as writer:
+        coalescer = EventCoalescer(writer, gap_minutes, duration_field)
+        coalescer.writerows(rows)
+        coalescer.flush()
+    return coalescer.rows_out
+
+
+__all__ = ["BIN_MINUTES", "EventCoalescer", "group_sessions", "write_events"]
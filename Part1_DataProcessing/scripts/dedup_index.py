@@ -0,0 +1,168 @@
+"""Compact hash-based index used to drop duplicate messages across exports."""
+from __future__ import annotations
+
+import hashlib
+import math
+from array import array
+from typing import Iterable, Mapping, Optional
+
+# Fields that identify a message; overlapping exports repeat them byte-for-byte.
+FINGERPRINT_FIELDS = ("timestamp_ms", "timestamp", "sender_name", "content", "call_duration")
+
+_EMPTY = 0
+_MAX_LOAD_FACTOR = 0.5
+
+
+def message_fingerprint(message: Mapping[str, object]) -> int:
+    """Return a 64-bit fingerprint of the identifying fields of ``message``."""
+    digest = hashlib.blake2b(digest_size=8)
+    for field in FINGERPRINT_FIELDS:
+        value = message.get(field)
+        digest.update(b"\x00" if value is None else b"\x01" + str(value).encode("utf-8"))
+        digest.update(b"\x1f")
+    # Zero marks an empty slot in :class:`FingerprintSet`.
+    return int.from_bytes(digest.digest(), "little") or 1
+
+
+class FingerprintSet:
+    """Open-addressing set of 64-bit fingerprints stored in a flat ``array``.
+
+    Each slot costs eight bytes instead of a Python object per entry. The table
+    doubles once it is half full, so it grows with the number of items, at 16 to
+    32 bytes each.
+    """
+
+    def __init__(self, expected_items: int = 1024) -> None:
+        capacity = 1 << max(4, math.ceil(math.log2(max(expected_items, 1) / _MAX_LOAD_FACTOR)))
+        self._slots = array("Q", bytes(8 * capacity))
+        self._mask = capacity - 1
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def capacity(self) -> int:
+        return self._mask + 1
+
+    def add(self, fingerprint: int) -> bool:
+        """Insert ``fingerprint``; return ``False`` if it was already present."""
+        slots, mask = self._slots, self._mask
+        index = fingerprint & mask
+        while True:
+            current = slots[index]
+            if current == _EMPTY:
+                break
+            if current == fingerprint:
+                return False
+            index = (index + 1) & mask
+        slots[index] = fingerprint
+        self._size += 1
+        if self._size > self.capacity * _MAX_LOAD_FACTOR:
+            self._grow()
+        return True
+
+    def _grow(self) -> None:
+        old_slots = self._slots
+        self._slots = array("Q", bytes(16 * len(old_slots)))
+        self._mask = len(self._slots) - 1
+        self._size = 0
+        for fingerprint in old_slots:
+            if fingerprint != _EMPTY:
+                self.add(fingerprint)
+
+
+class BloomFilter:
+    """Bit-array Bloom filter keyed by 64-bit fingerprints."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01) -> None:
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1")
+        bits = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        self.num_bits = max(bits, 8)
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, fingerprint: int):
+        # Double hashing: derive every probe from the two halves of the fingerprint.
+        low, high = fingerprint & 0xFFFFFFFF, (fingerprint >> 32) | 1
+        for i in range(self.num_hashes):
+            yield (low + i * high) % self.num_bits
+
+    def add(self, fingerprint: int) -> None:
+        for position in self._positions(fingerprint):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, fingerprint: int) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(fingerprint))
+
+
+class DedupIndex:
+    """Track message fingerprints and count the duplicates that were rejected.
+
+    Without ``bloom_capacity`` every fingerprint goes into an exact
+    :class:`FingerprintSet`. With it the messages are scanned twice: a first pass
+    through :meth:`observe_all` records every fingerprint in a :class:`BloomFilter`
+    and the ones seen again in a second filter of possible repeats. In the second
+    pass, :meth:`add` keeps a message missing from the repeats filter without
+    touching the exact set, which therefore only holds the repeated messages and
+    the filters' false positives. Memory is then fixed by ``bloom_capacity`` plus
+    the duplicates rather than growing with every message. ``probes`` counts the
+    messages that reached the exact set.
+    """
+
+    def __init__(self, expected_items: int = 1024, bloom_capacity: Optional[int] = None) -> None:
+        self._seen = FingerprintSet(expected_items if not bloom_capacity else 16)
+        self._bloom = BloomFilter(bloom_capacity) if bloom_capacity else None
+        self._repeats = BloomFilter(bloom_capacity) if bloom_capacity else None
+        self._observed = False
+        self.duplicates = 0
+        self.probes = 0
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    @property
+    def needs_prepass(self) -> bool:
+        """Whether :meth:`observe_all` must see the messages before :meth:`add`."""
+        return self._bloom is not None
+
+    def observe_all(self, messages: Iterable[Mapping[str, object]]) -> None:
+        """First pass: note which fingerprints may occur more than once."""
+        if self._bloom is None or self._repeats is None:
+            raise RuntimeError("observe_all requires a bloom_capacity")
+        for message in messages:
+            fingerprint = message_fingerprint(message)
+            if fingerprint in self._bloom:
+                self._repeats.add(fingerprint)
+            else:
+                self._bloom.add(fingerprint)
+        self._observed = True
+
+    def add(self, message: Mapping[str, object]) -> bool:
+        """Record ``message``; return ``False`` if an identical one was already seen."""
+        return self.add_fingerprint(message_fingerprint(message))
+
+    def add_fingerprint(self, fingerprint: int) -> bool:
+        """Like :meth:`add`, for a fingerprint computed with :func:`message_fingerprint`."""
+        if self._repeats is not None:
+            if not self._observed:
+                raise RuntimeError("observe_all must run before add when a Bloom filter is used")
+            if fingerprint not in self._repeats:
+                return True
+        self.probes += 1
+        if self._seen.add(fingerprint):
+            return True
+        self.duplicates += 1
+        return False
+
+
+__all__ = [
+    "BloomFilter",
+    "DedupIndex",
+    "FINGERPRINT_FIELDS",
+    "FingerprintSet",
+    "message_fingerprint",
+]
@@ -0,0 +1,84 @@
+"""Sort streams larger than memory by spilling sorted runs to disk and merging them."""
+from __future__ import annotations
+
+import heapq
+import logging
+import struct
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, List, Tuple
+
+LOGGER = logging.getLogger(__name__)
+
+# A record is a (sort key, payload) pair; keys compare bytewise.
+Record = Tuple[bytes, bytes]
+
+_HEADER = struct.Struct("<II")
+# Rough per-record bookkeeping cost of the in-memory buffer (tuple + two bytes objects).
+_RECORD_OVERHEAD = 120
+_READ_BUFFER = 1 << 16
+
+
+def int_sort_key(value: int) -> bytes:
+    """Encode a signed 64-bit integer so that byte order matches numeric order."""
+    return struct.pack(">Q", value + (1 << 63))
+
+
+def _write_run(records: List[Record], directory: Path, index: int) -> Path:
+    path = directory / f"run-{index:05d}.bin"
+    with path.open("wb") as handle:
+        for key, payload in records:
+            handle.write(_HEADER.pack(len(key), len(payload)))
+            handle.write(key)
+            handle.write(payload)
+    return path
+
+
+def _read_run(handle: BinaryIO) -> Iterator[Record]:
+    while True:
+        header = handle.read(_HEADER.size)
+        if not header:
+            return
+        key_length, payload_length = _HEADER.unpack(header)
+        yield handle.read(key_length), handle.read(payload_length)
+
+
+def external_sort(records: Iterable[Record], memory_budget_bytes: int) -> Iterator[Record]:
+    """Yield ``records`` sorted by key, keeping roughly ``memory_budget_bytes`` in memory.
+
+    Records are buffered until the budget is reached, then the buffer is sorted and
+    written to a temporary run file. The runs are finally k-way merged as a stream.
+    The sort is stable: records with equal keys keep their input order.
+    """
+    if memory_budget_bytes <= 0:
+        raise ValueError("memory_budget_bytes must be positive")
+
+    buffer: List[Record] = []
+    buffered_bytes = 0
+    with tempfile.TemporaryDirectory(prefix="external-sort-") as temp_dir:
+        runs: List[Path] = []
+        for key, payload in records:
+            buffer.append((key, payload))
+            buffered_bytes += len(key) + len(payload) + _RECORD_OVERHEAD
+            if buffered_bytes >= memory_budget_bytes:
+                buffer.sort(key=lambda record: record[0])
+                runs.append(_write_run(buffer, Path(temp_dir), len(runs)))
+                buffer, buffered_bytes = [], 0
+
+        buffer.sort(key=lambda record: record[0])
+        if not runs:
+            yield from buffer
+            return
+
+        runs.append(_write_run(buffer, Path(temp_dir), len(runs)))
+        buffer = []
+        LOGGER.info("Merging %s sorted runs spilled to disk", len(runs))
+        handles = [path.open("rb", buffering=_READ_BUFFER) for path in runs]
+        try:
+            yield from heapq.merge(*(_read_run(handle) for handle in handles), key=lambda record: record[0])
+        finally:
+            for handle in handles:
+                handle.close()
+
+
+__all__ = ["Record", "external_sort", "int_sort_key"]
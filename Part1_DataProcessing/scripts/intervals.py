@@ -0,0 +1,195 @@
+"""Union and overlap of activity intervals across sources via a sweep line."""
+from __future__ import annotations
+
+import json
+import logging
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from analytics import SOURCE_DURATION_UNITS, iter_csv_events
+from output_writer import CsvOutputWriter
+
+LOGGER = logging.getLogger(__name__)
+
+MINUTES_PER_DAY = 1440
+BIN_MINUTES = 5
+
+
+@dataclass(frozen=True)
+class IntervalSource:
+    """An exporter CSV whose rows become ``[start, start + duration)`` intervals.
+
+    ``duration_unit`` defaults to the unit the exporter for ``key`` writes (see
+    :data:`analytics.SOURCE_DURATION_UNITS`), otherwise minutes.
+    """
+
+    key: str
+    csv_path: str
+    duration_unit: Optional[str] = None
+
+
+def load_intervals(source: IntervalSource) -> Tuple[np.ndarray, np.ndarray]:
+    """Return ``(starts, ends)`` in minutes since the start of day 1."""
+    unit = source.duration_unit or SOURCE_DURATION_UNITS.get(source.key, "minutes")
+    events = np.array(list(iter_csv_events(source.csv_path, unit)), dtype=np.float64).reshape(-1, 3)
+    starts = (events[:, 0] - 1) * MINUTES_PER_DAY + events[:, 1]
+    ends = starts + np.maximum(events[:, 2], 0)
+    return starts, ends
+
+
+class IntervalSummary:
+    """Cumulative union, per-source and exclusive time along the sweep.
+
+    Each measure is stored as its running integral at every interval boundary.
+    Between boundaries the set of active sources is constant, so the integrals are
+    linear there and the time inside any window is an exact interpolation.
+    """
+
+    def __init__(self, sources: Sequence[str], times: np.ndarray, cumulative: Dict[str, np.ndarray]) -> None:
+        self.sources = list(sources)
+        self.times = times
+        self.cumulative = cumulative
+
+    @property
+    def columns(self) -> List[str]:
+        columns = ["Union"]
+        for key in self.sources:
+            columns += [key, f"{key}_exclusive", f"{key}_overlap"]
+        return columns
+
+    def totals(self) -> Dict[str, float]:
+        """Minutes of each measure over the whole range."""
+        if not len(self.times):
+            return {column: 0.0 for column in self.columns}
+        return {column: float(self._cumulative_column(column)[-1]) for column in self.columns}
+
+    def _cumulative_column(self, column: str) -> np.ndarray:
+        if column.endswith("_overlap"):
+            key = column[: -len("_overlap")]
+            return self.cumulative[key] - self.cumulative[f"{key}_exclusive"]
+        return self.cumulative[column]
+
+    def windows(self, width_minutes: int) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """Return window start times and the minutes of every column in each window."""
+        if not len(self.times):
+            return np.zeros(0), {column: np.zeros(0) for column in self.columns}
+        first = np.floor(self.times[0] / width_minutes) * width_minutes
+        last = np.ceil(self.times[-1] / width_minutes) * width_minutes
+        edges = np.arange(first, max(last, first + width_minutes) + width_minutes / 2, width_minutes)
+        values = {}
+        for column in self.columns:
+            cumulative = np.interp(edges, self.times, self._cumulative_column(column))
+            values[column] = np.diff(cumulative)
+        return edges[:-1], values
+
+
+def sweep(intervals: Mapping[str, Tuple[np.ndarray, np.ndarray]]) -> IntervalSummary:
+    """Sweep every source's intervals at once in ``O(n log n)``.
+
+    Boundaries of all sources are sorted together; a running count per source
+    tells which sources are active on each elementary segment, from which the
+    union (any source active) and each source's exclusive time (only that source
+    active) follow. Overlapping intervals of the same source are counted once.
+    """
+    keys = list(intervals)
+    boundary_times = []
+    boundary_source = []
+    boundary_delta = []
+    for index, key in enumerate(keys):
+        starts, ends = (np.asarray(values, dtype=np.float64) for values in intervals[key])
+        keep = ends > starts
+        starts, ends = starts[keep], ends[keep]
+        boundary_times += [starts, ends]
+        boundary_source += [np.full(len(starts) * 2, index, dtype=np.int64)]
+        boundary_delta += [np.ones(len(starts), dtype=np.int64), -np.ones(len(ends), dtype=np.int64)]
+
+    times = np.concatenate(boundary_times) if boundary_times else np.zeros(0)
+    if not len(times):
+        return IntervalSummary(keys, times, {})
+    source = np.concatenate(boundary_source)
+    delta = np.concatenate(boundary_delta)
+    order = np.argsort(times, kind="stable")
+    times, source, delta = times[order], source[order], delta[order]
+
+    segment = np.diff(times)
+    active = np.zeros((len(keys), len(times)), dtype=bool)
+    for index in range(len(keys)):
+        counts = np.cumsum(np.where(source == index, delta, 0))
+        active[index] = counts > 0
+    # State after each boundary applies to the segment that follows it.
+    active = active[:, :-1]
+    active_sources = active.sum(axis=0)
+
+    def integrate(mask: np.ndarray) -> np.ndarray:
+        return np.concatenate(([0.0], np.cumsum(np.where(mask, segment, 0.0))))
+
+    cumulative = {"Union": integrate(active_sources > 0)}
+    for index, key in enumerate(keys):
+        cumulative[key] = integrate(active[index])
+        cumulative[f"{key}_exclusive"] = integrate(active[index] & (active_sources == 1))
+    return IntervalSummary(keys, times, cumulative)
+
+
+def write_interval_outputs(summary: IntervalSummary, bins_csv: str | Path, days_csv: str | Path) -> Tuple[int, int]:
+    """Write per-5-minute-bin and per-day CSVs, skipping windows without activity."""
+    written = []
+    for path, width in ((bins_csv, BIN_MINUTES), (days_csv, MINUTES_PER_DAY)):
+        starts, values = summary.windows(width)
+        time_columns = ["DayOfYear", "MinuteOfDay"] if width < MINUTES_PER_DAY else ["DayOfYear"]
+        active = np.flatnonzero(values["Union"] > 1e-9)
+        with CsvOutputWriter(path, time_columns + summary.columns) as writer:
+            for index in active:
+                start = int(round(starts[index]))
+                row: Dict[str, Any] = {"DayOfYear": start // MINUTES_PER_DAY + 1}
+                if width < MINUTES_PER_DAY:
+                    row["MinuteOfDay"] = start % MINUTES_PER_DAY
+                for column in summary.columns:
+                    row[column] = round(float(values[column][index]), 4)
+                writer.writerow(row)
+        written.append(len(active))
+    return written[0], written[1]
+
+
+def build_sources(interval_config: Dict[str, Any]) -> List[IntervalSource]:
+    """Read the ``sources`` of an ``intervals`` config section."""
+    return [
+        IntervalSource(key=item["key"], csv_path=item["csv"], duration_unit=item.get("duration_unit"))
+        for item in interval_config["sources"]
+    ]
+
+
+def main(config_path: str = "config.json") -> int:
+    """Compute the union of the sources listed in the ``intervals`` config section."""
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    config = json.loads(Path(config_path).read_text(encoding="utf-8"))
+    interval_config = config["intervals"]
+    sources = build_sources(interval_config)
+    summary = sweep({source.key: load_intervals(source) for source in sources})
+
+    output_folder = Path(interval_config.get("output_folder", "output"))
+    bins_csv = output_folder / interval_config.get("bins_csv", "union_bins.csv")
+    days_csv = output_folder / interval_config.get("days_csv", "union_days.csv")
+    write_interval_outputs(summary, bins_csv, days_csv)
+
+    totals = summary.totals()
+    summed = sum(totals[source.key] for source in sources)
+    LOGGER.info("Union %.1f minutes (summed per source: %.1f) -> %s, %s", totals["Union"], summed, bins_csv, days_csv)
+    return 0
+
+
+__all__ = [
+    "IntervalSource",
+    "IntervalSummary",
+    "build_sources",
+    "load_intervals",
+    "sweep",
+    "write_interval_outputs",
+]
+
+
+if __name__ == "__main__":  # pragma: no cover - manual invocation
+    raise SystemExit(main(*sys.argv[1:2]))
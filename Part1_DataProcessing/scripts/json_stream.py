@@ -0,0 +1,175 @@
+"""Locate the messages of a JSON export without decoding the whole document."""
+from __future__ import annotations
+
+import json
+import mmap
+import re
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterator, MutableMapping, Optional, Pattern, Tuple, Union
+
+Buffer = Union[bytes, mmap.mmap]
+
+_WHITESPACE = re.compile(rb"[ \t\r\n]*")
+# Separators, strings and scalars up to the next bracket, matched by the regex engine rather than
+# byte by byte; anything else (such as a bare word) stops the match and is reported as malformed.
+_PLAIN = re.compile(
+    rb'(?:[\s,:]+|"[^"\\]*(?:\\.[^"\\]*)*"|-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?|true|false|null)*'
+)
+_STRING_TAIL = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_SCALAR = re.compile(rb"[^,\]}\s]+")
+_BOM = b"\xef\xbb\xbf"
+
+
+def _skip_whitespace(buffer: Buffer, pos: int) -> int:
+    return _WHITESPACE.match(buffer, pos).end()  # type: ignore[union-attr]
+
+
+def _skip_string(buffer: Buffer, pos: int) -> int:
+    """Return the offset just past the string whose opening quote is at ``pos``."""
+    match = _STRING_TAIL.match(buffer, pos + 1)
+    if match is None:
+        raise ValueError(f"Unterminated string at byte {pos}")
+    return match.end()
+
+
+def _skip_value(buffer: Buffer, pos: int) -> int:
+    """Return the offset just past the JSON value starting at ``pos``."""
+    opening = buffer[pos : pos + 1]
+    if opening == b'"':
+        return _skip_string(buffer, pos)
+    if opening in (b"{", b"["):
+        depth, cursor = 1, pos + 1
+        while depth:
+            cursor = _PLAIN.match(buffer, cursor).end()  # type: ignore[union-attr]
+            token = buffer[cursor : cursor + 1]
+            if token in (b"{", b"["):
+                depth += 1
+            elif token in (b"}", b"]"):
+                depth -= 1
+            elif token:
+                raise ValueError(f"Unexpected byte at {cursor}")
+            else:
+                raise ValueError(f"Unterminated container at byte {pos}")
+            cursor += 1
+        return cursor
+    match = _SCALAR.match(buffer, pos)
+    if match is None:
+        raise ValueError(f"Expected a JSON value at byte {pos}")
+    return match.end()
+
+
+def _iter_array(buffer: Buffer, pos: int) -> Iterator[Tuple[int, int]]:
+    """Yield ``(start, end)`` spans of the elements of the array opening at ``pos``."""
+    pos = _skip_whitespace(buffer, pos + 1)
+    if buffer[pos : pos + 1] == b"]":
+        return
+    while True:
+        end = _skip_value(buffer, pos)
+        yield pos, end
+        pos = _skip_whitespace(buffer, end)
+        separator = buffer[pos : pos + 1]
+        if separator == b"]":
+            return
+        if separator != b",":
+            raise ValueError(f"Expected ',' or ']' at byte {pos}")
+        pos = _skip_whitespace(buffer, pos + 1)
+
+
+def iter_message_spans(buffer: Buffer) -> Iterator[Tuple[int, int]]:
+    """Yield byte spans of each message in a top-level list or ``{"messages": [...]}``.
+
+    Mirrors the two layouts accepted by the chat loaders. Only the structure is
+    scanned; message bodies are not decoded.
+    """
+    pos = len(_BOM) if buffer[: len(_BOM)] == _BOM else 0
+    pos = _skip_whitespace(buffer, pos)
+    opening = buffer[pos : pos + 1]
+    if opening == b"[":
+        yield from _iter_array(buffer, pos)
+        return
+    if opening != b"{":
+        raise ValueError("Expected a JSON list or object")
+
+    pos = _skip_whitespace(buffer, pos + 1)
+    while buffer[pos : pos + 1] == b'"':
+        key_end = _skip_string(buffer, pos)
+        key = json.loads(bytes(buffer[pos:key_end]))
+        pos = _skip_whitespace(buffer, key_end)
+        if buffer[pos : pos + 1] != b":":
+            raise ValueError(f"Expected ':' at byte {pos}")
+        pos = _skip_whitespace(buffer, pos + 1)
+        if key == "messages" and buffer[pos : pos + 1] == b"[":
+            yield from _iter_array(buffer, pos)
+            return
+        pos = _skip_whitespace(buffer, _skip_value(buffer, pos))
+        if buffer[pos : pos + 1] == b",":
+            pos = _skip_whitespace(buffer, pos + 1)
+
+
+@lru_cache(maxsize=None)
+def _key_pattern(key: str) -> Pattern[bytes]:
+    return re.compile(rb'"' + re.escape(json.dumps(key)[1:-1].encode("utf-8")) + rb'"\s*:\s*')
+
+
+def _is_top_level(buffer: Buffer, start: int, pos: int) -> bool:
+    """Whether ``pos`` is outside any string and nested container of the object opening at ``start``."""
+    depth, cursor = 0, start + 1
+    while True:
+        cursor = _PLAIN.match(buffer, cursor, pos).end()  # type: ignore[union-attr]
+        if cursor == pos:
+            return depth == 0
+        token = buffer[cursor : cursor + 1]
+        if token == b'"':
+            # ``pos`` lies inside this string.
+            return False
+        if token not in (b"{", b"[", b"}", b"]"):
+            raise ValueError(f"Unexpected byte at {cursor}")
+        depth += 1 if token in (b"{", b"[") else -1
+        cursor += 1
+
+
+def object_member(buffer: Buffer, start: int, end: int, key: str) -> Optional[Tuple[int, int]]:
+    """Return the span of the top-level ``key`` of the object spanning ``[start, end)``.
+
+    The object is searched for the key without being decoded, so reading one
+    field of a large message costs a regex search rather than a full parse.
+    Returns ``None`` when the value is not an object or lacks ``key``.
+    """
+    if buffer[start : start + 1] != b"{":
+        return None
+    pattern = _key_pattern(key)
+    cursor = start
+    while True:
+        match = pattern.search(buffer, cursor, end)
+        if match is None:
+            return None
+        if _is_top_level(buffer, start, match.start()):
+            return match.end(), _skip_value(buffer, match.end())
+        cursor = match.start() + 1
+
+
+@contextmanager
+def open_mapped(file_path: str | Path) -> Iterator[Buffer]:
+    """Memory-map ``file_path`` read-only; empty files map to ``b""``."""
+    with Path(file_path).open("rb") as handle:
+        if handle.seek(0, 2) == 0:
+            yield b""
+            return
+        mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield mapped
+        finally:
+            mapped.close()
+
+
+def iter_messages(file_path: str | Path) -> Iterator[Tuple[bytes, MutableMapping[str, object]]]:
+    """Yield ``(raw_bytes, decoded_message)`` for every message in ``file_path``."""
+    with open_mapped(file_path) as buffer:
+        for start, end in iter_message_spans(buffer):
+            raw = bytes(buffer[start:end])
+            yield raw, json.loads(raw)
+
+
+__all__ = ["iter_message_spans", "iter_messages", "object_member", "open_mapped"]
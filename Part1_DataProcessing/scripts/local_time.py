@@ -0,0 +1,146 @@
+"""Convert UTC instants to local wall-clock time via a precomputed offset table."""
+from __future__ import annotations
+
+import bisect
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import numpy as np
+
+_EPOCH = datetime(1970, 1, 1)
+_DAY_SECONDS = 86400
+# Extra coverage added whenever the table has to grow, so sorted input rarely triggers a rebuild.
+_EXTENSION_SECONDS = 366 * _DAY_SECONDS
+
+
+def load_zone(timezone_name: str) -> ZoneInfo:
+    """Return the :class:`ZoneInfo` for ``timezone_name`` or raise ``ValueError``."""
+    try:
+        return ZoneInfo(timezone_name)
+    except (ZoneInfoNotFoundError, ValueError) as exc:
+        raise ValueError(f"Unknown timezone: {timezone_name}") from exc
+
+
+def _day_start_epoch(day: date) -> int:
+    return (day - _EPOCH.date()).days * _DAY_SECONDS
+
+
+def utc_window(start: date, end: date) -> Tuple[int, int]:
+    """Return epoch seconds bounding every instant whose local date lies in ``[start, end)`` in any timezone."""
+    return _day_start_epoch(start) - _DAY_SECONDS, _day_start_epoch(end) + _DAY_SECONDS
+
+
+def epoch_seconds(moment: datetime) -> float:
+    """Return the epoch seconds of ``moment``; naive inputs are treated as UTC."""
+    if moment.tzinfo is None:
+        return (moment - _EPOCH).total_seconds()
+    return moment.timestamp()
+
+
+class LocalTimeConverter:
+    """Map UTC epoch seconds to naive local datetimes for a single timezone.
+
+    The UTC offset transitions between ``start`` and ``end`` are located once with
+    ``zoneinfo``; every conversion afterwards is a binary search over that short
+    table plus an addition, done for a whole batch at once by :meth:`local_epochs`.
+    Instants outside the window extend the table on demand.
+    """
+
+    def __init__(self, timezone_name: str, start: Optional[date] = None, end: Optional[date] = None) -> None:
+        self.timezone_name = timezone_name
+        self._zone = load_zone(timezone_name)
+        self._transitions: List[int] = []
+        self._offsets: List[int] = []
+        self._transition_array = np.empty(0)
+        self._offset_array = np.empty(0)
+        self._covered: Optional[Tuple[int, int]] = None
+        if start is not None and end is not None:
+            self._build(*utc_window(start, end))
+
+    def _offset_from_zone(self, epoch_seconds: int) -> int:
+        moment = datetime.fromtimestamp(epoch_seconds, tz=timezone.utc).astimezone(self._zone)
+        return int(moment.utcoffset().total_seconds())  # type: ignore[union-attr]
+
+    def _build(self, lower: int, upper: int) -> None:
+        """Record every offset change in ``[lower, upper)`` at one-second precision."""
+        transitions = [lower]
+        offsets = [self._offset_from_zone(lower)]
+        previous_time, previous_offset = lower, offsets[0]
+        for probe in range(lower + _DAY_SECONDS, upper + _DAY_SECONDS, _DAY_SECONDS):
+            offset = self._offset_from_zone(probe)
+            if offset != previous_offset:
+                # Binary search inside the day for the first second with the new offset.
+                low, high = previous_time, probe
+                while high - low > 1:
+                    middle = (low + high) // 2
+                    if self._offset_from_zone(middle) == previous_offset:
+                        low = middle
+                    else:
+                        high = middle
+                transitions.append(high)
+                offsets.append(offset)
+                previous_offset = offset
+            previous_time = probe
+        self._transitions, self._offsets = transitions, offsets
+        self._transition_array = np.asarray(transitions, dtype=np.float64)
+        self._offset_array = np.asarray(offsets, dtype=np.float64)
+        self._covered = (lower, upper)
+
+    def _cover(self, lowest: float, highest: float) -> None:
+        """Extend the table, if needed, so that it covers ``[lowest, highest]``."""
+        covered = self._covered
+        if covered is None:
+            self._build(int(lowest) - _EXTENSION_SECONDS, int(highest) + _EXTENSION_SECONDS)
+        elif not (covered[0] <= lowest and highest < covered[1]):
+            self._build(
+                min(covered[0], int(lowest) - _EXTENSION_SECONDS),
+                max(covered[1], int(highest) + _EXTENSION_SECONDS),
+            )
+
+    def offset_seconds(self, epoch_seconds: float) -> int:
+        """Return the UTC offset in seconds that applies at ``epoch_seconds``."""
+        self._cover(epoch_seconds, epoch_seconds)
+        index = bisect.bisect_right(self._transitions, epoch_seconds) - 1
+        return self._offsets[max(index, 0)]
+
+    def local_epochs(self, epochs: Iterable[float]) -> np.ndarray:
+        """Return the local wall-clock time of each of ``epochs`` as seconds since the epoch.
+
+        The offsets of the whole batch are found with one ``np.searchsorted`` over
+        the transition table.
+        """
+        values = np.fromiter(epochs, dtype=np.float64)
+        if not values.size:
+            return values
+        self._cover(float(values.min()), float(values.max()))
+        index = np.searchsorted(self._transition_array, values, side="right") - 1
+        return values + self._offset_array[np.maximum(index, 0)]
+
+    def localize(self, epoch_seconds: float) -> datetime:
+        """Return the naive local wall-clock time for ``epoch_seconds``."""
+        return _EPOCH + timedelta(seconds=epoch_seconds + self.offset_seconds(epoch_seconds))
+
+    def localize_many(self, epochs: Iterable[float]) -> List[datetime]:
+        """Convert a batch of epoch seconds with a single vectorised offset lookup."""
+        return [_EPOCH + timedelta(seconds=value) for value in self.local_epochs(epochs).tolist()]
+
+    def to_local(self, moment: datetime) -> datetime:
+        """Convert ``moment`` to naive local time; naive inputs are treated as UTC."""
+        return self.localize(epoch_seconds(moment))
+
+
+def build_converter(
+    timezone_name: Optional[str],
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+) -> Optional[LocalTimeConverter]:
+    """Return a converter for ``timezone_name`` covering the ``YYYY-MM-DD`` window, or ``None``."""
+    if not timezone_name:
+        return None
+    start = datetime.strptime(start_date, "%Y-%m-%d").date() if start_date else None
+    end = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date else None
+    return LocalTimeConverter(timezone_name, start, end)
+
+
+__all__ = ["LocalTimeConverter", "build_converter", "epoch_seconds", "load_zone", "utc_window"]
@@ -0,0 +1,139 @@
+"""Buffered, atomic CSV writers shared by the exporters."""
+from __future__ import annotations
+
+import csv
+import gzip
+import io
+import logging
+import lzma
+import os
+import uuid
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_BUFFER_ROWS = 4096
+
+_BinaryOpener = Callable[[str, str], IO[bytes]]
+
+COMPRESSORS: Dict[str, _BinaryOpener] = {
+    ".gz": lambda path, mode: gzip.open(path, mode),  # type: ignore[return-value]
+    ".xz": lambda path, mode: lzma.open(path, mode),  # type: ignore[return-value]
+}
+
+
+def _binary_opener(path: Path) -> _BinaryOpener:
+    """Return the opener matching the compression implied by ``path``'s suffix."""
+    return COMPRESSORS.get(path.suffix.lower(), lambda name, mode: open(name, mode))  # type: ignore[return-value]
+
+
+class CsvOutputWriter:
+    """Write CSV rows in bulk blocks, compressing and replacing ``path`` atomically.
+
+    Rows are buffered in memory and encoded ``buffer_rows`` at a time. Output goes to
+    a temporary file next to ``path`` that is renamed into place only once the writer
+    closes cleanly, so readers never observe a half-written file. A ``.gz`` or ``.xz``
+    suffix selects gzip or xz compression.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        fieldnames: Sequence[str],
+        buffer_rows: int = DEFAULT_BUFFER_ROWS,
+    ) -> None:
+        if buffer_rows <= 0:
+            raise ValueError("buffer_rows must be positive")
+        self.path = Path(path)
+        self.fieldnames = list(fieldnames)
+        self.buffer_rows = buffer_rows
+        self.rows_written = 0
+        self._buffer: List[Mapping[str, Any]] = []
+        self._handle: Optional[IO[bytes]] = None
+        self._temp_path: Optional[Path] = None
+
+    def open(self) -> "CsvOutputWriter":
+        """Create the temporary output file and write the header row."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._temp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp")
+        self._handle = _binary_opener(self.path)(str(self._temp_path), "wb")
+        header = io.StringIO()
+        csv.writer(header).writerow(self.fieldnames)
+        self._handle.write(header.getvalue().encode("utf-8"))
+        return self
+
+    def writerow(self, row: Mapping[str, Any]) -> None:
+        """Queue ``row`` for output, flushing a block once the buffer is full."""
+        self._buffer.append(row)
+        if len(self._buffer) >= self.buffer_rows:
+            self.flush()
+
+    def writerows(self, rows: Iterable[Mapping[str, Any]]) -> None:
+        """Queue every row in ``rows`` for output."""
+        for row in rows:
+            self.writerow(row)
+
+    def flush(self) -> None:
+        """Encode and write all buffered rows as a single block."""
+        if not self._buffer:
+            return
+        self._write_block(self._buffer)
+        self.rows_written += len(self._buffer)
+        self._buffer = []
+
+    def close(self) -> None:
+        """Flush remaining rows and atomically move the output into place."""
+        if self._handle is None or self._temp_path is None:
+            return
+        try:
+            self.flush()
+            self._handle.close()
+            os.replace(self._temp_path, self.path)
+        except BaseException:
+            self.abort()
+            raise
+        self._handle = None
+        self._temp_path = None
+
+    def abort(self) -> None:
+        """Discard the temporary output, leaving any previous ``path`` untouched."""
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+        if self._temp_path is not None:
+            self._temp_path.unlink(missing_ok=True)
+            self._temp_path = None
+        self._buffer = []
+
+    def _write_block(self, rows: Iterable[Mapping[str, Any]]) -> None:
+        assert self._handle is not None, "writer is not open"
+        block = io.StringIO()
+        csv.DictWriter(block, fieldnames=self.fieldnames).writerows(rows)
+        self._handle.write(block.getvalue().encode("utf-8"))
+
+    def __enter__(self) -> "CsvOutputWriter":
+        return self.open()
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            LOGGER.debug("Discarding partial output for %s", self.path)
+            self.abort()
+
+
+def read_csv_rows(path: str | Path) -> Iterator[Dict[str, str]]:
+    """Yield rows from a CSV written by :class:`CsvOutputWriter`, decompressing as needed."""
+    file_path = Path(path)
+    with _binary_opener(file_path)(str(file_path), "rb") as raw:
+        with io.TextIOWrapper(raw, encoding="utf-8", newline="") as handle:
+            yield from csv.DictReader(handle)
+
+
+__all__ = [
+    "COMPRESSORS",
+    "CsvOutputWriter",
+    "DEFAULT_BUFFER_ROWS",
+    "read_csv_rows",
+]
@@ -1,17 +1,34 @@
 """Utilities for parsing chat conversations exported from Instagram."""
 from __future__ import annotations
 
-import csv
 import json
 import logging
+import sys
+import tempfile
 from collections import defaultdict
-from dataclasses import dataclass
+from contextlib import ExitStack
+from dataclasses import dataclass, field
 from datetime import datetime
+from itertools import groupby, islice
+from operator import itemgetter
 from pathlib import Path
-from typing import Dict, Iterable, List, MutableMapping, Optional
+from typing import IO, Dict, Iterable, Iterator, List, Mapping, MutableMapping, Optional, Protocol, Sequence, Set, Tuple
+
+from coalesce import EventCoalescer, write_events
+from external_sort import Record, external_sort
+from json_stream import iter_messages
+from local_time import LocalTimeConverter, build_converter, epoch_seconds
+from output_writer import CsvOutputWriter
 
 LOGGER = logging.getLogger(__name__)
 
+# Contact group that collects everyone not listed in another group.
+CATCH_ALL_GROUP = "*"
+EVENT_FIELDS = ["DayOfYear", "MinuteOfDay", "Duration"]
+CALL_FIELDS = ["DayOfYear", "MinuteOfDay", "CallDuration"]
+# Messages whose timestamps are converted to local time together.
+LOCALIZE_BATCH = 4096
+
 
 @dataclass
 class ChatProcessingSummary:
@@ -20,6 +37,70 @@ class ChatProcessingSummary:
     total_messages: int
     events_logged: int
     calls_logged: int
+    contacts: int = 0
+
+
+class ParticipantTable:
+    """Dictionary encoding of participant names as dense integer ids."""
+
+    def __init__(self) -> None:
+        self.names: List[str] = []
+        self._ids: Dict[str, int] = {}
+
+    def intern(self, name: str) -> int:
+        """Return the id of ``name``, assigning the next free id on first sight."""
+        contact_id = self._ids.get(name)
+        if contact_id is None:
+            contact_id = len(self.names)
+            name = sys.intern(name)
+            self._ids[name] = contact_id
+            self.names.append(name)
+        return contact_id
+
+    def name(self, contact_id: int) -> str:
+        return self.names[contact_id]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+class ContactSplits:
+    """Route per-contact events into named output groups.
+
+    ``contact_groups`` maps a group name to contact names; a group listing ``"*"``
+    receives every contact that no other group names. Without groups every
+    contact gets its own group, named ``contact<id>``.
+    """
+
+    def __init__(self, participants: ParticipantTable, contact_groups: Optional[Mapping[str, Sequence[str]]] = None):
+        self.participants = participants
+        self.contact_groups = dict(contact_groups or {})
+        self._named: Dict[str, List[str]] = defaultdict(list)
+        self._catch_all: List[str] = []
+        for group, members in self.contact_groups.items():
+            for member in members:
+                if member == CATCH_ALL_GROUP:
+                    self._catch_all.append(group)
+                else:
+                    self._named[member].append(group)
+        self._cache: Dict[int, List[str]] = {}
+
+    def groups_for(self, contact_id: int) -> List[str]:
+        groups = self._cache.get(contact_id)
+        if groups is None:
+            if not self.contact_groups:
+                groups = [f"contact{contact_id}"]
+            else:
+                groups = self._named.get(self.participants.name(contact_id)) or self._catch_all
+            self._cache[contact_id] = groups
+        return groups
+
+
+def contact_output_path(path: str | Path, group: str) -> Path:
+    """Insert ``group`` before the extensions: ``chat_data.csv.gz`` -> ``chat_data_<group>.csv.gz``."""
+    output_path = Path(path)
+    stem, dot, suffixes = output_path.name.partition(".")
+    return output_path.with_name(f"{stem}_{group}{dot}{suffixes}")
 
 
 def parse_timestamp(message: MutableMapping[str, object]) -> Optional[datetime]:
@@ -34,11 +115,35 @@ def parse_timestamp(message: MutableMapping[str, object]) -> Optional[datetime]:
         return None
 
 
+def _timestamped(
+    messages: Iterable[MutableMapping[str, object]], converter: Optional[LocalTimeConverter]
+) -> Iterator[Tuple[MutableMapping[str, object], Optional[datetime]]]:
+    """Pair each message with its (local) timestamp, converting ``LOCALIZE_BATCH`` of them at a time."""
+    iterator = iter(messages)
+    while True:
+        batch = list(islice(iterator, LOCALIZE_BATCH))
+        if not batch:
+            return
+        timestamps = [parse_timestamp(message) for message in batch]
+        if converter is not None:
+            local = iter(converter.localize_many(epoch_seconds(moment) for moment in timestamps if moment is not None))
+            timestamps = [None if moment is None else next(local) for moment in timestamps]
+        yield from zip(batch, timestamps)
+
+
+def message_chars(message: MutableMapping[str, object]) -> int:
+    """Return the precomputed ``char_count`` of ``message``, or the length of its content."""
+    char_count = message.get("char_count")
+    if isinstance(char_count, int):
+        return char_count
+    return len(str(message.get("content", "")))
+
+
 def calculate_reading_time(messages: Iterable[MutableMapping[str, object]], reading_speed_cpm: int) -> float:
     """Return the estimated reading time in minutes for ``messages``."""
     if reading_speed_cpm <= 0:
         raise ValueError("reading_speed_cpm must be greater than zero")
-    total_chars = sum(len(str(m.get("content", ""))) for m in messages)
+    total_chars = sum(message_chars(m) for m in messages)
     return total_chars / reading_speed_cpm
 
 
@@ -49,24 +154,33 @@ def calculate_writing_time(content: str, typing_speed_cpm: int) -> float:
     return len(content) / typing_speed_cpm
 
 
-def _serialise_event(timestamp: datetime, duration_minutes: float) -> Dict[str, float]:
-    """Convert an event into a dictionary for CSV output."""
-    return {
-        "DayOfYear": timestamp.timetuple().tm_yday,
-        "MinuteOfDay": timestamp.hour * 60 + timestamp.minute,
-        "Duration": round(duration_minutes, 2),
-    }
+def _iter_sorted_messages(
+    chat_file_path: str | Path,
+    memory_budget_bytes: int,
+) -> Iterator[MutableMapping[str, object]]:
+    """Yield messages ordered by their ``timestamp`` string using a bounded-memory external sort."""
 
+    def records() -> Iterator[Record]:
+        try:
+            for raw, message in iter_messages(chat_file_path):
+                timestamp = message.get("timestamp", "")
+                yield (timestamp if isinstance(timestamp, str) else "").encode("utf-8"), raw
+        except ValueError as exc:
+            raise RuntimeError(f"Error loading chat JSON file: {exc}") from exc
 
-def process_chat_data(
+    for _, raw in external_sort(records(), memory_budget_bytes):
+        yield json.loads(raw)
+
+
+def _load_sorted_messages(
     chat_file_path: str | Path,
-    output_csv: str | Path,
-    calls_csv: str | Path,
-    your_name: str,
-    reading_speed_cpm: int,
-    typing_speed_cpm: int,
-) -> ChatProcessingSummary:
-    """Process the exported chat JSON and calculate reading/writing effort."""
+    memory_budget_bytes: Optional[int] = None,
+) -> Iterable[MutableMapping[str, object]]:
+    """Return the messages of the chat export ordered by their ``timestamp`` string."""
+    if memory_budget_bytes:
+        if not Path(chat_file_path).exists():
+            raise RuntimeError(f"Error loading chat JSON file: '{chat_file_path}' not found")
+        return _iter_sorted_messages(chat_file_path, memory_budget_bytes)
     try:
         with Path(chat_file_path).open("r", encoding="utf-8") as handle:
             data = json.load(handle)
@@ -77,86 +191,462 @@ def process_chat_data(
     if not isinstance(messages, list):
         raise ValueError("Chat export did not contain a messages list")
     messages.sort(key=lambda payload: payload.get("timestamp", ""))
+    return messages
+
+
+class ChatSink(Protocol):
+    """Receives contacts, reply events and calls as :func:`collect_chat_shard` finds them."""
+
+    def contact(self, name: str) -> None: ...
+
+    def event(
+        self, day_of_year: int, minute_of_day: int, contact: str, read_chars: int, writing_time: float, first_reply: bool
+    ) -> None: ...
+
+    def call(self, day_of_year: int, minute_of_day: int, contact: str, call_minutes: float) -> None: ...
+
+
+@dataclass
+class ChatShard:
+    """Chat events of a contiguous run of time-sorted messages.
+
+    A reply's reading time covers every message received from that contact since
+    the previous reply, which may lie in an earlier shard. The first reply to each
+    contact therefore only counts the characters read within the shard, and
+    :class:`ChatOutputWriter` adds the characters carried over from earlier shards
+    before durations are computed and rounded.
+    """
+
+    total_messages: int = 0
+    # Participants in order of first appearance.
+    contacts: List[str] = field(default_factory=list)
+    # (DayOfYear, MinuteOfDay, contact, characters read, writing minutes, first reply to contact in shard)
+    events: List[Tuple[int, int, str, int, float, bool]] = field(default_factory=list)
+    # (DayOfYear, MinuteOfDay, contact, call minutes)
+    calls: List[Tuple[int, int, str, float]] = field(default_factory=list)
+    # Characters received after each contact's last reply in the shard.
+    unread_chars: Dict[str, int] = field(default_factory=dict)
+
+    def contact(self, name: str) -> None:
+        self.contacts.append(name)
+
+    def event(
+        self, day_of_year: int, minute_of_day: int, contact: str, read_chars: int, writing_time: float, first_reply: bool
+    ) -> None:
+        self.events.append((day_of_year, minute_of_day, contact, read_chars, writing_time, first_reply))
+
+    def call(self, day_of_year: int, minute_of_day: int, contact: str, call_minutes: float) -> None:
+        self.calls.append((day_of_year, minute_of_day, contact, call_minutes))
+
+
+def collect_chat_shard(
+    messages: Iterable[MutableMapping[str, object]],
+    your_name: str,
+    typing_speed_cpm: int,
+    timezone_name: Optional[str] = None,
+    sink: Optional[ChatSink] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+) -> ChatShard:
+    """Turn time-sorted ``messages`` into a :class:`ChatShard`.
+
+    Message lengths come from :func:`message_chars`, so messages combined with
+    ``text_metrics`` are measured without their text. With ``sink`` the contacts,
+    events and calls go to it as they are found instead of into the shard, which
+    then only carries the message count and the unread characters. The
+    ``start_date``/``end_date`` window lets the timezone table be built up front.
+    """
+    if typing_speed_cpm <= 0:
+        raise ValueError("typing_speed_cpm must be greater than zero")
+    converter = build_converter(timezone_name, start_date, end_date)
+    shard = ChatShard()
+    target: ChatSink = shard if sink is None else sink
+    seen: Set[str] = set()
+    replied: Set[str] = set()
+
+    def note(name: str) -> str:
+        if name not in seen:
+            seen.add(name)
+            target.contact(name)
+        return name
+
+    for message, timestamp in _timestamped(messages, converter):
+        shard.total_messages += 1
+        sender = message.get("sender_name")
+        receiver = message.get("receiver_name")
 
-    unread_messages: Dict[str, List[MutableMapping[str, object]]] = defaultdict(list)
-    total_messages = 0
-    total_logged = 0
-    total_calls = 0
-
-    output_path = Path(output_csv)
-    calls_path = Path(calls_csv)
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    calls_path.parent.mkdir(parents=True, exist_ok=True)
-
-    with output_path.open("w", newline="", encoding="utf-8") as csv_file, calls_path.open(
-        "w", newline="", encoding="utf-8"
-    ) as calls_file:
-        writer = csv.DictWriter(csv_file, fieldnames=["DayOfYear", "MinuteOfDay", "Duration"])
-        writer.writeheader()
-
-        calls_writer = csv.DictWriter(calls_file, fieldnames=["DayOfYear", "MinuteOfDay", "CallDuration"])
-        calls_writer.writeheader()
-
-        for message in messages:
-            total_messages += 1
-            sender = message.get("sender_name")
-            receiver = message.get("receiver_name")
-            timestamp = parse_timestamp(message)
-            content = str(message.get("content", ""))
-
-            if not sender or timestamp is None:
+        if not sender or timestamp is None:
+            continue
+        day_of_year = timestamp.timetuple().tm_yday
+        minute_of_day = timestamp.hour * 60 + timestamp.minute
+
+        if "call_duration" in message:
+            try:
+                call_duration = float(message["call_duration"]) / 60
+            except (TypeError, ValueError):  # pragma: no cover - defensive
+                LOGGER.debug("Invalid call duration encountered")
                 continue
+            contact = note(str((receiver if sender == your_name else sender) or sender))
+            target.call(day_of_year, minute_of_day, contact, round(call_duration, 2))
+            continue
+
+        if receiver == your_name:
+            contact = note(str(sender))
+            shard.unread_chars[contact] = shard.unread_chars.get(contact, 0) + message_chars(message)
+            continue
+
+        if sender == your_name and receiver:
+            contact = note(str(receiver))
+            writing_time = message_chars(message) / typing_speed_cpm
+            first_reply = contact not in replied
+            replied.add(contact)
+            target.event(
+                day_of_year, minute_of_day, contact, shard.unread_chars.pop(contact, 0), writing_time, first_reply
+            )
+    return shard
+
+
+def collect_chat_file_shard(
+    chat_file_path: str | Path,
+    your_name: str,
+    typing_speed_cpm: int,
+    timezone_name: Optional[str] = None,
+    memory_budget_bytes: Optional[int] = None,
+    lower: Optional[str] = None,
+    upper: Optional[str] = None,
+    sink: Optional[ChatSink] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+) -> ChatShard:
+    """Collect the messages whose ``timestamp`` string lies in ``[lower, upper)``.
+
+    Open bounds (``None``) let the first and last shard take every message
+    before or after the sharded range. ``sink``, ``start_date`` and ``end_date``
+    are passed to :func:`collect_chat_shard`.
+    """
+    messages = _load_sorted_messages(chat_file_path, memory_budget_bytes)
+    if lower is not None or upper is not None:
+
+        def in_shard(message: MutableMapping[str, object]) -> bool:
+            timestamp = message.get("timestamp", "")
+            key = timestamp if isinstance(timestamp, str) else ""
+            return (lower is None or key >= lower) and (upper is None or key < upper)
+
+        messages = filter(in_shard, messages)
+    return collect_chat_shard(messages, your_name, typing_speed_cpm, timezone_name, sink, start_date, end_date)
+
+
+def _write_participants(
+    path: str | Path, participants: ParticipantTable, contact_counts: Mapping[int, List[int]]
+) -> None:
+    with CsvOutputWriter(path, ["ContactId", "Name", "ChatEvents", "Calls"]) as writer:
+        for contact_id, name in enumerate(participants.names):
+            chat_events, calls = contact_counts.get(contact_id, [0, 0])
+            writer.writerow({"ContactId": contact_id, "Name": name, "ChatEvents": chat_events, "Calls": calls})
+
+
+class _SplitRows:
+    """Rows of the per-group split files, kept in memory or spooled to a temporary file.
+
+    :meth:`grouped` returns them ordered by group and kind, each group in arrival
+    order; spooled rows are ordered with a bounded-memory external sort.
+    """
+
+    def __init__(self, spool: Optional[IO[str]] = None, memory_budget_bytes: Optional[int] = None) -> None:
+        self._spool = spool
+        self._memory_budget_bytes = memory_budget_bytes
+        self._rows: List[Tuple[str, str, Tuple[float, ...]]] = []
+
+    def add(self, group: str, kind: str, values: Tuple[float, ...]) -> None:
+        if self._spool is None:
+            self._rows.append((group, kind, values))
+        else:
+            self._spool.write(json.dumps([group, kind, *values]) + "\n")
+
+    def grouped(self) -> Iterator[Tuple[str, str, Tuple[float, ...]]]:
+        if self._spool is None or not self._memory_budget_bytes:
+            yield from sorted(self._rows, key=itemgetter(0, 1))
+            return
+        spool = self._spool
+        spool.seek(0)
+
+        def records() -> Iterator[Record]:
+            for line in spool:
+                group, kind = json.loads(line)[:2]
+                yield f"{group}\0{kind}".encode("utf-8"), line.encode("utf-8")
+
+        for _, payload in external_sort(records(), self._memory_budget_bytes):
+            group, kind, *values = json.loads(payload)
+            yield group, kind, tuple(values)
+
+
+class ChatOutputWriter:
+    """Finish chat events and stream them into the chat output files.
+
+    Events and calls pass through an :class:`EventCoalescer` into the outputs as
+    they arrive, so only the participant table and the characters each contact
+    left unread stay in memory. Shards are fed in order with :meth:`write_shard`,
+    or a single collection streams in through the :class:`ChatSink` methods
+    followed by :meth:`end_shard`. With ``per_contact`` the rows of the split
+    files are written on close; given ``memory_budget_bytes`` they are spooled to
+    disk until then. Use as a context manager; on error no output is replaced.
+    """
+
+    def __init__(
+        self,
+        output_csv: str | Path,
+        calls_csv: str | Path,
+        reading_speed_cpm: int,
+        coalesce_gap_minutes: Optional[float] = None,
+        per_contact: bool = False,
+        contact_groups: Optional[Mapping[str, Sequence[str]]] = None,
+        participants_csv: Optional[str | Path] = None,
+        memory_budget_bytes: Optional[int] = None,
+    ) -> None:
+        if reading_speed_cpm <= 0:
+            raise ValueError("reading_speed_cpm must be greater than zero")
+        self.output_csv = output_csv
+        self.calls_csv = calls_csv
+        self.reading_speed_cpm = reading_speed_cpm
+        self.coalesce_gap_minutes = coalesce_gap_minutes
+        self.participants_csv = participants_csv or Path(output_csv).with_name("participants.csv")
+        self.memory_budget_bytes = memory_budget_bytes
+        self.participants = ParticipantTable()
+        self.splits = ContactSplits(self.participants, contact_groups) if per_contact else None
+        self.total_messages = 0
+        self.events_logged = 0
+        self.calls_logged = 0
+        self._contact_counts: Dict[int, List[int]] = defaultdict(lambda: [0, 0])
+        self._carried_chars: Dict[str, int] = defaultdict(int)
+        self._stack = ExitStack()
+        self._events: Optional[EventCoalescer] = None
+        self._calls: Optional[EventCoalescer] = None
+        self._split_rows: Optional[_SplitRows] = None
 
-            if "call_duration" in message:
-                try:
-                    call_duration = float(message["call_duration"]) / 60
-                except (TypeError, ValueError):  # pragma: no cover - defensive
-                    LOGGER.debug("Invalid call duration encountered")
-                    continue
-                calls_writer.writerow(
-                    {
-                        "DayOfYear": timestamp.timetuple().tm_yday,
-                        "MinuteOfDay": timestamp.hour * 60 + timestamp.minute,
-                        "CallDuration": round(call_duration, 2),
-                    }
+    def __enter__(self) -> "ChatOutputWriter":
+        contact_column = ["ContactId"] if self.splits is not None else []
+        try:
+            events = self._stack.enter_context(CsvOutputWriter(self.output_csv, EVENT_FIELDS + contact_column))
+            calls = self._stack.enter_context(CsvOutputWriter(self.calls_csv, CALL_FIELDS + contact_column))
+            self._events = EventCoalescer(events, self.coalesce_gap_minutes)
+            self._calls = EventCoalescer(calls, self.coalesce_gap_minutes, "CallDuration")
+            if self.splits is not None:
+                spool = None
+                if self.memory_budget_bytes:
+                    spool = self._stack.enter_context(
+                        tempfile.TemporaryFile("w+", encoding="utf-8", prefix="chat-splits-")
+                    )
+                self._split_rows = _SplitRows(spool, self.memory_budget_bytes)
+        except BaseException:
+            self._stack.__exit__(*sys.exc_info())
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if exc_type is not None:
+            self._stack.__exit__(exc_type, exc, traceback)
+            return
+        try:
+            self._finish()
+        except BaseException:
+            self._stack.__exit__(*sys.exc_info())
+            raise
+        self._stack.__exit__(None, None, None)
+        LOGGER.info(
+            "Chat processing complete: messages=%s, events=%s, calls=%s",
+            self.total_messages,
+            self.events_logged,
+            self.calls_logged,
+        )
+
+    @property
+    def summary(self) -> ChatProcessingSummary:
+        return ChatProcessingSummary(
+            total_messages=self.total_messages,
+            events_logged=self.events_logged,
+            calls_logged=self.calls_logged,
+            contacts=len(self.participants),
+        )
+
+    def contact(self, name: str) -> None:
+        self.participants.intern(name)
+
+    def event(
+        self, day_of_year: int, minute_of_day: int, contact: str, read_chars: int, writing_time: float, first_reply: bool
+    ) -> None:
+        assert self._events is not None, "writer is not open"
+        if first_reply:
+            read_chars += self._carried_chars.pop(contact, 0)
+        total_duration = read_chars / self.reading_speed_cpm + writing_time
+        if total_duration <= 0:
+            return
+        values = (day_of_year, minute_of_day, round(total_duration, 2))
+        event: Dict[str, float] = dict(zip(EVENT_FIELDS, values))
+        if self.splits is not None:
+            event["ContactId"] = self._route("events", contact, values, 0)
+        self._events.writerow(event)
+        self.events_logged += 1
+
+    def call(self, day_of_year: int, minute_of_day: int, contact: str, call_minutes: float) -> None:
+        assert self._calls is not None, "writer is not open"
+        values = (day_of_year, minute_of_day, call_minutes)
+        call: Dict[str, float] = dict(zip(CALL_FIELDS, values))
+        if self.splits is not None:
+            call["ContactId"] = self._route("calls", contact, values, 1)
+        self._calls.writerow(call)
+        self.calls_logged += 1
+
+    def _route(self, kind: str, contact: str, values: Tuple[float, ...], count_index: int) -> int:
+        assert self.splits is not None and self._split_rows is not None
+        contact_id = self.participants.intern(contact)
+        self._contact_counts[contact_id][count_index] += 1
+        for group in self.splits.groups_for(contact_id):
+            self._split_rows.add(group, kind, values)
+        return contact_id
+
+    def end_shard(self, shard: ChatShard) -> None:
+        """Count the shard's messages and carry its unread characters to the next shard."""
+        self.total_messages += shard.total_messages
+        for name, chars in shard.unread_chars.items():
+            self._carried_chars[name] += chars
+
+    def write_shard(self, shard: ChatShard) -> None:
+        """Finish and write the events and calls collected in ``shard``."""
+        for name in shard.contacts:
+            self.contact(name)
+        for event in shard.events:
+            self.event(*event)
+        for call in shard.calls:
+            self.call(*call)
+        self.end_shard(shard)
+
+    def _finish(self) -> None:
+        assert self._events is not None and self._calls is not None
+        self._events.flush()
+        self._calls.flush()
+        if self._split_rows is None:
+            return
+        outputs = {
+            "events": (self.output_csv, EVENT_FIELDS, "Duration"),
+            "calls": (self.calls_csv, CALL_FIELDS, "CallDuration"),
+        }
+        for group, group_rows in groupby(self._split_rows.grouped(), key=itemgetter(0)):
+            written: Set[str] = set()
+            for kind, rows in groupby(group_rows, key=itemgetter(1)):
+                path, fieldnames, duration_field = outputs[kind]
+                split_rows = (dict(zip(fieldnames, values)) for _, _, values in rows)
+                write_events(
+                    contact_output_path(path, group), fieldnames, split_rows, self.coalesce_gap_minutes, duration_field
                 )
-                total_calls += 1
-                continue
+                written.add(kind)
+            for kind in sorted(set(outputs) - written):
+                path, fieldnames, duration_field = outputs[kind]
+                write_events(contact_output_path(path, group), fieldnames, [], self.coalesce_gap_minutes, duration_field)
+        _write_participants(self.participants_csv, self.participants, self._contact_counts)
 
-            if receiver == your_name:
-                unread_messages[sender].append(message)
-                continue
 
-            if sender == your_name and receiver:
-                pending_messages = unread_messages.get(receiver, [])
-                reading_time = calculate_reading_time(pending_messages, reading_speed_cpm) if pending_messages else 0
-                writing_time = calculate_writing_time(content, typing_speed_cpm)
-                total_duration = reading_time + writing_time
+def write_chat_outputs(
+    shards: Iterable[ChatShard],
+    output_csv: str | Path,
+    calls_csv: str | Path,
+    reading_speed_cpm: int,
+    coalesce_gap_minutes: Optional[float] = None,
+    per_contact: bool = False,
+    contact_groups: Optional[Mapping[str, Sequence[str]]] = None,
+    participants_csv: Optional[str | Path] = None,
+    memory_budget_bytes: Optional[int] = None,
+) -> ChatProcessingSummary:
+    """Finish the events of consecutive ``shards`` and write the chat outputs.
+
+    Each shard is written through a :class:`ChatOutputWriter` as soon as it is
+    reached, so ``shards`` may be a lazy iterable.
+    """
+    with ChatOutputWriter(
+        output_csv,
+        calls_csv,
+        reading_speed_cpm,
+        coalesce_gap_minutes,
+        per_contact,
+        contact_groups,
+        participants_csv,
+        memory_budget_bytes,
+    ) as writer:
+        for shard in shards:
+            writer.write_shard(shard)
+    return writer.summary
 
-                if total_duration > 0:
-                    writer.writerow(_serialise_event(timestamp, total_duration))
-                    total_logged += 1
 
-                unread_messages[receiver].clear()
+def process_chat_data(
+    chat_file_path: str | Path,
+    output_csv: str | Path,
+    calls_csv: str | Path,
+    your_name: str,
+    reading_speed_cpm: int,
+    typing_speed_cpm: int,
+    timezone_name: Optional[str] = None,
+    memory_budget_bytes: Optional[int] = None,
+    coalesce_gap_minutes: Optional[float] = None,
+    per_contact: bool = False,
+    contact_groups: Optional[Mapping[str, Sequence[str]]] = None,
+    participants_csv: Optional[str | Path] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+) -> ChatProcessingSummary:
+    """Process the exported chat JSON and calculate reading/writing effort.
+
+    Timestamps are converted to ``timezone_name`` when given; naive timestamps are
+    assumed to be UTC in that case, and the ``YYYY-MM-DD`` ``start_date``/``end_date``
+    window the messages were combined for sizes the timezone table. With ``memory_budget_bytes`` the export is
+    scanned from a memory map and sorted externally instead of being loaded whole.
+    ``coalesce_gap_minutes`` merges events (and calls) that start within that many
+    minutes of each other in the same 5-minute bin.
 
-    summary = ChatProcessingSummary(
-        total_messages=total_messages,
-        events_logged=total_logged,
-        calls_logged=total_calls,
-    )
-    LOGGER.info(
-        "Chat processing complete: messages=%s, events=%s, calls=%s",
-        summary.total_messages,
-        summary.events_logged,
-        summary.calls_logged,
-    )
-    return summary
+    With ``per_contact`` every event and call is tagged with a ``ContactId`` from
+    an interned participant table (written to ``participants_csv``, by default
+    ``participants.csv`` next to ``output_csv``). In the same pass the events are
+    split into one ``<output>_<group>`` file pair per contact group (see
+    :class:`ContactSplits`). Events are written as they are found (see
+    :class:`ChatOutputWriter`) rather than collected first.
+    """
+    with ChatOutputWriter(
+        output_csv,
+        calls_csv,
+        reading_speed_cpm,
+        coalesce_gap_minutes,
+        per_contact,
+        contact_groups,
+        participants_csv,
+        memory_budget_bytes,
+    ) as writer:
+        shard = collect_chat_file_shard(
+            chat_file_path,
+            your_name,
+            typing_speed_cpm,
+            timezone_name,
+            memory_budget_bytes,
+            sink=writer,
+            start_date=start_date,
+            end_date=end_date,
+        )
+        writer.end_shard(shard)
+    return writer.summary
 
 
 __all__ = [
+    "CATCH_ALL_GROUP",
+    "ChatOutputWriter",
     "ChatProcessingSummary",
+    "ChatShard",
+    "ChatSink",
+    "ContactSplits",
+    "ParticipantTable",
     "calculate_reading_time",
     "calculate_writing_time",
+    "collect_chat_file_shard",
+    "collect_chat_shard",
+    "contact_output_path",
+    "message_chars",
     "parse_timestamp",
     "process_chat_data",
+    "write_chat_outputs",
 ]
\ No newline at end of file
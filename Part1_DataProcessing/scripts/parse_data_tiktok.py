@@ -1,15 +1,19 @@
 """Process TikTok liked items into session-based watch durations."""
 from __future__ import annotations
 
-import csv
 import json
 import logging
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Iterable, List
+from typing import Dict, List, Optional
+
+from coalesce import group_sessions, write_events
+from local_time import build_converter, epoch_seconds
 
 LOGGER = logging.getLogger(__name__)
 
+TIKTOK_FIELDS = ["DayOfYear", "MinuteOfDay", "Duration"]
+
 
 def _load_json(input_file: Path) -> Dict[str, object]:
     try:
@@ -20,49 +24,27 @@ def _load_json(input_file: Path) -> Dict[str, object]:
         raise ValueError(f"Error parsing '{input_file}': {exc}") from exc
 
 
-def _group_sessions(
-    timestamps: Iterable[datetime],
-    default_video_duration_seconds: int,
-) -> List[Dict[str, float]]:
-    sessions: List[Dict[str, float]] = []
-    sorted_times = sorted(timestamps)
-    if not sorted_times:
-        return sessions
-
-    session_start = sorted_times[0]
-    duration_seconds = default_video_duration_seconds
-
-    for previous, current in zip(sorted_times, sorted_times[1:]):
-        gap = (current - previous).total_seconds()
-        if gap <= 60:
-            duration_seconds += default_video_duration_seconds
-        else:
-            sessions.append(
-                {
-                    "start": session_start,
-                    "duration_minutes": duration_seconds / 60,
-                }
-            )
-            session_start = current
-            duration_seconds = default_video_duration_seconds
-
-    sessions.append({"start": session_start, "duration_minutes": duration_seconds / 60})
-    return sessions
-
-
-def export_tiktok_watch_time(
+def collect_tiktok_events(
     input_file: str | Path,
-    output_csv: str | Path,
     default_video_duration_seconds: int,
     start_date: str,
     end_date: str,
-) -> int:
-    """Convert liked reels/posts into approximate watch durations."""
+    timezone_name: Optional[str] = None,
+    origin_date: Optional[str] = None,
+) -> Optional[List[Dict[str, float]]]:
+    """Return the sorted session events of the days in ``[start_date, end_date)``.
+
+    ``DayOfYear`` counts from ``origin_date`` (``start_date`` by default), so a
+    shard of a longer window numbers its days like the full run. Returns ``None``
+    when the export has no liked items at all.
+    """
     if default_video_duration_seconds <= 0:
         raise ValueError("default_video_duration_seconds must be positive")
 
     start_date_obj = datetime.strptime(start_date, "%Y-%m-%d").date()
     end_date_obj = datetime.strptime(end_date, "%Y-%m-%d").date()
+    origin = datetime.strptime(origin_date, "%Y-%m-%d").date() if origin_date else start_date_obj
+    converter = build_converter(timezone_name, start_date, end_date)
 
     data = _load_json(Path(input_file))
     liked_items = (
@@ -72,47 +54,67 @@ def export_tiktok_watch_time(
     )
     if not liked_items:
         LOGGER.info("No liked items found in %s", input_file)
-        return 0
+        return None
 
-    by_day: Dict[datetime.date, List[datetime]] = {}
+    timestamps: List[datetime] = []
     for item in liked_items:
         date_str = item.get("Date")
         if not isinstance(date_str, str):
             continue
         try:
-            timestamp = datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S")
+            timestamps.append(datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S"))
         except ValueError:
             LOGGER.debug("Skipping unparseable TikTok timestamp: %s", date_str)
-            continue
+    if converter is not None:
+        timestamps = converter.localize_many(epoch_seconds(timestamp) for timestamp in timestamps)
 
-        if not (start_date_obj <= timestamp.date() < end_date_obj):
-            continue
-        by_day.setdefault(timestamp.date(), []).append(timestamp)
+    by_day: Dict[datetime.date, List[datetime]] = {}
+    for timestamp in timestamps:
+        if start_date_obj <= timestamp.date() < end_date_obj:
+            by_day.setdefault(timestamp.date(), []).append(timestamp)
 
     events: List[Dict[str, float]] = []
     for day, timestamps in by_day.items():
-        sessions = _group_sessions(timestamps, default_video_duration_seconds)
+        sessions = group_sessions(timestamps, default_video_duration_seconds)
         for session in sessions:
             events.append(
                 {
-                    "DayOfYear": (day - start_date_obj).days + 1,
+                    "DayOfYear": (day - origin).days + 1,
                     "MinuteOfDay": session["start"].hour * 60 + session["start"].minute,
                     "Duration": session["duration_minutes"],
                 }
             )
 
     events.sort(key=lambda entry: (entry["DayOfYear"], entry["MinuteOfDay"]))
+    return events
 
-    output_path = Path(output_csv)
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    with output_path.open("w", newline="", encoding="utf-8") as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=["DayOfYear", "MinuteOfDay", "Duration"])
-        writer.writeheader()
-        writer.writerows(events)
 
-    LOGGER.info("TikTok watch time -> %s (events=%s)", output_path, len(events))
-    return len(events)
+def export_tiktok_watch_time(
+    input_file: str | Path,
+    output_csv: str | Path,
+    default_video_duration_seconds: int,
+    start_date: str,
+    end_date: str,
+    timezone_name: Optional[str] = None,
+    coalesce_gap_minutes: Optional[float] = None,
+) -> int:
+    """Convert liked reels/posts into approximate watch durations.
+
+    TikTok timestamps are UTC; when ``timezone_name`` is given they are shifted to
+    that local timezone before sessions are grouped by day. ``coalesce_gap_minutes``
+    merges sessions that start within that many minutes in the same 5-minute bin.
+    """
+    events = collect_tiktok_events(
+        input_file, default_video_duration_seconds, start_date, end_date, timezone_name
+    )
+    if events is None:
+        return 0
+
+    output_path = Path(output_csv)
+    written = write_events(output_path, TIKTOK_FIELDS, events, coalesce_gap_minutes)
+    LOGGER.info("TikTok watch time -> %s (events=%s)", output_path, written)
+    return written
 
 
-__all__ = ["export_tiktok_watch_time"]
+__all__ = ["TIKTOK_FIELDS", "collect_tiktok_events", "export_tiktok_watch_time"]
 
@@ -1,24 +1,34 @@
 """Convert Instagram liked posts into estimated watch durations."""
 from __future__ import annotations
 
-import csv
 import json
 import logging
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+from coalesce import group_sessions, write_events
+from local_time import build_converter, utc_window
 
 LOGGER = logging.getLogger(__name__)
 
+REELS_FIELDS = ["DayOfYear", "MinuteOfDay", "Duration"]
 
-def export_reels_watch_time(
+
+def collect_reels_events(
     input_file: str | Path,
-    output_csv: str | Path,
     default_video_duration_seconds: int,
     start_date: str,
     end_date: str,
-) -> int:
-    """Process Instagram likes into a CSV of watch events."""
+    timezone_name: Optional[str] = None,
+    session_grouping: bool = True,
+    origin_date: Optional[str] = None,
+) -> List[Dict[str, float]]:
+    """Return the sorted watch events of the days in ``[start_date, end_date)``.
+
+    ``DayOfYear`` counts from ``origin_date`` (``start_date`` by default), so a
+    shard of a longer window numbers its days like the full run.
+    """
     if default_video_duration_seconds <= 0:
         raise ValueError("default_video_duration_seconds must be positive")
 
@@ -30,8 +40,12 @@ def export_reels_watch_time(
     liked_items = data.get("likes_media_likes", [])
     start_date_obj = datetime.strptime(start_date, "%Y-%m-%d").date()
     end_date_obj = datetime.strptime(end_date, "%Y-%m-%d").date()
+    origin = datetime.strptime(origin_date, "%Y-%m-%d").date() if origin_date else start_date_obj
+    converter = build_converter(timezone_name, start_date, end_date)
 
-    events: List[Dict[str, float]] = []
+    # Instants outside this range cannot have a local date inside the window.
+    lower, upper = utc_window(start_date_obj, end_date_obj)
+    epochs: List[float] = []
     for item in liked_items:
         entry = item.get("string_list_data", [{}])
         metadata = entry[0] if entry else {}
@@ -49,36 +63,67 @@ def export_reels_watch_time(
             timestamp_seconds = timestamp_value / 1000
         else:
             timestamp_seconds = timestamp_value
+        if lower <= timestamp_seconds < upper:
+            epochs.append(timestamp_seconds)
+
+    if converter is not None:
+        local_times = converter.localize_many(epochs)
+    else:
+        local_times = [datetime.fromtimestamp(epoch, tz=timezone.utc) for epoch in epochs]
+    timestamps = [timestamp for timestamp in local_times if start_date_obj <= timestamp.date() < end_date_obj]
+
+    if session_grouping:
+        by_day: Dict[date, List[datetime]] = {}
+        for timestamp in timestamps:
+            by_day.setdefault(timestamp.date(), []).append(timestamp)
+        sessions = [
+            session
+            for day_timestamps in by_day.values()
+            for session in group_sessions(day_timestamps, default_video_duration_seconds)
+        ]
+    else:
+        sessions = [
+            {"start": timestamp, "duration_minutes": default_video_duration_seconds / 60} for timestamp in timestamps
+        ]
+
+    events: List[Dict[str, float]] = [
+        {
+            "DayOfYear": (session["start"].date() - origin).days + 1,
+            "MinuteOfDay": session["start"].hour * 60 + session["start"].minute,
+            "Duration": session["duration_minutes"],
+        }
+        for session in sessions
+    ]
+    events.sort(key=lambda entry: (entry["DayOfYear"], entry["MinuteOfDay"]))
+    return events
 
-        try:
-            timestamp = datetime.fromtimestamp(timestamp_seconds, tz=timezone.utc)
-        except (TypeError, ValueError):
-            LOGGER.debug("Skipping invalid timestamp: %s", timestamp_raw)
-            continue
 
-        if not (start_date_obj <= timestamp.date() < end_date_obj):
-            continue
-
-        events.append(
-            {
-                "DayOfYear": (timestamp.date() - start_date_obj).days + 1,
-                "MinuteOfDay": timestamp.hour * 60 + timestamp.minute,
-                "Duration": default_video_duration_seconds / 60,
-            }
-        )
+def export_reels_watch_time(
+    input_file: str | Path,
+    output_csv: str | Path,
+    default_video_duration_seconds: int,
+    start_date: str,
+    end_date: str,
+    timezone_name: Optional[str] = None,
+    coalesce_gap_minutes: Optional[float] = None,
+    session_grouping: bool = True,
+) -> int:
+    """Process Instagram likes into a CSV of watch events.
 
-    events.sort(key=lambda entry: (entry["DayOfYear"], entry["MinuteOfDay"]))
+    When ``timezone_name`` is given, day and minute values are computed in that
+    local timezone instead of UTC. With ``session_grouping`` likes at most a
+    minute apart form one viewing session, as for TikTok; ``coalesce_gap_minutes``
+    then merges events that start within that many minutes in the same 5-minute bin.
+    """
+    events = collect_reels_events(
+        input_file, default_video_duration_seconds, start_date, end_date, timezone_name, session_grouping
+    )
 
     output_path = Path(output_csv)
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    with output_path.open("w", newline="", encoding="utf-8") as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=["DayOfYear", "MinuteOfDay", "Duration"])
-        writer.writeheader()
-        writer.writerows(events)
-
-    LOGGER.info("IG Reels watch time -> %s (events=%s)", output_path, len(events))
-    return len(events)
+    written = write_events(output_path, REELS_FIELDS, events, coalesce_gap_minutes)
+    LOGGER.info("IG Reels watch time -> %s (events=%s)", output_path, written)
+    return written
 
 
-__all__ = ["export_reels_watch_time"]
+__all__ = ["REELS_FIELDS", "collect_reels_events", "export_reels_watch_time"]
 
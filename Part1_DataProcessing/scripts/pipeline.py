@@ -1,18 +1,21 @@
 """Command line pipeline orchestrating the data processing tasks."""
 from __future__ import annotations
 
+import argparse
+import asyncio
 import json
 import logging
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Sequence
 
 from dotenv import load_dotenv
 
-from clean_and_combine_json_files import clean_and_combine_json_files
-from parse_chats import ChatProcessingSummary, process_chat_data
-from parse_data_tiktok import export_tiktok_watch_time
-from parse_ig_likes import export_reels_watch_time
-from process_yt_watchtime import process_yt_watchtime
+from async_pipeline import run_pipeline_async
+from local_time import load_zone
+from preview import run_preview
+from sharded_pipeline import run_pipeline_sharded
+from tasks import run_tasks, task_inputs
+from watcher import PathWatcher
 
 # Load environment variables from .env file
 load_dotenv()
@@ -38,6 +41,10 @@ def validate_config(config: Dict[str, Any]) -> None:
         if field not in config["global"]:
             raise ValueError(f"Config missing required global field: {field}")
 
+    timezone_name = config["global"].get("timezone")
+    if timezone_name:
+        load_zone(timezone_name)
+
 def load_config(config_path: str | Path) -> Dict[str, Any]:
     """Load and validate the JSON configuration file."""
     config_file = Path(config_path)
@@ -64,16 +71,50 @@ def ensure_output_folder(folder_path: str | Path) -> Path:
     return path
 
 
-def file_exists(file_path: str | Path) -> bool:
-    """Check if a file exists, logging a helpful message if it does not."""
-    if not Path(file_path).exists():
-        LOGGER.warning("Skipping task: '%s' not found.", file_path)
-        return False
-    return True
+def watch_and_rerun(
+    config: Dict[str, Any],
+    output_folder: Path,
+    poll_interval: float = 1.0,
+    debounce_seconds: float = 2.0,
+    max_cycles: Optional[int] = None,
+) -> int:
+    """Rerun the tasks whose inputs change until interrupted (or ``max_cycles`` reruns)."""
+    inputs = task_inputs(config)
+    watcher = PathWatcher(inputs.values(), poll_interval=poll_interval, debounce_seconds=debounce_seconds)
+    LOGGER.info("Watching %s input path(s) for changes", len(set(inputs.values())))
+
+    status_code = 0
+    cycles = 0
+    try:
+        while max_cycles is None or cycles < max_cycles:
+            changed = watcher.wait_for_changes()
+            stale = [name for name, path in inputs.items() if path in changed]
+            LOGGER.info("Inputs changed; rerunning %s", ", ".join(stale))
+            status_code = run_tasks(config, output_folder, stale)
+            cycles += 1
+    except KeyboardInterrupt:  # pragma: no cover - manual invocation
+        LOGGER.info("Stopped watching")
+    return status_code
 
 
-def main(config_path: str = "config.json") -> int:
-    """Run the configured data-processing tasks."""
+def main(
+    config_path: str = "config.json",
+    watch: bool = False,
+    poll_interval: float = 1.0,
+    debounce_seconds: float = 2.0,
+    use_async: bool = False,
+    preview_every: Optional[int] = None,
+    shard_by_month: bool = False,
+) -> int:
+    """Run the configured data-processing tasks.
+
+    With ``use_async`` the tasks run concurrently via :mod:`async_pipeline`. With
+    ``watch`` enabled, keep running afterwards and reprocess only the tasks whose
+    configured inputs change. ``preview_every`` instead processes a 1-in-N sample
+    of the inputs in a temporary folder and prints scaled estimates (see :mod:`preview`).
+    ``shard_by_month`` splits the date window into month shards processed in
+    parallel (see :mod:`sharded_pipeline`).
+    """
     setup_logging()
     config = load_config(config_path)
 
@@ -86,112 +127,59 @@ def main(config_path: str = "config.json") -> int:
         LOGGER.error("Start and end dates must be provided in the config")
         return 1
 
-    status_code = 0
+    if preview_every:
+        return run_preview(config, preview_every)
+    if shard_by_month:
+        status_code = run_pipeline_sharded(config, output_folder)
+    elif use_async:
+        status_code = asyncio.run(run_pipeline_async(config, output_folder))
+    else:
+        status_code = run_tasks(config, output_folder)
+    if watch:
+        status_code = watch_and_rerun(config, output_folder, poll_interval, debounce_seconds)
+    return status_code
 
-    # Task 1 - combine instagram json files
-    try:
-        ccfg = config["clean_and_combine_json_files"]
-        if file_exists(ccfg["input_folder"]):
-            combined_output = output_folder / ccfg["output_file"]
-            count = clean_and_combine_json_files(
-                ccfg["input_folder"],
-                combined_output,
-                start_date_str,
-                end_date_str,
-            )
-            LOGGER.info("Combined %s messages -> %s", count, combined_output)
-    except KeyError:
-        LOGGER.info("Task 'clean_and_combine_json_files' not configured; skipping")
-    except Exception:  # pragma: no cover - defensive
-        LOGGER.exception("Task 'clean_and_combine_json_files' failed")
-        status_code = 1
-
-    # Task 2 - chat processing
-    try:
-        pcfg = config["process_chat_data"]
-        chat_file = output_folder / pcfg["output_csv"]
-        calls_file = output_folder / pcfg["calls_csv"]
-        if file_exists(pcfg["chat_file"]):
-            summary: ChatProcessingSummary = process_chat_data(
-                chat_file_path=pcfg["chat_file"],
-                output_csv=chat_file,
-                calls_csv=calls_file,
-                your_name=pcfg["your_name"],
-                reading_speed_cpm=int(pcfg["reading_speed_cpm"]),
-                typing_speed_cpm=int(pcfg["typing_speed_cpm"]),
-            )
-            LOGGER.info(
-                "Chat data -> %s (events=%s, calls=%s)",
-                chat_file,
-                summary.events_logged,
-                summary.calls_logged,
-            )
-    except KeyError:
-        LOGGER.info("Task 'process_chat_data' not configured; skipping")
-    except Exception:  # pragma: no cover - defensive
-        LOGGER.exception("Task 'process_chat_data' failed")
-        status_code = 1
-
-    # Task 3 - TikTok watch time
-    try:
-        tcfg = config["export_tiktok_watch_time"]
-        if file_exists(tcfg["input_file"]):
-            tiktok_output = output_folder / tcfg["output_csv"]
-            events = export_tiktok_watch_time(
-                input_file=tcfg["input_file"],
-                output_csv=tiktok_output,
-                default_video_duration_seconds=int(tcfg["default_video_duration_seconds"]),
-                start_date=start_date_str,
-                end_date=end_date_str,
-            )
-            LOGGER.info("TikTok data -> %s (events=%s)", tiktok_output, events)
-    except KeyError:
-        LOGGER.info("Task 'export_tiktok_watch_time' not configured; skipping")
-    except Exception:  # pragma: no cover - defensive
-        LOGGER.exception("Task 'export_tiktok_watch_time' failed")
-        status_code = 1
-
-    # Task 4 - YouTube watch time
-    try:
-        ycfg = config["youtube_watch_time"]
-        if file_exists(ycfg["input_file"]):
-            yt_output = output_folder / ycfg["output_csv"]
-            process_yt_watchtime(
-                input_file=ycfg["input_file"],
-                output_csv=yt_output,
-                playback_speed=float(ycfg["playback_speed"]),
-                api_key_env=str(ycfg["api_key_env"]),
-                start_date=start_date_str,
-                end_date=end_date_str,
-            )
-            LOGGER.info("YouTube data -> %s", yt_output)
-    except KeyError:
-        LOGGER.info("Task 'youtube_watch_time' not configured; skipping")
-    except Exception:  # pragma: no cover - defensive
-        LOGGER.exception("Task 'youtube_watch_time' failed")
-        status_code = 1
-
-    # Task 5 - Instagram reels
-    try:
-        igcfg = config.get("export_reels_watch_time")
-        if igcfg and file_exists(igcfg["input_file"]):
-            ig_output = output_folder / igcfg["output_csv"]
-            events = export_reels_watch_time(
-                input_file=igcfg["input_file"],
-                output_csv=ig_output,
-                default_video_duration_seconds=int(igcfg["default_video_duration_seconds"]),
-                start_date=start_date_str,
-                end_date=end_date_str,
-            )
-            LOGGER.info("IG Reels data -> %s (events=%s)", ig_output, events)
-        else:
-            LOGGER.info("Task 'export_reels_watch_time' not configured; skipping")
-    except Exception:  # pragma: no cover - defensive
-        LOGGER.exception("Task 'export_reels_watch_time' failed")
-        status_code = 1
 
-    return status_code
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """Parse the command line options of the pipeline."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("config_path", nargs="?", default="config.json", help="Path to the JSON configuration")
+    parser.add_argument(
+        "--async", dest="use_async", action="store_true", help="Overlap YouTube lookups with the other tasks"
+    )
+    parser.add_argument(
+        "--preview",
+        dest="preview_every",
+        type=int,
+        nargs="?",
+        const=10,
+        metavar="N",
+        help="Process a 1-in-N sample (default 10) and print scaled estimates",
+    )
+    parser.add_argument(
+        "--shard-months",
+        dest="shard_by_month",
+        action="store_true",
+        help="Process the date window as month shards in a process pool",
+    )
+    parser.add_argument("--watch", action="store_true", help="Keep running and reprocess tasks whose inputs change")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between input scans in watch mode")
+    parser.add_argument(
+        "--debounce", type=float, default=2.0, help="Seconds inputs must stay unchanged before rerunning"
+    )
+    return parser.parse_args(argv)
 
 
 if __name__ == "__main__":  # pragma: no cover - manual invocation
-    raise SystemExit(main())
+    args = parse_args()
+    raise SystemExit(
+        main(
+            args.config_path,
+            watch=args.watch,
+            poll_interval=args.poll_interval,
+            debounce_seconds=args.debounce,
+            use_async=args.use_async,
+            preview_every=args.preview_every,
+            shard_by_month=args.shard_by_month,
+        )
+    )
@@ -0,0 +1,287 @@
+"""Run the pipeline on a deterministic sample of the inputs for quick parameter tuning."""
+from __future__ import annotations
+
+import copy
+import json
+import logging
+import shutil
+import tempfile
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from analytics import AnalyticsEngine
+from clean_and_combine_json_files import _discover_json_files
+from intervals import BIN_MINUTES, MINUTES_PER_DAY, IntervalSource, load_intervals, sweep
+from parse_chats import parse_timestamp
+from process_yt_watchtime import process_yt_watchtime
+from tasks import TASKS, coalesce_gap_minutes, file_exists, run_tasks, youtube_paths
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_SAMPLE_EVERY = 10
+# Day grid shading, from an idle 5-minute bin to a fully active one.
+_SHADES = " .:-=+*#%@"
+BINS_PER_DAY = MINUTES_PER_DAY // BIN_MINUTES
+# Days shown in the grid; the remaining active days are only counted.
+MAX_GRID_DAYS = 31
+
+# (task, config key of a CSV it writes, source label in the summary)
+PREVIEW_OUTPUTS: Sequence[Tuple[str, str, str]] = (
+    ("process_chat_data", "output_csv", "chat"),
+    ("process_chat_data", "calls_csv", "calls"),
+    ("export_tiktok_watch_time", "output_csv", "tiktok"),
+    ("youtube_watch_time", "output_csv", "youtube"),
+    ("export_reels_watch_time", "output_csv", "reels"),
+)
+
+DayKey = Callable[[Any], Optional[int]]
+
+
+def _tiktok_day(item: Any) -> Optional[int]:
+    date_str = item.get("Date") if isinstance(item, dict) else None
+    try:
+        return date.fromisoformat(str(date_str)[:10]).toordinal()
+    except ValueError:
+        return None
+
+
+def _reels_day(item: Any) -> Optional[int]:
+    try:
+        timestamp = int(item["string_list_data"][0]["timestamp"])
+    except (KeyError, IndexError, TypeError, ValueError):
+        return None
+    seconds = timestamp / 1000 if timestamp > 10**11 else timestamp
+    return datetime.fromtimestamp(seconds, tz=timezone.utc).toordinal()
+
+
+def _chat_day(message: Any) -> Optional[int]:
+    timestamp = parse_timestamp(message) if isinstance(message, dict) else None
+    return timestamp.toordinal() if timestamp is not None else None
+
+
+def sample_records(records: Sequence[Any], every: int, day_key: Optional[DayKey] = None) -> List[Any]:
+    """Keep every ``every``-th record, or every record of every ``every``-th day.
+
+    Sampling whole days keeps sessions and conversations intact, so per-day
+    grouping in the exporters still sees realistic input.
+    """
+    if every <= 0:
+        raise ValueError("every must be positive")
+    if day_key is None:
+        return list(records[::every])
+    sampled = []
+    for record in records:
+        day = day_key(record)
+        if day is not None and day % every == 0:
+            sampled.append(record)
+    return sampled
+
+
+def _sample_json(
+    source: Path,
+    destination: Path,
+    list_path: Sequence[str],
+    every: int,
+    day_key: Optional[DayKey],
+) -> int:
+    """Copy ``source`` to ``destination`` keeping only a sample of the list at ``list_path``."""
+    data = json.loads(source.read_text(encoding="utf-8"))
+    container: Any = data
+    for key in list_path[:-1]:
+        container = container.get(key, {}) if isinstance(container, dict) else {}
+    if list_path and isinstance(container, dict) and isinstance(container.get(list_path[-1]), list):
+        container[list_path[-1]] = sample_records(container[list_path[-1]], every, day_key)
+        kept = len(container[list_path[-1]])
+    elif isinstance(data, list):
+        data = sample_records(data, every, day_key)
+        kept = len(data)
+    else:
+        kept = 0
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    destination.write_text(json.dumps(data), encoding="utf-8")
+    return kept
+
+
+def sample_inbox(input_folder: Path, destination: Path, every: int) -> int:
+    """Copy every ``every``-th conversation file into ``destination``."""
+    files = list(_discover_json_files(input_folder))[::every]
+    for path in files:
+        target = destination / path.relative_to(input_folder)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(path, target)
+    return len(files)
+
+
+def build_preview_config(config: Dict[str, Any], every: int, workdir: Path) -> Dict[str, Any]:
+    """Return a copy of ``config`` whose inputs are samples written below ``workdir``."""
+    preview = copy.deepcopy(config)
+    output_folder = workdir / "output"
+    output_folder.mkdir(parents=True, exist_ok=True)
+    preview["global"]["output_folder"] = str(output_folder)
+
+    ccfg = preview.get("clean_and_combine_json_files")
+    combined = False
+    if isinstance(ccfg, dict) and "input_folder" in ccfg and file_exists(ccfg["input_folder"]):
+        inbox = workdir / "inbox"
+        inbox.mkdir()
+        kept = sample_inbox(Path(ccfg["input_folder"]), inbox, every)
+        LOGGER.info("Preview: sampled %s inbox file(s)", kept)
+        ccfg["input_folder"] = str(inbox)
+        combined = "output_file" in ccfg
+
+    samplers: Sequence[Tuple[str, str, Sequence[str], Optional[DayKey]]] = (
+        ("process_chat_data", "chat_file", ("messages",), _chat_day),
+        ("export_tiktok_watch_time", "input_file", ("Activity", "Like List", "ItemFavoriteList"), _tiktok_day),
+        ("youtube_watch_time", "input_file", (), None),
+        ("export_reels_watch_time", "input_file", ("likes_media_likes",), _reels_day),
+    )
+    for task, key, list_path, day_key in samplers:
+        section = preview.get(task)
+        if not isinstance(section, dict) or key not in section:
+            continue
+        if task == "process_chat_data" and combined:
+            section[key] = str(output_folder / ccfg["output_file"])
+            continue
+        if not file_exists(section[key]):
+            continue
+        source = Path(section[key])
+        destination = workdir / task / source.name
+        kept = _sample_json(source, destination, list_path, every, day_key)
+        LOGGER.info("Preview: sampled %s record(s) for %s", kept, task)
+        section[key] = str(destination)
+    return preview
+
+
+def _run_preview_youtube(config: Dict[str, Any], preview: Dict[str, Any], output_folder: Path) -> int:
+    """Write the sampled YouTube CSV from checkpointed durations only.
+
+    The preview never calls the API: without a checkpoint of the configured run
+    YouTube is skipped, and videos missing from it are left out.
+    """
+    ycfg = preview.get("youtube_watch_time")
+    if not isinstance(ycfg, dict) or not file_exists(ycfg["input_file"]):
+        return 0
+    _, checkpoint_file, _ = youtube_paths(config["youtube_watch_time"], Path(config["global"]["output_folder"]))
+    if not checkpoint_file.exists():
+        LOGGER.info("Preview: skipping YouTube (no checkpointed durations in %s)", checkpoint_file)
+        return 0
+    output_csv, _, unresolved_file = youtube_paths(ycfg, output_folder)
+    global_config = preview["global"]
+    try:
+        process_yt_watchtime(
+            input_file=ycfg["input_file"],
+            output_csv=output_csv,
+            playback_speed=float(ycfg["playback_speed"]),
+            api_key_env=str(ycfg["api_key_env"]),
+            start_date=global_config["start_date"],
+            end_date=global_config["end_date"],
+            timezone_name=global_config.get("timezone"),
+            coalesce_gap_minutes=coalesce_gap_minutes(preview),
+            checkpoint_file=checkpoint_file,
+            allow_partial=True,
+            unresolved_file=unresolved_file,
+            fetch_missing=False,
+        )
+    except Exception as exc:  # pylint: disable=broad-except
+        LOGGER.error("Preview: YouTube failed: %s", exc)
+        return 1
+    return 0
+
+
+def _preview_csvs(config: Dict[str, Any], output_folder: Path) -> List[Tuple[str, Path]]:
+    """Return ``(source, path)`` of every sampled output CSV that was written."""
+    outputs = []
+    for task, key, source in PREVIEW_OUTPUTS:
+        section = config.get(task)
+        if not isinstance(section, dict) or key not in section:
+            continue
+        path = output_folder / section[key]
+        if path.exists():
+            outputs.append((source, path))
+    return outputs
+
+
+def summarise_preview(config: Dict[str, Any], output_folder: Path, every: int) -> AnalyticsEngine:
+    """Load the sampled outputs, with every event weighted by ``every``."""
+    engine = AnalyticsEngine()
+    for source, path in _preview_csvs(config, output_folder):
+        engine.ingest_csv(source, path)
+    for stats in engine.sources.values():
+        stats.scale(every)
+    return engine
+
+
+def preview_bins(config: Dict[str, Any], output_folder: Path) -> Dict[int, np.ndarray]:
+    """Active minutes of every sampled day in the 5-minute bins of :mod:`intervals`.
+
+    All sources are unioned, so overlapping activity counts once, as in the
+    ``Union`` column of the interval outputs.
+    """
+    intervals = {
+        source: load_intervals(IntervalSource(source, str(path)))
+        for source, path in _preview_csvs(config, output_folder)
+    }
+    starts, values = sweep(intervals).windows(BIN_MINUTES)
+    days: Dict[int, np.ndarray] = {}
+    for start, minutes in zip(starts, values["Union"]):
+        if minutes <= 0:
+            continue
+        day, minute = divmod(int(start), MINUTES_PER_DAY)
+        days.setdefault(day + 1, np.zeros(BINS_PER_DAY))[minute // BIN_MINUTES] += minutes
+    return days
+
+
+def format_preview(engine: AnalyticsEngine, every: int, bins: Optional[Dict[int, np.ndarray]] = None) -> str:
+    """Render estimated totals and a day by 5-minute-bin activity grid as text."""
+    lines = [f"Preview estimates (1 in {every} sampled, totals scaled by {every})"]
+    lines.append(f"{'source':<8} {'events':>8} {'minutes':>10}")
+    for source, stats in sorted(engine.sources.items()):
+        lines.append(f"{source:<8} {stats.event_count:>8} {stats.total_minutes:>10.1f}")
+    if not engine.sources:
+        lines.append("(no output produced)")
+    if bins:
+        # Hour labels every two hours, aligned with the first bin of the hour.
+        ruler = "".join(f"{hour:<{120 // BIN_MINUTES}}" for hour in range(0, 24, 2))
+        lines.append("")
+        lines.append(f"{'day':>8}  |{ruler}| sampled days, {BIN_MINUTES}-minute bins")
+        for day in sorted(bins)[:MAX_GRID_DAYS]:
+            grid = "".join(
+                _SHADES[min(int(minutes / BIN_MINUTES * (len(_SHADES) - 1) + 0.5), len(_SHADES) - 1)]
+                for minutes in bins[day]
+            )
+            lines.append(f"{day:>8}  |{grid}|")
+        if len(bins) > MAX_GRID_DAYS:
+            lines.append(f"... {len(bins) - MAX_GRID_DAYS} more day(s)")
+    return "\n".join(lines)
+
+
+def run_preview(config: Dict[str, Any], every: int = DEFAULT_SAMPLE_EVERY) -> int:
+    """Process a sample of the configured inputs and print the scaled summary.
+
+    YouTube durations come from the run's checkpoint only; see
+    :func:`_run_preview_youtube`.
+    """
+    with tempfile.TemporaryDirectory(prefix="pipeline-preview-") as temp_dir:
+        workdir = Path(temp_dir)
+        preview_config = build_preview_config(config, every, workdir)
+        output_folder = Path(preview_config["global"]["output_folder"])
+        status_code = run_tasks(preview_config, output_folder, [name for name in TASKS if name != "youtube_watch_time"])
+        status_code |= _run_preview_youtube(config, preview_config, output_folder)
+        engine = summarise_preview(preview_config, output_folder, every)
+        bins = preview_bins(preview_config, output_folder)
+    print(format_preview(engine, every, bins))
+    return status_code
+
+
+__all__ = [
+    "build_preview_config",
+    "format_preview",
+    "preview_bins",
+    "run_preview",
+    "sample_inbox",
+    "sample_records",
+    "summarise_preview",
+]
@@ -1,21 +1,28 @@
 """Utilities for transforming YouTube watch history into timeline events."""
 from __future__ import annotations
 
-import csv
 import datetime
 import json
 import logging
 import os
+import threading
 import urllib.parse
 from datetime import timezone
 from pathlib import Path
-from typing import Callable, Dict, Iterable, List, Mapping, MutableMapping, Optional, Sequence
+from typing import Callable, Dict, Iterable, List, Mapping, MutableMapping, Optional, Sequence, Set, Tuple
 
-import isodate
+from coalesce import EventCoalescer
+from local_time import build_converter, load_zone
+from output_writer import CsvOutputWriter
+from youtube_client import BATCH_SIZE, DEFAULT_BASE_URL, close_all, thread_client
 
 LOGGER = logging.getLogger(__name__)
 
 VideoDurationFetcher = Callable[[Sequence[str], str], Mapping[str, float]]
+# Records the durations of ``video_ids`` missing from a checkpoint: ``(video_ids, api_key, checkpoint)``.
+DurationLookup = Callable[[Sequence[str], str, "DurationCheckpoint"], None]
+
+YOUTUBE_BATCH_SIZE = BATCH_SIZE
 
 
 def load_watch_history(file_path: str | Path) -> List[MutableMapping[str, object]]:
@@ -48,92 +55,268 @@ def extract_video_id(title_url: str) -> Optional[str]:
     return query_params.get("v", [None])[0]
 
 
-def fetch_video_durations(video_ids: Sequence[str], api_key: str) -> Mapping[str, float]:
-    """Fetch the duration (in seconds) for each video via the YouTube Data API."""
+def fetch_video_durations(
+    video_ids: Sequence[str], api_key: str, base_url: str = DEFAULT_BASE_URL
+) -> Mapping[str, float]:
+    """Fetch the duration (in seconds) for each video via the YouTube Data API.
+
+    Uses this thread's :class:`youtube_client.YouTubeClient`, so consecutive
+    batches share one keep-alive connection.
+    """
     if not video_ids:
         return {}
+    return thread_client(api_key, base_url).video_durations(video_ids)
 
-    try:
-        from googleapiclient.discovery import build  # type: ignore
-    except ImportError as exc:  # pragma: no cover - defensive
-        raise RuntimeError("google-api-python-client is required for YouTube processing") from exc
-
-    youtube = build("youtube", "v3", developerKey=api_key)
-    durations: Dict[str, float] = {}
-    for i in range(0, len(video_ids), 50):
-        response = youtube.videos().list(part="contentDetails", id=",".join(video_ids[i : i + 50])).execute()
-        for item in response.get("items", []):
-            video_id = item["id"]
-            duration_seconds = isodate.parse_duration(item["contentDetails"]["duration"]).total_seconds()
-            if duration_seconds <= 3 * 3600:
-                durations[video_id] = duration_seconds
-    return durations
 
+class DurationCheckpoint:
+    """Video durations looked up so far, persisted as one JSON line per batch.
 
-def process_yt_watchtime(
-    input_file: str | Path,
-    output_csv: str | Path,
-    playback_speed: float,
-    api_key_env: str,
-    start_date: str,
-    end_date: str,
+    Every completed batch is appended (and synced) as
+    ``{"ids": [...], "durations": {...}}``; IDs of the batch missing from
+    ``durations`` were looked up but have no usable duration and are not retried.
+    Loading the file on a rerun skips every recorded batch, and a line cut short
+    by a crash is ignored. Without a ``path`` the checkpoint only lives in memory.
+    """
+
+    def __init__(self, path: Optional[str | Path] = None) -> None:
+        self.path = Path(path) if path else None
+        self.durations: Dict[str, float] = {}
+        self.looked_up: Set[str] = set()
+        self._lock = threading.Lock()
+        self._needs_newline = False
+        if self.path is not None and self.path.exists():
+            self._load(self.path)
+
+    def _load(self, path: Path) -> None:
+        text = path.read_text(encoding="utf-8")
+        # Start a fresh line after a record cut short by a crash.
+        self._needs_newline = bool(text) and not text.endswith("\n")
+        for line in text.splitlines():
+            try:
+                record = json.loads(line)
+                ids, durations = record["ids"], record["durations"]
+            except (ValueError, KeyError, TypeError):
+                LOGGER.warning("Ignoring incomplete checkpoint line in %s", path)
+                continue
+            self.looked_up.update(ids)
+            self.durations.update(durations)
+        LOGGER.info("Resuming from %s (%s video(s) already looked up)", path, len(self.looked_up))
+
+    def missing(self, video_ids: Iterable[str]) -> List[str]:
+        """Return the unique ``video_ids`` that have not been looked up yet, in order."""
+        return [video_id for video_id in dict.fromkeys(video_ids) if video_id not in self.looked_up]
+
+    def record(self, batch: Sequence[str], durations: Mapping[str, float]) -> None:
+        """Store the result of looking up ``batch``."""
+        with self._lock:
+            self.looked_up.update(batch)
+            self.durations.update(durations)
+            if self.path is None:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as handle:
+                if self._needs_newline:
+                    handle.write("\n")
+                    self._needs_newline = False
+                handle.write(json.dumps({"ids": list(batch), "durations": dict(durations)}) + "\n")
+                handle.flush()
+                os.fsync(handle.fileno())
+
+    def resolve(self, video_ids: Iterable[str]) -> Tuple[Dict[str, float], List[str]]:
+        """Split ``video_ids`` into known durations and the IDs still to be looked up."""
+        unique_ids = list(dict.fromkeys(video_ids))
+        durations = {video_id: self.durations[video_id] for video_id in unique_ids if video_id in self.durations}
+        return durations, self.missing(unique_ids)
+
+
+def fetch_missing_durations(
+    video_ids: Sequence[str],
+    api_key: str,
+    checkpoint: DurationCheckpoint,
     fetcher: Optional[VideoDurationFetcher] = None,
-) -> int:
-    """Convert YouTube watch history into CSV duration entries."""
-    if playback_speed <= 0:
-        raise ValueError("playback_speed must be positive")
+    batch_size: int = YOUTUBE_BATCH_SIZE,
+) -> None:
+    """Look up the ``video_ids`` missing from ``checkpoint`` one batch at a time.
+
+    Each batch is recorded as soon as it completes, so an error (quota, network)
+    only loses the batch in flight and a rerun continues from there.
+    """
+    duration_fetcher = fetcher or fetch_video_durations
+    missing = checkpoint.missing(video_ids)
+    for i in range(0, len(missing), batch_size):
+        batch = missing[i : i + batch_size]
+        checkpoint.record(batch, duration_fetcher(batch, api_key))
+
 
-    start_dt = datetime.datetime.strptime(start_date, "%Y-%m-%d").replace(tzinfo=timezone.utc)
-    end_dt = datetime.datetime.strptime(end_date, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+def write_unresolved(path: str | Path, unresolved: Sequence[str]) -> None:
+    """Write the IDs still to be looked up, one per line; remove the file once there are none."""
+    unresolved_path = Path(path)
+    if not unresolved:
+        unresolved_path.unlink(missing_ok=True)
+        return
+    unresolved_path.parent.mkdir(parents=True, exist_ok=True)
+    unresolved_path.write_text("".join(f"{video_id}\n" for video_id in unresolved), encoding="utf-8")
+    LOGGER.warning("%s video ID(s) unresolved -> %s", len(unresolved), unresolved_path)
 
+
+def resolve_api_key(api_key_env: str) -> str:
+    """Read the YouTube API key from the ``api_key_env`` environment variable."""
     api_key = None
     if api_key_env:
         api_key = os.getenv(api_key_env)
     if not api_key:
         raise RuntimeError("No YouTube API key provided")
+    return api_key
+
+
+def prepare_watch_history(
+    input_file: str | Path,
+    start_date: str,
+    end_date: str,
+    timezone_name: Optional[str] = None,
+) -> Tuple[List[MutableMapping[str, object]], List[str]]:
+    """Load and date-filter the watch history, returning the entries and their video IDs."""
+    window_zone = load_zone(timezone_name) if timezone_name else timezone.utc
+    start_dt = datetime.datetime.strptime(start_date, "%Y-%m-%d").replace(tzinfo=window_zone)
+    end_dt = datetime.datetime.strptime(end_date, "%Y-%m-%d").replace(tzinfo=window_zone)
 
     watch_history = load_watch_history(input_file)
     filtered = filter_by_date(watch_history, start_dt, end_dt)
     video_ids = [extract_video_id(entry.get("titleUrl", "")) for entry in filtered]
-    video_ids = [video_id for video_id in video_ids if video_id]
+    return filtered, [video_id for video_id in video_ids if video_id]
 
-    duration_fetcher = fetcher or fetch_video_durations
-    durations = duration_fetcher(video_ids, api_key)
 
+def write_watch_time(
+    filtered: Sequence[MutableMapping[str, object]],
+    durations: Mapping[str, float],
+    output_csv: str | Path,
+    playback_speed: float,
+    start_date: str,
+    end_date: str,
+    timezone_name: Optional[str] = None,
+    coalesce_gap_minutes: Optional[float] = None,
+) -> int:
+    """Write one CSV event per entry in ``filtered`` whose video duration is known.
+
+    With ``coalesce_gap_minutes`` the entries are written in chronological order
+    and merged when they start that close together in the same 5-minute bin.
+    """
+    converter = build_converter(timezone_name, start_date, end_date)
     output_path = Path(output_csv)
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-
-    events_written = 0
-    with output_path.open("w", newline="", encoding="utf-8") as csv_file:
-        writer = csv.DictWriter(csv_file, fieldnames=["DayOfYear", "MinuteOfDay", "Duration"])
-        writer.writeheader()
-        for entry in filtered:
-            video_id = extract_video_id(entry.get("titleUrl", ""))
+    timestamps = [datetime.datetime.fromisoformat(str(entry["time"]).replace("Z", "+00:00")) for entry in filtered]
+    if converter is not None:
+        timestamps = converter.localize_many(timestamp.timestamp() for timestamp in timestamps)
+    entries = list(zip(filtered, timestamps))
+    if coalesce_gap_minutes is not None:
+        entries.sort(key=lambda pair: pair[1])
+
+    with CsvOutputWriter(output_path, ["DayOfYear", "MinuteOfDay", "Duration"]) as writer:
+        coalescer = EventCoalescer(writer, coalesce_gap_minutes)
+        for entry, timestamp in entries:
+            video_id = extract_video_id(str(entry.get("titleUrl", "")))
             if not video_id:
                 continue
             duration_seconds = durations.get(video_id)
             if not duration_seconds:
                 continue
-            timestamp = datetime.datetime.fromisoformat(entry["time"].replace("Z", "+00:00"))
-            writer.writerow(
+            coalescer.writerow(
                 {
                     "DayOfYear": timestamp.timetuple().tm_yday,
                     "MinuteOfDay": timestamp.hour * 60 + timestamp.minute,
                     "Duration": round(duration_seconds / playback_speed, 2),
                 }
             )
-            events_written += 1
+        coalescer.flush()
+
+    LOGGER.info("YouTube watch time -> %s (events=%s)", output_path, coalescer.rows_out)
+    return coalescer.rows_out
+
+
+def _sibling_path(output_csv: str | Path, suffix: str) -> Path:
+    output_path = Path(output_csv)
+    return output_path.with_name(output_path.name.partition(".")[0] + suffix)
+
+
+def checkpoint_path(output_csv: str | Path) -> Path:
+    """Default duration checkpoint for ``output_csv``: ``<output>_durations.jsonl``."""
+    return _sibling_path(output_csv, "_durations.jsonl")
+
+
+def unresolved_path(output_csv: str | Path) -> Path:
+    """Default location of the unresolved-ID list for ``output_csv``."""
+    return _sibling_path(output_csv, "_unresolved.txt")
 
-    LOGGER.info("YouTube watch time -> %s (events=%s)", output_path, events_written)
-    return events_written
+
+def process_yt_watchtime(
+    input_file: str | Path,
+    output_csv: str | Path,
+    playback_speed: float,
+    api_key_env: str,
+    start_date: str,
+    end_date: str,
+    fetcher: Optional[VideoDurationFetcher] = None,
+    timezone_name: Optional[str] = None,
+    coalesce_gap_minutes: Optional[float] = None,
+    checkpoint_file: Optional[str | Path] = None,
+    allow_partial: bool = False,
+    unresolved_file: Optional[str | Path] = None,
+    fetch_missing: bool = True,
+    lookup: Optional[DurationLookup] = None,
+) -> int:
+    """Convert YouTube watch history into CSV duration entries.
+
+    When ``timezone_name`` is given, the date window and the day/minute values are
+    interpreted in that local timezone instead of UTC. Durations are looked up in
+    batches recorded in ``checkpoint_file`` (by default ``<output>_durations.jsonl``,
+    see :class:`DurationCheckpoint`), so a failed run resumes where it stopped.
+    With ``allow_partial`` a failed lookup still writes the events of every
+    resolved video and lists the remaining IDs in ``unresolved_file`` (by default
+    ``<output>_unresolved.txt``). Without ``fetch_missing`` no API requests are
+    made and only the checkpointed durations are used. ``lookup`` replaces the
+    sequential :func:`fetch_missing_durations`, e.g. with concurrent requests.
+    """
+    if playback_speed <= 0:
+        raise ValueError("playback_speed must be positive")
+    api_key = resolve_api_key(api_key_env) if fetch_missing else ""
+
+    filtered, video_ids = prepare_watch_history(input_file, start_date, end_date, timezone_name)
+    checkpoint = DurationCheckpoint(checkpoint_file or checkpoint_path(output_csv))
+    try:
+        if fetch_missing and lookup is not None:
+            lookup(video_ids, api_key, checkpoint)
+        elif fetch_missing:
+            fetch_missing_durations(video_ids, api_key, checkpoint, fetcher)
+    except Exception:  # pylint: disable=broad-except
+        if not allow_partial:
+            raise
+        LOGGER.warning("YouTube lookups stopped early; writing partial output", exc_info=True)
+    finally:
+        if fetch_missing and fetcher is None and lookup is None:
+            close_all()
+    durations, unresolved = checkpoint.resolve(video_ids)
+    if allow_partial:
+        write_unresolved(unresolved_file or unresolved_path(output_csv), unresolved)
+    return write_watch_time(
+        filtered, durations, output_csv, playback_speed, start_date, end_date, timezone_name, coalesce_gap_minutes
+    )
 
 
 __all__ = [
+    "DurationCheckpoint",
+    "DurationLookup",
     "VideoDurationFetcher",
+    "YOUTUBE_BATCH_SIZE",
+    "checkpoint_path",
     "extract_video_id",
+    "fetch_missing_durations",
     "fetch_video_durations",
     "filter_by_date",
     "load_watch_history",
+    "prepare_watch_history",
     "process_yt_watchtime",
+    "resolve_api_key",
+    "unresolved_path",
+    "write_unresolved",
+    "write_watch_time",
 ]
 
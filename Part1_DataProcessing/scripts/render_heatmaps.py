@@ -0,0 +1,236 @@
+"""Render exporter CSVs to PNG heatmaps without Processing or a display."""
+from __future__ import annotations
+
+import json
+import logging
+import struct
+import sys
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from output_writer import read_csv_rows
+
+LOGGER = logging.getLogger(__name__)
+
+# Mirrors the constants of Part2_Visualization/SocialMediaDataVisualization.pde.
+DAYS_IN_YEAR = 365
+BINS_PER_DAY = 288  # 5-minute intervals
+BIN_MINUTES = 5
+BINS_PER_HOUR = 12
+BACKGROUND = (255, 255, 255)
+GRID_COLOR = "#DEDEDE"
+
+
+def parse_color(value: str) -> Tuple[int, int, int]:
+    """Convert ``#RRGGBB`` into an RGB tuple."""
+    digits = value.lstrip("#")
+    if len(digits) != 6:
+        raise ValueError(f"Expected a #RRGGBB colour, got {value!r}")
+    return int(digits[0:2], 16), int(digits[2:4], 16), int(digits[4:6], 16)
+
+
+@dataclass(frozen=True)
+class RenderSource:
+    """One dataset drawn in a given colour, like a ``DataSet`` in the sketch."""
+
+    key: str
+    csv_path: str
+    color: str
+
+
+@dataclass(frozen=True)
+class RenderJob:
+    """A single image to produce: a set of sources over an inclusive day range."""
+
+    sources: Tuple[RenderSource, ...]
+    output_png: str
+    view: str = "grid"
+    first_day: int = 1
+    last_day: int = DAYS_IN_YEAR
+    bin_height: int = 2
+    day_width: int = 3
+
+
+@dataclass
+class SourceEvents:
+    """Event columns loaded from a source CSV."""
+
+    day_index: np.ndarray
+    bin_index: np.ndarray
+    minutes: np.ndarray
+
+
+def load_source_events(source: RenderSource, first_day: int, last_day: int) -> SourceEvents:
+    """Load ``source`` and keep the rows inside ``[first_day, last_day]``."""
+    rows = list(read_csv_rows(source.csv_path))
+    days = np.fromiter((int(row["DayOfYear"]) for row in rows), dtype=np.int64, count=len(rows))
+    minutes_of_day = np.fromiter((int(row["MinuteOfDay"]) for row in rows), dtype=np.int64, count=len(rows))
+    durations = np.fromiter((float(row["Duration"]) for row in rows), dtype=np.float64, count=len(rows))
+
+    days = np.clip(days, 1, DAYS_IN_YEAR)
+    keep = (days >= first_day) & (days <= last_day)
+    return SourceEvents(
+        day_index=days[keep] - first_day,
+        bin_index=np.clip(minutes_of_day[keep] // BIN_MINUTES, 0, BINS_PER_DAY - 1),
+        # The sketch reads Duration as seconds and draws minutes.
+        minutes=durations[keep] / 60.0,
+    )
+
+
+def _blank_canvas(num_days: int, job: RenderJob) -> np.ndarray:
+    height = BINS_PER_DAY * job.bin_height
+    canvas = np.empty((height, num_days * job.day_width, 3), dtype=np.uint8)
+    canvas[:] = BACKGROUND
+    canvas[:: BINS_PER_HOUR * job.bin_height] = parse_color(GRID_COLOR)
+    return canvas
+
+
+def _paint_columns(canvas: np.ndarray, top: np.ndarray, bottom: np.ndarray, day_width: int, color) -> None:
+    """Fill ``[top, bottom)`` of each day column; ``top``/``bottom`` are per-day pixel rows."""
+    rows = np.arange(canvas.shape[0])[:, None]
+    mask = (rows >= top[None, :]) & (rows < bottom[None, :])
+    canvas[np.repeat(mask, day_width, axis=1)] = color
+
+
+def rasterize_grid(sources: Sequence[SourceEvents], colors: Sequence[str], num_days: int, job: RenderJob) -> np.ndarray:
+    """Draw every event as a bar starting at its 5-minute bin, as ``drawAllData`` does."""
+    canvas = _blank_canvas(num_days, job)
+    height = canvas.shape[0]
+    for events, color in zip(sources, colors):
+        bar = np.maximum(events.minutes * job.bin_height / BIN_MINUTES, job.bin_height * 0.1)
+        bar = np.where(bar > 1, bar, job.bin_height)
+        top = events.bin_index * job.bin_height
+        bottom = np.minimum(top + np.ceil(bar).astype(np.int64), height)
+
+        # Difference array per column: +1 where a bar starts, -1 where it ends.
+        coverage = np.zeros((height + 1, num_days), dtype=np.int32)
+        np.add.at(coverage, (top, events.day_index), 1)
+        np.add.at(coverage, (bottom, events.day_index), -1)
+        mask = np.cumsum(coverage, axis=0)[:height] > 0
+        canvas[np.repeat(mask, job.day_width, axis=1)] = parse_color(color)
+    return canvas
+
+
+def daily_minutes(events: SourceEvents, num_days: int) -> np.ndarray:
+    """Sum the minutes of ``events`` per day."""
+    return np.bincount(events.day_index, weights=events.minutes, minlength=num_days)[:num_days]
+
+
+def rasterize_stacked(sources: Sequence[SourceEvents], colors: Sequence[str], num_days: int, job: RenderJob) -> np.ndarray:
+    """Stack the daily totals of every source from the bottom up, as ``drawDataTogether`` does."""
+    canvas = _blank_canvas(num_days, job)
+    cumulative = np.full(num_days, float(canvas.shape[0]))
+    for events, color in zip(sources, colors):
+        bar = np.maximum(daily_minutes(events, num_days) * job.bin_height / BIN_MINUTES, job.bin_height * 0.1)
+        top = cumulative - bar
+        _paint_columns(
+            canvas,
+            np.maximum(np.round(top), 0).astype(np.int64),
+            np.maximum(np.round(cumulative), 0).astype(np.int64),
+            job.day_width,
+            parse_color(color),
+        )
+        cumulative = top
+    return canvas
+
+
+def encode_png(image: np.ndarray) -> bytes:
+    """Encode an ``(height, width, 3)`` ``uint8`` array as an RGB PNG."""
+    height, width, _ = image.shape
+    scanlines = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+    scanlines[:, 1:] = image.reshape(height, width * 3)
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"".join(
+        [
+            b"\x89PNG\r\n\x1a\n",
+            chunk(b"IHDR", header),
+            chunk(b"IDAT", zlib.compress(scanlines.tobytes(), 6)),
+            chunk(b"IEND", b""),
+        ]
+    )
+
+
+def render_job(job: RenderJob) -> str:
+    """Render ``job`` to its PNG file and return the output path."""
+    if job.view not in ("grid", "stacked"):
+        raise ValueError(f"Unknown view: {job.view}")
+    if not 1 <= job.first_day <= job.last_day <= DAYS_IN_YEAR:
+        raise ValueError("Day range must satisfy 1 <= first_day <= last_day <= 365")
+
+    num_days = job.last_day - job.first_day + 1
+    events = [load_source_events(source, job.first_day, job.last_day) for source in job.sources]
+    colors = [source.color for source in job.sources]
+    rasterize = rasterize_grid if job.view == "grid" else rasterize_stacked
+    image = rasterize(events, colors, num_days, job)
+
+    output_path = Path(job.output_png)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_bytes(encode_png(image))
+    return str(output_path)
+
+
+def render_many(jobs: Iterable[RenderJob], max_workers: Optional[int] = None) -> List[str]:
+    """Render ``jobs`` in a process pool and return the written paths in job order."""
+    job_list = list(jobs)
+    if not job_list:
+        return []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(render_job, job_list))
+
+
+def build_jobs(render_config: Dict[str, Any]) -> List[RenderJob]:
+    """Expand a ``render_heatmaps`` config section into one job per view and day range."""
+    sources = tuple(
+        RenderSource(key=item["key"], csv_path=item["csv"], color=item["color"]) for item in render_config["sources"]
+    )
+    output_folder = Path(render_config.get("output_folder", "renders"))
+    views = render_config.get("views", ["grid", "stacked"])
+    ranges = render_config.get("day_ranges", [[1, DAYS_IN_YEAR]])
+    return [
+        RenderJob(
+            sources=sources,
+            output_png=str(output_folder / f"{view}_{first:03d}-{last:03d}.png"),
+            view=view,
+            first_day=int(first),
+            last_day=int(last),
+        )
+        for view in views
+        for first, last in ranges
+    ]
+
+
+def main(config_path: str = "config.json") -> int:
+    """Render every job described in the ``render_heatmaps`` config section."""
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    config = json.loads(Path(config_path).read_text(encoding="utf-8"))
+    jobs = build_jobs(config["render_heatmaps"])
+    for path in render_many(jobs, max_workers=config["render_heatmaps"].get("max_workers")):
+        LOGGER.info("Rendered %s", path)
+    return 0
+
+
+__all__ = [
+    "RenderJob",
+    "RenderSource",
+    "build_jobs",
+    "daily_minutes",
+    "encode_png",
+    "load_source_events",
+    "rasterize_grid",
+    "rasterize_stacked",
+    "render_job",
+    "render_many",
+]
+
+
+if __name__ == "__main__":  # pragma: no cover - manual invocation
+    raise SystemExit(main(*sys.argv[1:2]))
@@ -0,0 +1,219 @@
+"""Run the pipeline over month shards of the date window in a process pool."""
+from __future__ import annotations
+
+import logging
+import os
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from datetime import date, datetime
+from itertools import chain
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from coalesce import write_events
+from parse_chats import collect_chat_file_shard, write_chat_outputs
+from parse_data_tiktok import TIKTOK_FIELDS, collect_tiktok_events
+from parse_ig_likes import REELS_FIELDS, collect_reels_events
+from tasks import coalesce_gap_minutes, file_exists, memory_budget_bytes, run_task
+
+LOGGER = logging.getLogger(__name__)
+
+Shard = Tuple[str, str]
+
+
+def month_shards(start_date: str, end_date: str) -> List[Shard]:
+    """Split ``[start_date, end_date)`` at month starts into ``YYYY-MM-DD`` ranges."""
+    start = datetime.strptime(start_date, "%Y-%m-%d").date()
+    end = datetime.strptime(end_date, "%Y-%m-%d").date()
+    shards: List[Shard] = []
+    lower = start
+    while lower < end:
+        upper = date(lower.year + lower.month // 12, lower.month % 12 + 1, 1)
+        upper = min(upper, end)
+        shards.append((lower.isoformat(), upper.isoformat()))
+        lower = upper
+    return shards
+
+
+def _spread(shards: Sequence[Shard], parts: int) -> List[Shard]:
+    """Join consecutive ``shards`` into at most ``parts`` contiguous ranges."""
+    if not shards:
+        return []
+    parts = max(1, min(parts, len(shards)))
+    bounds = [len(shards) * index // parts for index in range(parts + 1)]
+    return [(shards[lo][0], shards[hi - 1][1]) for lo, hi in zip(bounds, bounds[1:])]
+
+
+def _submit_tiktok(pool: Executor, config: Dict[str, Any], shards: Sequence[Shard]) -> List[Future]:
+    global_config = config["global"]
+    tcfg = config["export_tiktok_watch_time"]
+    if not file_exists(tcfg["input_file"]):
+        return []
+    return [
+        pool.submit(
+            collect_tiktok_events,
+            tcfg["input_file"],
+            int(tcfg["default_video_duration_seconds"]),
+            lower,
+            upper,
+            global_config.get("timezone"),
+            global_config["start_date"],
+        )
+        for lower, upper in shards
+    ]
+
+
+def _write_tiktok(config: Dict[str, Any], output_folder: Path, results: Sequence[Any]) -> None:
+    if any(events is None for events in results):
+        return
+    tiktok_output = output_folder / config["export_tiktok_watch_time"]["output_csv"]
+    events = write_events(tiktok_output, TIKTOK_FIELDS, chain.from_iterable(results), coalesce_gap_minutes(config))
+    LOGGER.info("TikTok data -> %s (events=%s, shards=%s)", tiktok_output, events, len(results))
+
+
+def _submit_reels(pool: Executor, config: Dict[str, Any], shards: Sequence[Shard]) -> List[Future]:
+    global_config = config["global"]
+    igcfg = config["export_reels_watch_time"]
+    if not file_exists(igcfg["input_file"]):
+        return []
+    return [
+        pool.submit(
+            collect_reels_events,
+            igcfg["input_file"],
+            int(igcfg["default_video_duration_seconds"]),
+            lower,
+            upper,
+            global_config.get("timezone"),
+            bool(igcfg.get("group_sessions", True)),
+            global_config["start_date"],
+        )
+        for lower, upper in shards
+    ]
+
+
+def _write_reels(config: Dict[str, Any], output_folder: Path, results: Sequence[Any]) -> None:
+    ig_output = output_folder / config["export_reels_watch_time"]["output_csv"]
+    events = write_events(ig_output, REELS_FIELDS, chain.from_iterable(results), coalesce_gap_minutes(config))
+    LOGGER.info("IG Reels data -> %s (events=%s, shards=%s)", ig_output, events, len(results))
+
+
+def _submit_chat(pool: Executor, config: Dict[str, Any], shards: Sequence[Shard]) -> List[Future]:
+    pcfg = config["process_chat_data"]
+    if not file_exists(pcfg["chat_file"]):
+        return []
+    if int(pcfg["reading_speed_cpm"]) <= 0:
+        raise ValueError("reading_speed_cpm must be greater than zero")
+    # Every chat shard loads and sorts the whole export, so use one range per worker
+    # and split the memory budget between them.
+    ranges = _spread(shards, os.cpu_count() or 1) or [("", "")]
+    budget = memory_budget_bytes(config)
+    worker_budget = max(budget // len(ranges), 1) if budget else None
+    return [
+        pool.submit(
+            collect_chat_file_shard,
+            pcfg["chat_file"],
+            pcfg["your_name"],
+            int(pcfg["typing_speed_cpm"]),
+            config["global"].get("timezone"),
+            worker_budget,
+            # Messages before or after the window belong to the first or last shard.
+            lower if index else None,
+            upper if index < len(ranges) - 1 else None,
+            start_date=config["global"]["start_date"],
+            end_date=config["global"]["end_date"],
+        )
+        for index, (lower, upper) in enumerate(ranges)
+    ]
+
+
+def _write_chat(config: Dict[str, Any], output_folder: Path, results: Sequence[Any]) -> None:
+    pcfg = config["process_chat_data"]
+    chat_file = output_folder / pcfg["output_csv"]
+    summary = write_chat_outputs(
+        results,
+        chat_file,
+        output_folder / pcfg["calls_csv"],
+        int(pcfg["reading_speed_cpm"]),
+        coalesce_gap_minutes(config),
+        per_contact=bool(pcfg.get("per_contact", "contact_groups" in pcfg)),
+        contact_groups=pcfg.get("contact_groups"),
+        participants_csv=output_folder / pcfg["participants_csv"] if "participants_csv" in pcfg else None,
+        memory_budget_bytes=memory_budget_bytes(config),
+    )
+    LOGGER.info(
+        "Chat data -> %s (events=%s, calls=%s, shards=%s)",
+        chat_file,
+        summary.events_logged,
+        summary.calls_logged,
+        len(results),
+    )
+
+
+# Tasks split by date: (submit the shard collectors, write the concatenated result).
+SHARDED_TASKS: Dict[str, Tuple[Callable[..., List[Future]], Callable[..., None]]] = {
+    "process_chat_data": (_submit_chat, _write_chat),
+    "export_tiktok_watch_time": (_submit_tiktok, _write_tiktok),
+    "export_reels_watch_time": (_submit_reels, _write_reels),
+}
+
+
+def _guarded(name: str, action: Callable[..., Any], *args: Any) -> Tuple[int, Any]:
+    """Call ``action`` with the error handling of :func:`pipeline.run_task`."""
+    try:
+        return 0, action(*args)
+    except KeyError:
+        LOGGER.info("Task '%s' not configured; skipping", name)
+    except Exception:  # pragma: no cover - defensive
+        LOGGER.exception("Task '%s' failed", name)
+        return 1, None
+    return 0, None
+
+
+def _collect_and_write(
+    write: Callable[..., None], config: Dict[str, Any], output_folder: Path, futures: Sequence[Future]
+) -> None:
+    write(config, output_folder, [future.result() for future in futures])
+
+
+def run_pipeline_sharded(config: Dict[str, Any], output_folder: Path, executor: Optional[Executor] = None) -> int:
+    """Run every task with the date window split into month shards.
+
+    TikTok, Reels and chat shards are collected in ``executor`` (a process pool by
+    default) and their sorted events are concatenated and written here, so
+    coalescing sees the same rows as an unsharded run. TikTok sessions never span
+    days and therefore never span shards; unread chat messages are carried from
+    one shard to the next by :func:`parse_chats.write_chat_outputs`. Combining and
+    YouTube run as single jobs: combining has to read every inbox file for any
+    date range, and the YouTube cost is the API lookups rather than the parsing.
+    The output matches :func:`pipeline.run_tasks` exactly.
+    """
+    global_config = config["global"]
+    shards = month_shards(global_config["start_date"], global_config["end_date"])
+    LOGGER.info("Running %s month shard(s)", len(shards))
+
+    owns_executor = executor is None
+    pool = executor or ProcessPoolExecutor()
+    status_code = 0
+    try:
+        combine = pool.submit(run_task, "clean_and_combine_json_files", config, output_folder)
+        youtube = pool.submit(run_task, "youtube_watch_time", config, output_folder)
+        submitted: Dict[str, Tuple[int, Any]] = {}
+        for name in ("export_tiktok_watch_time", "export_reels_watch_time"):
+            submitted[name] = _guarded(name, SHARDED_TASKS[name][0], pool, config, shards)
+        # Chat processing reads the combined messages file.
+        status_code |= combine.result()
+        submitted["process_chat_data"] = _guarded("process_chat_data", _submit_chat, pool, config, shards)
+
+        for name, (_, write) in SHARDED_TASKS.items():
+            status, futures = submitted[name]
+            status_code |= status
+            if futures:
+                status, _ = _guarded(name, _collect_and_write, write, config, output_folder, futures)
+                status_code |= status
+        status_code |= youtube.result()
+    finally:
+        if owns_executor:
+            pool.shutdown()
+    return status_code
+
+
+__all__ = ["month_shards", "run_pipeline_sharded"]
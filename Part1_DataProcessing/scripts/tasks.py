@@ -0,0 +1,228 @@
+"""Task registry and config helpers shared by the serial, async, sharded and batch runners."""
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from clean_and_combine_json_files import clean_and_combine_json_files
+from parse_chats import ChatProcessingSummary, process_chat_data
+from parse_data_tiktok import export_tiktok_watch_time
+from parse_ig_likes import export_reels_watch_time
+from process_yt_watchtime import checkpoint_path, process_yt_watchtime, unresolved_path
+
+LOGGER = logging.getLogger(__name__)
+
+
+def file_exists(file_path: str | Path) -> bool:
+    """Check if a file exists, logging a helpful message if it does not."""
+    if not Path(file_path).exists():
+        LOGGER.warning("Skipping task: '%s' not found.", file_path)
+        return False
+    return True
+
+
+def memory_budget_bytes(config: Dict[str, Any]) -> Optional[int]:
+    """Return the configured ``global.memory_budget_mb`` in bytes, if any."""
+    budget_mb = config["global"].get("memory_budget_mb")
+    return int(float(budget_mb) * 1024 * 1024) if budget_mb else None
+
+
+def coalesce_gap_minutes(config: Dict[str, Any]) -> Optional[float]:
+    """Return the configured ``global.coalesce_gap_minutes``, if event coalescing is enabled."""
+    gap = config["global"].get("coalesce_gap_minutes")
+    return float(gap) if gap is not None else None
+
+
+def youtube_paths(ycfg: Dict[str, Any], output_folder: Path) -> Tuple[Path, Path, Path]:
+    """Return the YouTube output CSV, duration checkpoint and unresolved-ID list.
+
+    ``checkpoint_file`` and ``unresolved_file`` override the defaults next to the CSV.
+    """
+    output_csv = output_folder / ycfg["output_csv"]
+    checkpoint_file = checkpoint_path(output_csv)
+    if "checkpoint_file" in ycfg:
+        checkpoint_file = output_folder / ycfg["checkpoint_file"]
+    unresolved_file = unresolved_path(output_csv)
+    if "unresolved_file" in ycfg:
+        unresolved_file = output_folder / ycfg["unresolved_file"]
+    return output_csv, checkpoint_file, unresolved_file
+
+
+def youtube_arguments(config: Dict[str, Any], output_folder: Path) -> Dict[str, Any]:
+    """Return the keyword arguments of :func:`process_yt_watchtime` for the ``youtube_watch_time`` task."""
+    global_config = config["global"]
+    ycfg = config["youtube_watch_time"]
+    output_csv, checkpoint_file, unresolved_file = youtube_paths(ycfg, output_folder)
+    return {
+        "input_file": ycfg["input_file"],
+        "output_csv": output_csv,
+        "playback_speed": float(ycfg["playback_speed"]),
+        "api_key_env": str(ycfg["api_key_env"]),
+        "start_date": global_config["start_date"],
+        "end_date": global_config["end_date"],
+        "timezone_name": global_config.get("timezone"),
+        "coalesce_gap_minutes": coalesce_gap_minutes(config),
+        "checkpoint_file": checkpoint_file,
+        "allow_partial": bool(ycfg.get("allow_partial", False)),
+        "unresolved_file": unresolved_file,
+    }
+
+
+def _run_clean_and_combine(config: Dict[str, Any], output_folder: Path) -> None:
+    global_config = config["global"]
+    ccfg = config["clean_and_combine_json_files"]
+    if file_exists(ccfg["input_folder"]):
+        combined_output = output_folder / ccfg["output_file"]
+        count = clean_and_combine_json_files(
+            ccfg["input_folder"],
+            combined_output,
+            global_config["start_date"],
+            global_config["end_date"],
+            deduplicate=bool(ccfg.get("deduplicate", False)),
+            bloom_filter_capacity=ccfg.get("bloom_filter_capacity"),
+            timezone_name=global_config.get("timezone"),
+            memory_budget_bytes=memory_budget_bytes(config),
+            zero_copy=bool(ccfg.get("zero_copy", False)),
+            text_metrics=bool(ccfg.get("text_metrics", False)),
+            keep_content=bool(ccfg.get("keep_content", True)),
+        )
+        LOGGER.info("Combined %s messages -> %s", count, combined_output)
+
+
+def _run_chat(config: Dict[str, Any], output_folder: Path) -> None:
+    pcfg = config["process_chat_data"]
+    chat_file = output_folder / pcfg["output_csv"]
+    calls_file = output_folder / pcfg["calls_csv"]
+    participants_file = output_folder / pcfg["participants_csv"] if "participants_csv" in pcfg else None
+    if file_exists(pcfg["chat_file"]):
+        summary: ChatProcessingSummary = process_chat_data(
+            chat_file_path=pcfg["chat_file"],
+            output_csv=chat_file,
+            calls_csv=calls_file,
+            your_name=pcfg["your_name"],
+            reading_speed_cpm=int(pcfg["reading_speed_cpm"]),
+            typing_speed_cpm=int(pcfg["typing_speed_cpm"]),
+            timezone_name=config["global"].get("timezone"),
+            memory_budget_bytes=memory_budget_bytes(config),
+            coalesce_gap_minutes=coalesce_gap_minutes(config),
+            per_contact=bool(pcfg.get("per_contact", "contact_groups" in pcfg)),
+            contact_groups=pcfg.get("contact_groups"),
+            participants_csv=participants_file,
+            start_date=config["global"]["start_date"],
+            end_date=config["global"]["end_date"],
+        )
+        LOGGER.info(
+            "Chat data -> %s (events=%s, calls=%s)",
+            chat_file,
+            summary.events_logged,
+            summary.calls_logged,
+        )
+
+
+def _run_tiktok(config: Dict[str, Any], output_folder: Path) -> None:
+    global_config = config["global"]
+    tcfg = config["export_tiktok_watch_time"]
+    if file_exists(tcfg["input_file"]):
+        tiktok_output = output_folder / tcfg["output_csv"]
+        events = export_tiktok_watch_time(
+            input_file=tcfg["input_file"],
+            output_csv=tiktok_output,
+            default_video_duration_seconds=int(tcfg["default_video_duration_seconds"]),
+            start_date=global_config["start_date"],
+            end_date=global_config["end_date"],
+            timezone_name=global_config.get("timezone"),
+            coalesce_gap_minutes=coalesce_gap_minutes(config),
+        )
+        LOGGER.info("TikTok data -> %s (events=%s)", tiktok_output, events)
+
+
+def _run_youtube(config: Dict[str, Any], output_folder: Path) -> None:
+    ycfg = config["youtube_watch_time"]
+    if file_exists(ycfg["input_file"]):
+        arguments = youtube_arguments(config, output_folder)
+        process_yt_watchtime(**arguments)
+        LOGGER.info("YouTube data -> %s", arguments["output_csv"])
+
+
+def _run_reels(config: Dict[str, Any], output_folder: Path) -> None:
+    global_config = config["global"]
+    igcfg = config["export_reels_watch_time"]
+    if file_exists(igcfg["input_file"]):
+        ig_output = output_folder / igcfg["output_csv"]
+        events = export_reels_watch_time(
+            input_file=igcfg["input_file"],
+            output_csv=ig_output,
+            default_video_duration_seconds=int(igcfg["default_video_duration_seconds"]),
+            start_date=global_config["start_date"],
+            end_date=global_config["end_date"],
+            timezone_name=global_config.get("timezone"),
+            coalesce_gap_minutes=coalesce_gap_minutes(config),
+            session_grouping=bool(igcfg.get("group_sessions", True)),
+        )
+        LOGGER.info("IG Reels data -> %s (events=%s)", ig_output, events)
+
+
+# Tasks in execution order; chat processing reads the combined messages file.
+TASKS: Dict[str, Callable[[Dict[str, Any], Path], None]] = {
+    "clean_and_combine_json_files": _run_clean_and_combine,
+    "process_chat_data": _run_chat,
+    "export_tiktok_watch_time": _run_tiktok,
+    "youtube_watch_time": _run_youtube,
+    "export_reels_watch_time": _run_reels,
+}
+
+# Config key holding the input path that each task reads.
+TASK_INPUT_KEYS: Dict[str, str] = {
+    "clean_and_combine_json_files": "input_folder",
+    "process_chat_data": "chat_file",
+    "export_tiktok_watch_time": "input_file",
+    "youtube_watch_time": "input_file",
+    "export_reels_watch_time": "input_file",
+}
+
+
+def task_inputs(config: Dict[str, Any]) -> Dict[str, Path]:
+    """Return the input path of every configured task."""
+    inputs: Dict[str, Path] = {}
+    for name, key in TASK_INPUT_KEYS.items():
+        section = config.get(name)
+        if isinstance(section, dict) and key in section:
+            inputs[name] = Path(section[key])
+    return inputs
+
+
+def run_task(name: str, config: Dict[str, Any], output_folder: Path) -> int:
+    """Run a single task, returning a non-zero status code if it failed."""
+    try:
+        TASKS[name](config, output_folder)
+    except KeyError:
+        LOGGER.info("Task '%s' not configured; skipping", name)
+    except Exception:  # pragma: no cover - defensive
+        LOGGER.exception("Task '%s' failed", name)
+        return 1
+    return 0
+
+
+def run_tasks(config: Dict[str, Any], output_folder: Path, names: Iterable[str] = TASKS) -> int:
+    """Run ``names`` in pipeline order and return the combined status code."""
+    selected = set(names)
+    status_code = 0
+    for name in TASKS:
+        if name in selected:
+            status_code |= run_task(name, config, output_folder)
+    return status_code
+
+
+__all__ = [
+    "TASKS",
+    "TASK_INPUT_KEYS",
+    "coalesce_gap_minutes",
+    "file_exists",
+    "memory_budget_bytes",
+    "run_task",
+    "run_tasks",
+    "task_inputs",
+    "youtube_arguments",
+    "youtube_paths",
+]
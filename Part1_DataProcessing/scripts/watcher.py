@@ -0,0 +1,77 @@
+"""Polling file watcher used by the pipeline's watch mode."""
+from __future__ import annotations
+
+import logging
+import time
+from pathlib import Path
+from typing import Callable, Dict, FrozenSet, Iterable, Optional, Set, Tuple
+
+LOGGER = logging.getLogger(__name__)
+
+# (relative path, modification time in ns, size) for every file below a watched path.
+Fingerprint = Optional[FrozenSet[Tuple[str, int, int]]]
+
+
+def fingerprint_path(path: Path) -> Fingerprint:
+    """Summarise ``path`` (a file or a directory tree); ``None`` if it does not exist."""
+    try:
+        if path.is_dir():
+            entries = set()
+            for child in path.rglob("*"):
+                if child.is_file():
+                    stat = child.stat()
+                    entries.add((str(child.relative_to(path)), stat.st_mtime_ns, stat.st_size))
+            return frozenset(entries)
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return frozenset({("", stat.st_mtime_ns, stat.st_size)})
+
+
+class PathWatcher:
+    """Detect changes to a set of files or directories by polling their metadata.
+
+    Polling works identically on every platform and filesystem, including network
+    shares where inotify-style notifications are unreliable.
+    """
+
+    def __init__(
+        self,
+        paths: Iterable[Path],
+        poll_interval: float = 1.0,
+        debounce_seconds: float = 2.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.paths = sorted(set(paths))
+        self.poll_interval = poll_interval
+        self.debounce_seconds = debounce_seconds
+        self._sleep = sleep
+        self._snapshot: Dict[Path, Fingerprint] = self._scan()
+
+    def _scan(self) -> Dict[Path, Fingerprint]:
+        return {path: fingerprint_path(path) for path in self.paths}
+
+    def poll(self) -> Set[Path]:
+        """Return the watched paths that changed since the previous poll."""
+        current = self._scan()
+        changed = {path for path in self.paths if current[path] != self._snapshot[path]}
+        self._snapshot = current
+        return changed
+
+    def wait_for_changes(self) -> Set[Path]:
+        """Block until a burst of changes has settled and return every path it touched."""
+        changed: Set[Path] = set()
+        quiet_for = 0.0
+        while not changed or quiet_for < self.debounce_seconds:
+            self._sleep(self.poll_interval)
+            new_changes = self.poll()
+            if new_changes:
+                LOGGER.debug("Detected changes in %s", sorted(map(str, new_changes)))
+                changed |= new_changes
+                quiet_for = 0.0
+            elif changed:
+                quiet_for += self.poll_interval
+        return changed
+
+
+__all__ = ["PathWatcher", "fingerprint_path"]
@@ -0,0 +1,170 @@
+"""Minimal YouTube Data API client for looking up video durations."""
+from __future__ import annotations
+
+import gzip
+import http.client
+import json
+import logging
+import threading
+import urllib.parse
+from typing import Any, Dict, Mapping, Optional, Sequence, Set
+
+import isodate
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://www.googleapis.com/youtube/v3"
+# Field mask: the API returns nothing but the ID and duration of each video.
+DURATION_FIELDS = "items(id,contentDetails/duration)"
+# Maximum number of IDs per ``videos.list`` request.
+BATCH_SIZE = 50
+# Longer videos are assumed not to have been watched in full and are skipped.
+MAX_VIDEO_SECONDS = 3 * 3600
+
+# Failures of a reused keep-alive connection the server closed in the meantime.
+_STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+
+class YouTubeAPIError(RuntimeError):
+    """The API answered with an error status (for example ``quotaExceeded``)."""
+
+    def __init__(self, status: int, reason: str, message: str) -> None:
+        super().__init__(f"YouTube API error {status} ({reason}): {message}")
+        self.status = status
+        self.reason = reason
+
+
+class YouTubeClient:
+    """``videos.list`` over one keep-alive connection with gzip responses.
+
+    Unlike ``googleapiclient.discovery.build`` nothing is imported or downloaded
+    before the first request. ``base_url`` may point at a local stand-in server
+    (``http://127.0.0.1:<port>``). A client is not thread-safe; use one per thread
+    (see :func:`thread_client`).
+    """
+
+    def __init__(self, api_key: str, base_url: str = DEFAULT_BASE_URL, timeout: float = 30.0) -> None:
+        parsed = urllib.parse.urlsplit(base_url)
+        if parsed.scheme not in ("http", "https") or not parsed.hostname:
+            raise ValueError(f"Unsupported YouTube API base URL: {base_url}")
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeout = timeout
+        self._scheme = parsed.scheme
+        self._host = parsed.hostname
+        self._port = parsed.port
+        self._path = parsed.path.rstrip("/")
+        self._connection: Optional[http.client.HTTPConnection] = None
+
+    def _connect(self) -> http.client.HTTPConnection:
+        if self._connection is None:
+            connection_class = http.client.HTTPSConnection if self._scheme == "https" else http.client.HTTPConnection
+            self._connection = connection_class(self._host, self._port, timeout=self.timeout)
+        return self._connection
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def __enter__(self) -> "YouTubeClient":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def _get(self, resource: str, params: Mapping[str, str]) -> Dict[str, Any]:
+        url = f"{self._path}/{resource}?{urllib.parse.urlencode({**params, 'key': self.api_key})}"
+        headers = {"Accept": "application/json", "Accept-Encoding": "gzip", "User-Agent": "social-media-data (gzip)"}
+        for attempt in (1, 2):
+            reused = self._connection is not None
+            connection = self._connect()
+            try:
+                connection.request("GET", url, headers=headers)
+                response = connection.getresponse()
+                body = response.read()
+            except _STALE_CONNECTION_ERRORS:
+                self.close()
+                if reused and attempt == 1:
+                    continue
+                raise
+            except Exception:
+                self.close()
+                raise
+            break
+        if response.will_close:
+            self.close()
+        if response.getheader("Content-Encoding", "").lower() == "gzip":
+            body = gzip.decompress(body)
+
+        if response.status != 200:
+            try:
+                error = json.loads(body)["error"]
+                message = error.get("message", "")
+                reason = (error.get("errors") or [{}])[0].get("reason", response.reason)
+            except (ValueError, KeyError, TypeError, AttributeError):
+                message, reason = body[:200].decode("utf-8", "replace"), response.reason
+            raise YouTubeAPIError(response.status, reason, message)
+        return json.loads(body)
+
+    def video_durations(self, video_ids: Sequence[str]) -> Dict[str, float]:
+        """Return the duration in seconds of every video of at most three hours."""
+        durations: Dict[str, float] = {}
+        for i in range(0, len(video_ids), BATCH_SIZE):
+            batch = video_ids[i : i + BATCH_SIZE]
+            payload = self._get(
+                "videos", {"part": "contentDetails", "id": ",".join(batch), "fields": DURATION_FIELDS}
+            )
+            for item in payload.get("items", []):
+                duration_seconds = isodate.parse_duration(item["contentDetails"]["duration"]).total_seconds()
+                if duration_seconds <= MAX_VIDEO_SECONDS:
+                    durations[item["id"]] = duration_seconds
+        return durations
+
+
+_thread_clients = threading.local()
+# Every client handed out by :func:`thread_client`, so that :func:`close_all` can
+# close the connections of worker threads that have finished.
+_open_clients: Set[YouTubeClient] = set()
+_open_clients_lock = threading.Lock()
+
+
+def thread_client(api_key: str, base_url: str = DEFAULT_BASE_URL) -> YouTubeClient:
+    """Return this thread's client for ``api_key``, so its connection is reused across calls."""
+    client: Optional[YouTubeClient] = getattr(_thread_clients, "client", None)
+    with _open_clients_lock:
+        reusable = client is not None and client in _open_clients
+        if reusable and (client.api_key != api_key or client.base_url != base_url):
+            _open_clients.discard(client)
+            client.close()
+            reusable = False
+        if not reusable:
+            client = YouTubeClient(api_key, base_url)
+            _open_clients.add(client)
+            _thread_clients.client = client
+    return client
+
+
+def close_all() -> int:
+    """Close every client created by :func:`thread_client` and return how many there were.
+
+    Call it once the lookups have finished (for example after an executor shut
+    down); a thread asking again afterwards gets a new client.
+    """
+    with _open_clients_lock:
+        clients = list(_open_clients)
+        _open_clients.clear()
+    for client in clients:
+        client.close()
+    return len(clients)
+
+
+__all__ = [
+    "BATCH_SIZE",
+    "DEFAULT_BASE_URL",
+    "DURATION_FIELDS",
+    "YouTubeAPIError",
+    "YouTubeClient",
+    "close_all",
+    "thread_client",
+]
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import random
+from pathlib import Path
+
+import pytest
+
+from analytics import ActivityStats, AnalyticsEngine, HistogramSketch, iter_csv_events
+from process_yt_watchtime import write_watch_time
+
+
+def test_histogram_sketch_quantiles_are_within_accuracy():
+    values = [random.Random(seed).uniform(0.1, 100) for seed in range(1000)]
+    sketch = HistogramSketch(relative_accuracy=0.01)
+    for value in values:
+        sketch.add(value)
+    exact = sorted(values)[int(0.9 * (len(values) - 1))]
+    assert sketch.quantile(0.9) == pytest.approx(exact, rel=0.02)
+
+
+def test_activity_stats_streaks_and_rolling_average():
+    stats = ActivityStats().update([(3, 60, 10.0), (1, 0, 5.0), (2, 1439, 5.0), (7, 600, 14.0)])
+    assert stats.streaks() == [(1, 3), (7, 7)]
+    assert stats.longest_streak() == 3
+    assert stats.rolling_average(7) == pytest.approx(34.0 / 7)
+    assert stats.hour_minutes[23] == 5.0
+
+
+def test_sharded_engines_merge_to_single_run(tmp_path: Path):
+    csv_path = tmp_path / "calls.csv"
+    csv_path.write_text("DayOfYear,MinuteOfDay,CallDuration\n1,60,2.5\n2,90,1.5\n", encoding="utf-8")
+    events = list(iter_csv_events(csv_path)) + [(4, 30, 3.0), (3, 45, 1.0)]
+
+    single = AnalyticsEngine()
+    single.ingest("calls", events)
+    left, right = AnalyticsEngine(), AnalyticsEngine()
+    left.ingest("calls", events[:2])
+    right.ingest("calls", events[2:])
+
+    assert left.merge(right).report() == single.report()
+    assert single.report()["calls"]["longest_streak_days"] == 4
+
+
+def test_ingest_csv_reads_youtube_durations_as_seconds(tmp_path: Path):
+    csv_path = tmp_path / "youtube.csv"
+    history = [{"time": "2024-01-01T10:00:00Z", "titleUrl": "https://www.youtube.com/watch?v=abc"}]
+    write_watch_time(history, {"abc": 600.0}, csv_path, 1.0, "2024-01-01", "2024-02-01")
+
+    engine = AnalyticsEngine()
+    assert engine.ingest_csv("youtube", csv_path).total_minutes == pytest.approx(10.0)
+    assert engine.ingest_csv("other", csv_path, duration_unit="seconds").total_minutes == pytest.approx(10.0)
+    with pytest.raises(ValueError):
+        list(iter_csv_events(csv_path, "hours"))
+
+
+def test_activity_stats_scale_matches_repeated_events():
+    events = [(3, 60, 10.0), (1, 0, 0.0), (2, 1439, 5.0), (7, 600, 14.0)]
+    scaled = ActivityStats().update(events).scale(3)
+    repeated = ActivityStats().update(events * 3)
+
+    assert scaled.summary() == repeated.summary()
+    assert dict(scaled.daily_minutes) == pytest.approx(dict(repeated.daily_minutes))
+    assert (scaled.hour_minutes, scaled.hour_events) == (repeated.hour_minutes, repeated.hour_events)
+    assert (scaled.durations.count, scaled.durations.zero_count) == (12, 3)
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import asyncio
+import csv
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from async_pipeline import fetch_video_durations_async, run_pipeline_async
+from process_yt_watchtime import DurationCheckpoint
+
+
+class FakeFetcher:
+    """Offline stand-in for the YouTube API that records request concurrency."""
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.batches = []
+        self._lock = threading.Lock()
+
+    def __call__(self, video_ids, api_key):
+        with self._lock:
+            self.batches.append(list(video_ids))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_flight -= 1
+        return {video_id: 60.0 for video_id in video_ids}
+
+
+def test_fetch_video_durations_async_limits_concurrency():
+    fetcher = FakeFetcher()
+    video_ids = [f"id{i}" for i in range(220)] + ["id0"]
+
+    durations = asyncio.run(fetch_video_durations_async(video_ids, "key", fetcher, max_concurrent_requests=2))
+
+    assert len(durations) == 220
+    assert [len(batch) for batch in fetcher.batches] == [50, 50, 50, 50, 20]
+    assert fetcher.max_in_flight == 2
+
+
+def test_fetch_video_durations_async_skips_checkpointed_ids(tmp_path: Path):
+    checkpoint_file = tmp_path / "checkpoint.jsonl"
+    DurationCheckpoint(checkpoint_file).record([f"id{i}" for i in range(60)], {"id0": 30.0})
+
+    fetcher = FakeFetcher(delay=0)
+    video_ids = [f"id{i}" for i in range(120)]
+    durations = asyncio.run(
+        fetch_video_durations_async(video_ids, "key", fetcher, checkpoint=DurationCheckpoint(checkpoint_file))
+    )
+
+    assert sorted(map(len, fetcher.batches)) == [10, 50]
+    assert len(durations) == 61 and durations["id0"] == 30.0
+    assert DurationCheckpoint(checkpoint_file).missing(video_ids) == []
+
+
+def test_run_pipeline_async_runs_youtube_and_exporters(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("FAKE_YT_KEY", "secret")
+    history = tmp_path / "history.json"
+    history.write_text(
+        json.dumps([{"time": "2024-01-01T10:00:00Z", "titleUrl": "https://www.youtube.com/watch?v=abc"}]),
+        encoding="utf-8",
+    )
+    likes = tmp_path / "likes.json"
+    likes.write_text(json.dumps({"likes_media_likes": [{"string_list_data": [{"timestamp": 1704067200}]}]}), encoding="utf-8")
+    config = {
+        "global": {"output_folder": str(tmp_path / "out"), "start_date": "2024-01-01", "end_date": "2024-02-01"},
+        "youtube_watch_time": {
+            "input_file": str(history),
+            "output_csv": "yt.csv",
+            "playback_speed": 2.0,
+            "api_key_env": "FAKE_YT_KEY",
+        },
+        "export_reels_watch_time": {
+            "input_file": str(likes),
+            "output_csv": "reels.csv",
+            "default_video_duration_seconds": 30,
+        },
+    }
+
+    with ThreadPoolExecutor() as executor:
+        status = asyncio.run(run_pipeline_async(config, tmp_path / "out", fetcher=FakeFetcher(), executor=executor))
+
+    assert status == 0
+    with (tmp_path / "out" / "yt.csv").open() as handle:
+        assert list(csv.DictReader(handle)) == [{"DayOfYear": "1", "MinuteOfDay": "600", "Duration": "30.0"}]
+    assert (tmp_path / "out" / "reels.csv").exists()
+
+
+def test_run_pipeline_async_writes_partial_youtube_output(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("FAKE_YT_KEY", "secret")
+    history = tmp_path / "history.json"
+    history.write_text(
+        json.dumps(
+            [{"time": "2024-01-01T10:00:00Z", "titleUrl": f"https://www.youtube.com/watch?v={vid}"} for vid in "ab"]
+        ),
+        encoding="utf-8",
+    )
+    DurationCheckpoint(tmp_path / "out" / "yt_durations.jsonl").record(["a"], {"a": 60.0})
+    config = {
+        "global": {"output_folder": str(tmp_path / "out"), "start_date": "2024-01-01", "end_date": "2024-02-01"},
+        "youtube_watch_time": {
+            "input_file": str(history),
+            "output_csv": "yt.csv",
+            "playback_speed": 1.0,
+            "api_key_env": "FAKE_YT_KEY",
+            "allow_partial": True,
+        },
+    }
+
+    def failing_fetcher(video_ids, api_key):
+        raise RuntimeError("quota exceeded")
+
+    with ThreadPoolExecutor() as executor:
+        status = asyncio.run(run_pipeline_async(config, tmp_path / "out", fetcher=failing_fetcher, executor=executor))
+
+    # The async runner goes through process_yt_watchtime, so the checkpoint and allow_partial apply as in serial runs.
+    assert status == 0
+    with (tmp_path / "out" / "yt.csv").open() as handle:
+        assert len(list(csv.DictReader(handle))) == 1
+    assert (tmp_path / "out" / "yt_unresolved.txt").read_text(encoding="utf-8").split() == ["b"]
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import csv
+import json
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+from batch_pipeline import discover_account_configs, load_accounts, run_batch
+
+
+class CountingFetcher:
+    def __init__(self):
+        self.requested = []
+
+    def __call__(self, video_ids, api_key):
+        self.requested.extend(video_ids)
+        return {video_id: 60.0 for video_id in video_ids}
+
+
+def _write_account(folder: Path, name: str, video_ids, tiktok_payload=None, **youtube_options) -> Path:
+    history = folder / f"{name}_history.json"
+    history.write_text(
+        json.dumps(
+            [{"time": "2024-01-01T10:00:00Z", "titleUrl": f"https://www.youtube.com/watch?v={vid}"} for vid in video_ids]
+        ),
+        encoding="utf-8",
+    )
+    config = {
+        "global": {"output_folder": str(folder / name), "start_date": "2024-01-01", "end_date": "2024-02-01"},
+        "youtube_watch_time": {
+            "input_file": str(history),
+            "output_csv": "yt.csv",
+            "playback_speed": 1.0,
+            "api_key_env": "FAKE_YT_KEY",
+            **youtube_options,
+        },
+    }
+    if tiktok_payload is not None:
+        tiktok = folder / f"{name}_tiktok.json"
+        tiktok.write_text(tiktok_payload, encoding="utf-8")
+        config["export_tiktok_watch_time"] = {
+            "input_file": str(tiktok),
+            "output_csv": "tiktok.csv",
+            "default_video_duration_seconds": 10,
+        }
+    config_path = folder / "configs" / f"{name}.json"
+    config_path.parent.mkdir(exist_ok=True)
+    config_path.write_text(json.dumps(config), encoding="utf-8")
+    return config_path
+
+
+def test_discover_account_configs_reads_manifest(tmp_path: Path):
+    manifest = tmp_path / "manifest.json"
+    manifest.write_text(json.dumps({"accounts": ["configs/a.json", {"name": "bee", "config": "/abs/b.json"}]}))
+
+    assert discover_account_configs(manifest) == [
+        ("a", tmp_path / "configs" / "a.json"),
+        ("bee", Path("/abs/b.json")),
+    ]
+
+
+def test_run_batch_shares_lookups_and_isolates_failures(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("FAKE_YT_KEY", "secret")
+    _write_account(tmp_path, "alice", ["a", "shared"])
+    _write_account(tmp_path, "bob", ["b", "shared"], tiktok_payload="{not json")
+    (tmp_path / "configs" / "broken.json").write_text("{}", encoding="utf-8")
+
+    accounts = load_accounts(tmp_path / "configs")
+    fetcher = CountingFetcher()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        report = run_batch(accounts, executor=executor, fetcher=fetcher)
+
+    assert sorted(fetcher.requested) == ["a", "b", "shared"]
+    assert report["youtube"]["requested_ids"] == 4
+    assert report["youtube"]["unique_ids"] == 3
+    assert report["failed_accounts"] == ["bob", "broken"]
+
+    alice, bob, broken = (report["accounts"][name] for name in ("alice", "bob", "broken"))
+    assert alice["status"] == "ok"
+    assert broken["status"] == "invalid"
+    assert bob["tasks"]["export_tiktok_watch_time"]["status"] == "failed"
+    assert bob["tasks"]["youtube_watch_time"]["status"] == "ok"
+    for name in ("alice", "bob"):
+        with (tmp_path / name / "yt.csv").open() as handle:
+            assert len(list(csv.DictReader(handle))) == 2
+
+
+class FailingFetcher(CountingFetcher):
+    def __call__(self, video_ids, api_key):
+        if "fail" in video_ids:
+            raise RuntimeError("quotaExceeded")
+        return super().__call__(video_ids, api_key)
+
+
+def test_run_batch_checkpoints_per_account_and_allows_partial(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("FAKE_YT_KEY", "secret")
+    _write_account(tmp_path, "alice", ["a", "shared", "fail"], allow_partial=True)
+    _write_account(tmp_path, "bob", ["b", "shared"])
+
+    report = run_batch(load_accounts(tmp_path / "configs"), fetcher=FailingFetcher())
+
+    # Only the account that allows partial output survives the failed lookup.
+    assert report["failed_accounts"] == ["bob"]
+    assert (tmp_path / "alice" / "yt_unresolved.txt").read_text().split() == ["a", "shared", "fail"]
+    with (tmp_path / "alice" / "yt.csv").open() as handle:
+        assert list(csv.DictReader(handle)) == []
+
+    fetcher = CountingFetcher()
+    report = run_batch(load_accounts(tmp_path / "configs"), fetcher=fetcher)
+    assert report["failed_accounts"] == []
+    assert sorted(fetcher.requested) == ["a", "b", "fail", "shared"]
+    assert not (tmp_path / "alice" / "yt_unresolved.txt").exists()
+    for name, expected in (("alice", ["a", "fail", "shared"]), ("bob", ["b", "shared"])):
+        lines = (tmp_path / name / "yt_durations.jsonl").read_text().splitlines()
+        assert sorted(video_id for line in lines for video_id in json.loads(line)["ids"]) == expected
+
+    # Reruns resume from the per-account checkpoints.
+    fetcher = CountingFetcher()
+    assert run_batch(load_accounts(tmp_path / "configs"), fetcher=fetcher)["failed_accounts"] == []
+    assert fetcher.requested == []
+
+
+def test_run_batch_in_a_process_pool(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("FAKE_YT_KEY", "secret")
+    likes = json.dumps({"Activity": {"Like List": {"ItemFavoriteList": [{"Date": "2024-01-02 10:00:00"}]}}})
+    _write_account(tmp_path, "alice", ["a", "shared"], tiktok_payload=likes)
+    _write_account(tmp_path, "bob", ["b", "shared"], tiktok_payload=likes)
+
+    fetcher = CountingFetcher()
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        report = run_batch(load_accounts(tmp_path / "configs"), executor=executor, fetcher=fetcher)
+
+    assert report["failed_accounts"] == []
+    assert sorted(fetcher.requested) == ["a", "b", "shared"]
+    for name in ("alice", "bob"):
+        assert report["accounts"][name]["tasks"]["export_tiktok_watch_time"]["status"] == "ok"
+        with (tmp_path / name / "tiktok.csv").open() as handle:
+            assert len(list(csv.DictReader(handle))) == 1
+        with (tmp_path / name / "yt.csv").open() as handle:
+            assert len(list(csv.DictReader(handle))) == 2
+
+
+def test_run_batch_reports_accounts_sharing_output_files(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("FAKE_YT_KEY", "secret")
+    _write_account(tmp_path, "alice", ["a"])
+    bob = _write_account(tmp_path, "bob", ["b"])
+    _write_account(tmp_path, "carol", ["c"])
+    config = json.loads(bob.read_text(encoding="utf-8"))
+    config["global"]["output_folder"] = str(tmp_path / "alice")
+    bob.write_text(json.dumps(config), encoding="utf-8")
+
+    fetcher = CountingFetcher()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        report = run_batch(load_accounts(tmp_path / "configs"), executor=executor, fetcher=fetcher)
+
+    assert fetcher.requested == ["c"]
+    assert report["failed_accounts"] == ["alice", "bob"]
+    for name, other in (("alice", "bob"), ("bob", "alice")):
+        summary = report["accounts"][name]
+        assert summary["status"] == "invalid" and summary["tasks"] == {}
+        assert "yt.csv" in summary["error"] and f"also written by {other}" in summary["error"]
+    assert report["accounts"]["carol"]["status"] == "ok"
+    assert not (tmp_path / "alice" / "yt.csv").exists()
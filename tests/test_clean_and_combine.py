@@ -44,3 +44,168 @@ def test_clean_and_combine_json_files(tmp_path: Path):
     combined = json.loads(output_file.read_text(encoding="utf-8"))
     assert len(combined) == 2
     assert combined[0]["content"] == "Hello"
+
+
+def test_clean_and_combine_drops_duplicates(tmp_path: Path, caplog):
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    timestamp_ms = int(datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp() * 1000)
+    payload = {
+        "messages": [
+            {"timestamp_ms": timestamp_ms, "sender_name": "Me", "content": "Hello"},
+            {"timestamp_ms": timestamp_ms, "sender_name": "Friend", "content": "Hello"},
+        ]
+    }
+    (inbox / "message_1.json").write_text(json.dumps(payload), encoding="utf-8")
+    (inbox / "message_2.json").write_text(json.dumps(payload), encoding="utf-8")
+
+    output_file = tmp_path / "combined.json"
+    with caplog.at_level("INFO"):
+        count = clean_and_combine_json_files(
+            input_folder=inbox,
+            output_file=output_file,
+            start_date="2023-12-15",
+            end_date="2024-12-31",
+            deduplicate=True,
+            bloom_filter_capacity=1000,
+        )
+
+    assert count == 2
+    senders = [message["sender_name"] for message in json.loads(output_file.read_text(encoding="utf-8"))]
+    assert sorted(senders) == ["Friend", "Me"]
+    assert "Dropped 2 duplicate messages" in caplog.text
+
+
+def test_clean_and_combine_external_sort_matches_in_memory(tmp_path: Path):
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    base = int(datetime(2024, 3, 1, tzinfo=timezone.utc).timestamp() * 1000)
+    for index in range(3):
+        messages = [
+            {"timestamp_ms": base + ((i * 7919 + index) % 500) * 60000, "sender_name": "Me", "content": f"{index}-{i}"}
+            for i in range(200)
+        ]
+        (inbox / f"message_{index}.json").write_text(json.dumps({"messages": messages}), encoding="utf-8")
+
+    in_memory = tmp_path / "memory.json"
+    external = tmp_path / "external.json"
+    assert clean_and_combine_json_files(inbox, in_memory, "2024-01-01", "2025-01-01") == 600
+    assert clean_and_combine_json_files(inbox, external, "2024-01-01", "2025-01-01", memory_budget_bytes=8192) == 600
+
+    assert external.read_bytes() == in_memory.read_bytes()
+
+
+def test_clean_and_combine_zero_copy_matches_eager(tmp_path: Path):
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    base = int(datetime(2024, 3, 1, tzinfo=timezone.utc).timestamp() * 1000)
+    for index in range(3):
+        messages = [
+            {"timestamp_ms": base + ((i * 7919 + index) % 500) * 60000, "sender_name": "Zoë", "content": f"{index}-{i}"}
+            for i in range(200)
+        ]
+        (inbox / f"message_{index}.json").write_text(json.dumps({"messages": messages}), encoding="utf-8")
+
+    eager = tmp_path / "eager.json"
+    zero_copy = tmp_path / "zero_copy.json"
+    spilled = tmp_path / "spilled.json"
+    assert clean_and_combine_json_files(inbox, eager, "2024-01-01", "2025-01-01") == 600
+    assert clean_and_combine_json_files(inbox, zero_copy, "2024-01-01", "2025-01-01", zero_copy=True) == 600
+    assert (
+        clean_and_combine_json_files(
+            inbox, spilled, "2024-01-01", "2025-01-01", memory_budget_bytes=4096, zero_copy=True
+        )
+        == 600
+    )
+
+    expected = json.loads(eager.read_text(encoding="utf-8"))
+    assert json.loads(zero_copy.read_text(encoding="utf-8")) == expected
+    assert json.loads(spilled.read_text(encoding="utf-8")) == expected
+
+
+def test_clean_and_combine_zero_copy_decodes_only_for_deduplication(tmp_path: Path, monkeypatch):
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    base = int(datetime(2024, 3, 1, tzinfo=timezone.utc).timestamp() * 1000)
+    # Overlapping exports: each file repeats half of the previous one.
+    for index in range(3):
+        messages = [
+            {"timestamp_ms": base + i * 60000, "sender_name": "Me", "content": f"m{i}"}
+            for i in range(index * 50, index * 50 + 100)
+        ]
+        (inbox / f"message_{index}.json").write_text(json.dumps({"messages": messages}), encoding="utf-8")
+    eager = tmp_path / "eager.json"
+    assert clean_and_combine_json_files(inbox, eager, "2024-01-01", "2025-01-01", deduplicate=True) == 200
+    expected = json.loads(eager.read_text(encoding="utf-8"))
+
+    decoded = []
+    loads = json.loads
+    monkeypatch.setattr("clean_and_combine_json_files.json.loads", lambda raw: decoded.append(len(raw)) or loads(raw))
+    zero_copy = tmp_path / "zero_copy.json"
+    assert clean_and_combine_json_files(inbox, zero_copy, "2024-01-01", "2025-01-01", zero_copy=True) == 300
+    # Without deduplication only the ``"messages"`` keys are decoded; timestamps are read as integers.
+    assert decoded == [len('"messages"')] * 3
+
+    for options in ({}, {"bloom_filter_capacity": 1000}):
+        assert (
+            clean_and_combine_json_files(
+                inbox, zero_copy, "2024-01-01", "2025-01-01", deduplicate=True, zero_copy=True, **options
+            )
+            == 200
+        )
+        assert loads(zero_copy.read_text(encoding="utf-8")) == expected
+
+
+def test_clean_and_combine_zero_copy_skips_a_file_that_breaks_mid_scan(tmp_path: Path):
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    base = int(datetime(2024, 3, 1, tzinfo=timezone.utc).timestamp() * 1000)
+    good = [{"timestamp_ms": base + i * 60000, "sender_name": "Me", "content": f"good-{i}"} for i in range(3)]
+    (inbox / "message_1.json").write_text(json.dumps({"messages": good}), encoding="utf-8")
+    # Well-formed structure, but the second message body does not decode.
+    lost = json.dumps({"timestamp_ms": base, "sender_name": "Me", "content": "lost"})
+    broken = '{"messages": [' + lost + ', {"timestamp_ms": ' + str(base) + ', "content": nope}]}'
+    (inbox / "message_2.json").write_text(broken, encoding="utf-8")
+
+    eager = tmp_path / "eager.json"
+    zero_copy = tmp_path / "zero_copy.json"
+    assert clean_and_combine_json_files(inbox, eager, "2024-01-01", "2025-01-01") == 3
+    assert clean_and_combine_json_files(inbox, zero_copy, "2024-01-01", "2025-01-01", zero_copy=True) == 3
+    assert json.loads(zero_copy.read_text(encoding="utf-8")) == json.loads(eager.read_text(encoding="utf-8"))
+
+
+def test_clean_and_combine_text_metrics_feed_chat_processing(tmp_path: Path):
+    from parse_chats import process_chat_data
+
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    messages = [
+        {"timestamp": "2024-01-01T09:00:00", "sender_name": "Friend", "receiver_name": "Me", "content": "Hi there, you"},
+        {"timestamp": "2024-01-01T09:01:00", "sender_name": "Friend", "receiver_name": "Me", "photos": [{"uri": "a"}]},
+        {"timestamp": "2024-01-01T09:03:00", "sender_name": "Me", "receiver_name": "Friend", "content": "Hello!"},
+        {"timestamp": "2024-01-01T10:00:00", "sender_name": "Me", "receiver_name": "Friend", "call_duration": 90},
+    ]
+    (inbox / "message_1.json").write_text(json.dumps({"messages": messages}), encoding="utf-8")
+
+    full = tmp_path / "full.json"
+    compact = tmp_path / "compact.json"
+    clean_and_combine_json_files(inbox, full, "2024-01-01", "2024-02-01")
+    clean_and_combine_json_files(
+        inbox, compact, "2024-01-01", "2024-02-01", text_metrics=True, keep_content=False
+    )
+
+    combined = json.loads(compact.read_text(encoding="utf-8"))
+    assert [(m.get("char_count"), m.get("word_count"), m.get("has_media")) for m in combined] == [
+        (13, 3, False),
+        (0, 0, True),
+        (6, 1, False),
+        (0, 0, False),
+    ]
+    assert not any("content" in m or "photos" in m for m in combined)
+    assert combined[3]["call_duration"] == 90
+
+    outputs = {}
+    for name, chat_file in (("full", full), ("compact", compact)):
+        process_chat_data(chat_file, tmp_path / name / "chat.csv", tmp_path / name / "calls.csv", "Me", 60, 30)
+        outputs[name] = [(tmp_path / name / csv_name).read_bytes() for csv_name in ("chat.csv", "calls.csv")]
+    assert outputs["compact"] == outputs["full"]
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import random
+from collections import defaultdict
+
+import pytest
+
+from coalesce import EventCoalescer
+
+
+class ListSink:
+    def __init__(self):
+        self.rows = []
+
+    def writerow(self, row):
+        self.rows.append(dict(row))
+
+
+def _bin_totals(rows, duration_field="Duration"):
+    totals = defaultdict(float)
+    for row in rows:
+        totals[(row["DayOfYear"], row["MinuteOfDay"] // 5)] += float(row[duration_field])
+    return {key: round(total, 6) for key, total in totals.items()}
+
+
+def test_coalescer_preserves_bin_totals():
+    rng = random.Random(7)
+    rows = sorted(
+        (
+            {"DayOfYear": rng.randint(1, 3), "MinuteOfDay": rng.randint(0, 1439), "Duration": rng.choice([0.12, 0.2, 0.5])}
+            for _ in range(5000)
+        ),
+        key=lambda row: (row["DayOfYear"], row["MinuteOfDay"]),
+    )
+    sink = ListSink()
+    coalescer = EventCoalescer(sink, gap_minutes=5)
+    coalescer.writerows(rows)
+    coalescer.flush()
+
+    assert coalescer.rows_in == 5000
+    assert coalescer.rows_out == len(sink.rows) < 5000 // 2
+    assert _bin_totals(sink.rows) == _bin_totals(rows)
+
+
+def test_coalescer_respects_gap_bins_and_other_columns():
+    sink = ListSink()
+    coalescer = EventCoalescer(sink, gap_minutes=1, duration_field="CallDuration")
+    coalescer.writerows(
+        [
+            {"DayOfYear": 1, "MinuteOfDay": 0, "CallDuration": 0.1},
+            {"DayOfYear": 1, "MinuteOfDay": 1, "CallDuration": 0.2},
+            {"DayOfYear": 1, "MinuteOfDay": 3, "CallDuration": 0.3},  # gap too large
+            {"DayOfYear": 1, "MinuteOfDay": 4, "CallDuration": 0.4},
+            {"DayOfYear": 1, "MinuteOfDay": 5, "CallDuration": 0.5},  # next bin
+            {"DayOfYear": 2, "MinuteOfDay": 5, "CallDuration": 0.6},  # next day
+        ]
+    )
+    coalescer.flush()
+
+    assert [(row["DayOfYear"], row["MinuteOfDay"], row["CallDuration"]) for row in sink.rows] == [
+        (1, 0, 0.3),
+        (1, 3, 0.7),
+        (1, 5, 0.5),
+        (2, 5, 0.6),
+    ]
+
+
+def test_coalescer_disabled_passes_rows_through():
+    sink = ListSink()
+    coalescer = EventCoalescer(sink, gap_minutes=None)
+    rows = [{"DayOfYear": 1, "MinuteOfDay": 0, "Duration": 0.1}] * 2
+    coalescer.writerows(rows)
+    coalescer.flush()
+    assert sink.rows == rows
+
+    with pytest.raises(ValueError):
+        EventCoalescer(sink, gap_minutes=-1)
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import pytest
+
+from dedup_index import BloomFilter, DedupIndex, FingerprintSet, message_fingerprint
+
+
+def test_fingerprint_set_grows_and_detects_repeats():
+    fingerprints = FingerprintSet(expected_items=1)
+    initial_capacity = fingerprints.capacity
+    assert all(fingerprints.add(value) for value in range(1, 200))
+    assert not fingerprints.add(42)
+    assert len(fingerprints) == 199
+    assert fingerprints.capacity > initial_capacity
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=100)
+    keys = [message_fingerprint({"content": str(i)}) for i in range(100)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+
+
+def test_dedup_index_counts_duplicates():
+    index = DedupIndex(bloom_capacity=10)
+    call = {"timestamp_ms": 1, "sender_name": "Me", "call_duration": 60}
+    index.observe_all([call, {**call, "call_duration": 61}, call])
+    assert index.add(call)
+    assert index.add({**call, "call_duration": 61})
+    assert not index.add(dict(call))
+    assert index.duplicates == 1
+    # Only the repeated call reaches the exact set.
+    assert len(index) == 1
+
+
+def test_dedup_index_bloom_keeps_unique_messages_out_of_the_exact_set():
+    messages = [{"timestamp_ms": i, "sender_name": "Me", "content": f"m{i}"} for i in range(2000)]
+    repeated = messages[::200]
+    stream = messages + [dict(message) for message in repeated]
+
+    index = DedupIndex(bloom_capacity=len(stream))
+    index.observe_all(stream)
+    kept = [message for message in stream if index.add(message)]
+
+    assert kept == messages
+    assert index.duplicates == len(repeated)
+    # Only the repeats (and the odd false positive) are probed and inserted.
+    assert 2 * len(repeated) <= index.probes < 2 * len(repeated) + 60
+    assert len(index) < len(repeated) + 60
+
+
+def test_dedup_index_bloom_requires_first_pass():
+    index = DedupIndex(bloom_capacity=10)
+    with pytest.raises(RuntimeError):
+        index.add({"content": "x"})
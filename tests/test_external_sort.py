@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+import random
+
+from external_sort import external_sort, int_sort_key
+
+
+def test_external_sort_spills_and_stays_stable(caplog):
+    rng = random.Random(3)
+    records = [(int_sort_key(rng.randrange(-50, 50)), f"payload-{i}".encode()) for i in range(2000)]
+
+    with caplog.at_level("INFO"):
+        result = list(external_sort(records, memory_budget_bytes=4096))
+
+    assert result == sorted(records, key=lambda record: record[0])
+    assert "sorted runs spilled to disk" in caplog.text
+
+
+def test_external_sort_in_memory_when_under_budget():
+    records = [(b"b", b"2"), (b"a", b"1"), (b"b", b"3")]
+    assert list(external_sort(records, memory_budget_bytes=1 << 20)) == [(b"a", b"1"), (b"b", b"2"), (b"b", b"3")]
+
+
+def test_int_sort_key_orders_negative_numbers():
+    values = [5, -3, 0, -(2**40), 2**40]
+    assert sorted(values, key=int_sort_key) == sorted(values)
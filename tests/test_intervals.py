@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import csv
+
+import numpy as np
+import pytest
+
+from intervals import build_sources, load_intervals, sweep, write_interval_outputs
+
+
+def test_sweep_union_exclusive_and_overlap():
+    summary = sweep(
+        {
+            "youtube": (np.array([0.0]), np.array([10.0])),
+            # Two overlapping calls count once for the source.
+            "calls": (np.array([5.0, 6.0]), np.array([15.0, 8.0])),
+        }
+    )
+
+    totals = summary.totals()
+    assert totals["Union"] == pytest.approx(15.0)
+    assert totals["youtube"] == pytest.approx(10.0)
+    assert totals["youtube_exclusive"] == pytest.approx(5.0)
+    assert totals["calls"] == pytest.approx(10.0)
+    assert totals["calls_overlap"] == pytest.approx(5.0)
+
+
+def test_sweep_matches_brute_force():
+    rng = np.random.default_rng(3)
+    intervals = {}
+    for key in ("a", "b", "c"):
+        starts = rng.integers(0, 2000, size=300).astype(float)
+        intervals[key] = (starts, starts + rng.integers(1, 30, size=300))
+
+    grid = np.zeros((3, 2100), dtype=bool)
+    for row, (starts, ends) in enumerate(intervals.values()):
+        for start, end in zip(starts.astype(int), ends.astype(int)):
+            grid[row, start:end] = True
+
+    summary = sweep(intervals)
+    starts, values = summary.windows(5)
+    union = grid.any(axis=0)
+    expected = np.add.reduceat(union, np.arange(int(starts[0]), int(starts[-1]) + 5, 5))
+    assert np.allclose(values["Union"], expected)
+    assert summary.totals()["b_exclusive"] == pytest.approx((grid[1] & ~grid[0] & ~grid[2]).sum())
+
+
+def test_write_interval_outputs(tmp_path):
+    chat = tmp_path / "chat.csv"
+    chat.write_text("DayOfYear,MinuteOfDay,Duration\n1,1438,4\n", encoding="utf-8")
+    youtube = tmp_path / "youtube.csv"
+    youtube.write_text("DayOfYear,MinuteOfDay,Duration\n2,0,120\n", encoding="utf-8")
+    # Each source defaults to the unit its exporter writes: minutes for chat, seconds for YouTube.
+    sources = build_sources({"sources": [{"key": "chat", "csv": str(chat)}, {"key": "youtube", "csv": str(youtube)}]})
+
+    summary = sweep({source.key: load_intervals(source) for source in sources})
+    assert write_interval_outputs(summary, tmp_path / "bins.csv", tmp_path / "days.csv") == (2, 2)
+
+    with (tmp_path / "days.csv").open() as handle:
+        days = list(csv.DictReader(handle))
+    assert [(row["DayOfYear"], row["Union"], row["youtube_overlap"]) for row in days] == [
+        ("1", "2.0", "0.0"),
+        ("2", "2.0", "2.0"),
+    ]
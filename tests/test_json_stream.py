@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from json_stream import iter_message_spans, iter_messages, object_member
+
+
+def test_iter_message_spans_finds_nested_messages_list():
+    messages = [{"content": "a ] } \" [", "nested": {"list": [1, {"x": "}"}]}}, {"content": "b"}]
+    document = json.dumps({"participants": [{"name": "x"}], "title": "t", "messages": messages}, indent=2).encode()
+
+    spans = list(iter_message_spans(document))
+
+    assert [json.loads(document[start:end]) for start, end in spans] == messages
+
+
+def test_iter_messages_reads_top_level_list(tmp_path: Path):
+    path = tmp_path / "chat.json"
+    path.write_text(json.dumps([{"content": "é"}, 1, "two"], ensure_ascii=False), encoding="utf-8")
+
+    assert [message for _, message in iter_messages(path)] == [{"content": "é"}, 1, "two"]
+    with pytest.raises(ValueError):
+        list(iter_message_spans(b'"not a list"'))
+
+
+def test_object_member_finds_top_level_keys_only():
+    document = b'{"nested": {"timestamp": 1}, "content": "a, } \\" \\"timestamp\\": 2", "timestamp": 1700000000, "n": [3]}'
+
+    start, end = object_member(document, 0, len(document), "timestamp")
+
+    assert json.loads(document[start:end]) == 1700000000
+    assert object_member(document, 0, len(document), "timestamp_ms") is None
+    assert object_member(b"[1]", 0, 3, "timestamp") is None
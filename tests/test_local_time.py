@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from local_time import LocalTimeConverter, build_converter
+
+
+def test_converter_matches_zoneinfo_across_dst():
+    converter = LocalTimeConverter("Europe/Berlin", date(2024, 1, 1), date(2025, 1, 1))
+    zone = ZoneInfo("Europe/Berlin")
+    start = int(datetime(2024, 3, 30, tzinfo=timezone.utc).timestamp())
+    epochs = list(range(start, start + 3 * 86400, 600)) + [int(datetime(2024, 10, 27, 0, 59, 59, tzinfo=timezone.utc).timestamp())]
+
+    expected = [datetime.fromtimestamp(epoch, tz=zone).replace(tzinfo=None) for epoch in epochs]
+    assert converter.localize_many(epochs) == expected
+    assert [converter.localize(epoch) for epoch in epochs] == expected
+
+
+def test_local_epochs_vectorises_the_offset_lookup():
+    converter = LocalTimeConverter("Australia/Sydney", date(2024, 1, 1), date(2024, 2, 1))
+    zone = ZoneInfo("Australia/Sydney")
+    start = int(datetime(2022, 1, 1, tzinfo=timezone.utc).timestamp())
+    epochs = list(range(start, start + 3 * 365 * 86400, 7 * 3600 + 17))
+
+    local = converter.local_epochs(iter(epochs))
+
+    expected = [datetime.fromtimestamp(epoch, tz=zone).replace(tzinfo=None) for epoch in epochs]
+    assert [datetime(1970, 1, 1) + timedelta(seconds=value) for value in local.tolist()] == expected
+    assert converter.local_epochs([]).size == 0
+
+
+def test_converter_extends_outside_window_and_treats_naive_as_utc():
+    converter = build_converter("America/New_York", "2024-01-01", "2024-02-01")
+    assert converter.to_local(datetime(2020, 7, 1, 12, 0)) == datetime(2020, 7, 1, 8, 0)
+    assert converter.to_local(datetime(2024, 1, 15, 12, 0, tzinfo=timezone.utc)) == datetime(2024, 1, 15, 7, 0)
+    assert build_converter(None) is None
+
+
+def test_unknown_timezone_raises():
+    with pytest.raises(ValueError):
+        LocalTimeConverter("Mars/Olympus_Mons")
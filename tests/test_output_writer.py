@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import gzip
+import lzma
+from pathlib import Path
+
+import pytest
+
+from output_writer import CsvOutputWriter, read_csv_rows
+
+
+@pytest.mark.parametrize("suffix, opener", [(".csv", open), (".csv.gz", gzip.open), (".csv.xz", lzma.open)])
+def test_writer_round_trip_with_compression(tmp_path: Path, suffix, opener):
+    output = tmp_path / "nested" / f"events{suffix}"
+    with CsvOutputWriter(output, ["DayOfYear", "MinuteOfDay", "Duration"], buffer_rows=2) as writer:
+        writer.writerows({"DayOfYear": day, "MinuteOfDay": 60, "Duration": 0.5} for day in range(1, 6))
+
+    assert writer.rows_written == 5
+    with opener(output, "rb") as handle:
+        assert handle.read().startswith(b"DayOfYear,MinuteOfDay,Duration\r\n1,60,0.5\r\n")
+    rows = list(read_csv_rows(output))
+    assert [row["DayOfYear"] for row in rows] == ["1", "2", "3", "4", "5"]
+    assert list(output.parent.iterdir()) == [output]
+
+
+def test_writer_failure_keeps_previous_output(tmp_path: Path):
+    output = tmp_path / "events.csv"
+    output.write_text("previous", encoding="utf-8")
+
+    with pytest.raises(RuntimeError):
+        with CsvOutputWriter(output, ["DayOfYear"], buffer_rows=1) as writer:
+            writer.writerow({"DayOfYear": 1})
+            raise RuntimeError("boom")
+
+    assert output.read_text(encoding="utf-8") == "previous"
+    assert list(tmp_path.iterdir()) == [output]
@@ -9,6 +9,7 @@ from parse_chats import (
     ChatProcessingSummary,
     calculate_reading_time,
     calculate_writing_time,
+    collect_chat_shard,
     process_chat_data,
 )
 
@@ -81,3 +82,132 @@ def test_process_chat_data_round_trip(tmp_path: Path):
     with calls_csv.open() as handle:
         call_rows = list(csv.DictReader(handle))
     assert call_rows[0]["CallDuration"] == "2.0"
+
+
+def test_process_chat_data_external_sort_matches_in_memory(tmp_path: Path):
+    messages = []
+    for minute in range(59, -1, -1):
+        messages.append(
+            {
+                "sender_name": "Friend" if minute % 3 else "Me",
+                "receiver_name": "Me" if minute % 3 else "Friend",
+                "timestamp": f"2024-01-01T09:{minute:02d}:00",
+                "content": "x" * minute,
+            }
+        )
+    chat_file = tmp_path / "chat.json"
+    chat_file.write_text(__import__("json").dumps(messages), encoding="utf-8")
+
+    outputs = {}
+    for label, budget in (("memory", None), ("external", 512)):
+        output_csv = tmp_path / label / "chat.csv"
+        process_chat_data(
+            chat_file_path=chat_file,
+            output_csv=output_csv,
+            calls_csv=tmp_path / label / "calls.csv",
+            your_name="Me",
+            reading_speed_cpm=100,
+            typing_speed_cpm=50,
+            memory_budget_bytes=budget,
+        )
+        outputs[label] = output_csv.read_text(encoding="utf-8")
+
+    assert outputs["external"] == outputs["memory"]
+    assert outputs["memory"].count("\n") > 10
+
+
+def test_process_chat_data_per_contact_splits(tmp_path: Path):
+    messages = []
+    for minute, friend in enumerate(["Alice", "Bob", "Cara"]):
+        messages += [
+            {"sender_name": friend, "receiver_name": "Me", "timestamp": f"2024-01-01T09:{minute:02d}:00", "content": "Hi"},
+            {"sender_name": "Me", "receiver_name": friend, "timestamp": f"2024-01-01T09:{minute:02d}:30", "content": "Hey"},
+        ]
+    messages.append(
+        {"sender_name": "Bob", "receiver_name": "Me", "timestamp": "2024-01-01T10:00:00", "call_duration": 60}
+    )
+    chat_file = tmp_path / "chat.json"
+    chat_file.write_text(__import__("json").dumps(messages), encoding="utf-8")
+    output_csv = tmp_path / "out" / "chat_data.csv"
+    calls_csv = tmp_path / "out" / "calls_data.csv"
+
+    summary = process_chat_data(
+        chat_file_path=chat_file,
+        output_csv=output_csv,
+        calls_csv=calls_csv,
+        your_name="Me",
+        reading_speed_cpm=100,
+        typing_speed_cpm=50,
+        per_contact=True,
+        contact_groups={"close": ["Alice", "Bob"], "other": ["*"]},
+    )
+
+    assert summary.events_logged == 3
+    assert summary.contacts == 3
+
+    def read(path):
+        with path.open() as handle:
+            return list(csv.DictReader(handle))
+
+    participants = {row["Name"]: row for row in read(tmp_path / "out" / "participants.csv")}
+    assert participants["Bob"]["Calls"] == "1"
+    assert [row["ContactId"] for row in read(output_csv)] == [participants[name]["ContactId"] for name in ("Alice", "Bob", "Cara")]
+    assert len(read(tmp_path / "out" / "chat_data_close.csv")) == 2
+    assert len(read(tmp_path / "out" / "chat_data_other.csv")) == 1
+    assert len(read(tmp_path / "out" / "calls_data_close.csv")) == 1
+    assert read(tmp_path / "out" / "calls_data_other.csv") == []
+
+
+def test_process_chat_data_streams_rows_without_collecting_them(tmp_path: Path, monkeypatch):
+    messages = []
+    for minute in range(120):
+        friend = f"Friend{minute % 4}"
+        mine = minute % 3 == 0
+        messages.append(
+            {
+                "sender_name": "Me" if mine else friend,
+                "receiver_name": friend if mine else "Me",
+                "timestamp": f"2024-01-01T{9 + minute // 60:02d}:{minute % 60:02d}:00",
+                "content": "x" * (minute % 7 + 1),
+            }
+        )
+    messages.append({"sender_name": "Friend2", "receiver_name": "Me", "timestamp": "2024-01-01T12:00:00", "call_duration": 90})
+    chat_file = tmp_path / "chat.json"
+    chat_file.write_text(__import__("json").dumps(messages), encoding="utf-8")
+
+    def collected(*args):
+        raise AssertionError("events and calls must be streamed, not kept in the shard")
+
+    monkeypatch.setattr("parse_chats.ChatShard.event", collected)
+    monkeypatch.setattr("parse_chats.ChatShard.call", collected)
+    outputs = {}
+    for label, budget in (("memory", None), ("external", 512)):
+        process_chat_data(
+            chat_file_path=chat_file,
+            output_csv=tmp_path / label / "chat.csv",
+            calls_csv=tmp_path / label / "calls.csv",
+            your_name="Me",
+            reading_speed_cpm=100,
+            typing_speed_cpm=50,
+            memory_budget_bytes=budget,
+            coalesce_gap_minutes=2,
+            per_contact=True,
+        )
+        outputs[label] = {path.name: path.read_bytes() for path in sorted((tmp_path / label).iterdir())}
+
+    assert outputs["external"] == outputs["memory"]
+    assert len(outputs["memory"]) == 2 + 2 * 4 + 1
+
+
+def test_collect_chat_shard_localizes_timestamps_in_batches(monkeypatch):
+    monkeypatch.setattr("parse_chats.LOCALIZE_BATCH", 2)
+    messages = [
+        {"sender_name": "Me", "receiver_name": "Friend", "timestamp": timestamp, "content": "hi"}
+        for timestamp in ("2024-03-31T00:30:00", "bad", "2024-03-31T01:30:00+00:00", "2024-12-31T23:30:00")
+    ]
+
+    shard = collect_chat_shard(messages, "Me", 60, "Europe/Berlin", start_date="2024-01-01", end_date="2025-01-01")
+
+    # Berlin switches to summer time at 01:00 UTC on 31 March.
+    assert shard.total_messages == 4
+    assert [event[:2] for event in shard.events] == [(91, 90), (91, 210), (1, 30)]
@@ -43,3 +43,50 @@ def test_export_reels_watch_time_filters_dates(tmp_path: Path):
         rows = list(csv.DictReader(handle))
     assert len(rows) == 1
     assert rows[0]["Duration"] == "1.0"
+
+
+def test_export_reels_watch_time_uses_local_timezone(tmp_path: Path):
+    payload = {"likes_media_likes": [{"string_list_data": [{"timestamp": 1704067200}]}]}  # 2024-01-01T00:00:00Z
+    input_file = tmp_path / "ig.json"
+    input_file.write_text(json.dumps(payload), encoding="utf-8")
+
+    output_csv = tmp_path / "ig.csv"
+    events = export_reels_watch_time(
+        input_file=input_file,
+        output_csv=output_csv,
+        default_video_duration_seconds=60,
+        start_date="2023-12-31",
+        end_date="2025-01-01",
+        timezone_name="America/Los_Angeles",
+    )
+
+    assert events == 1
+    with output_csv.open() as handle:
+        rows = list(csv.DictReader(handle))
+    assert rows[0]["DayOfYear"] == "1"  # 2023-12-31 locally
+    assert rows[0]["MinuteOfDay"] == str(16 * 60)
+
+
+def test_export_reels_watch_time_groups_sessions(tmp_path: Path):
+    base = 1704067200  # 2024-01-01T00:00:00Z
+    timestamps = [base, base + 30, base + 75, base + 3600]
+    payload = {"likes_media_likes": [{"string_list_data": [{"timestamp": ts}]} for ts in timestamps]}
+    input_file = tmp_path / "ig.json"
+    input_file.write_text(json.dumps(payload), encoding="utf-8")
+
+    output_csv = tmp_path / "ig.csv"
+    events = export_reels_watch_time(
+        input_file=input_file,
+        output_csv=output_csv,
+        default_video_duration_seconds=30,
+        start_date="2024-01-01",
+        end_date="2025-01-01",
+    )
+
+    assert events == 2
+    with output_csv.open() as handle:
+        rows = list(csv.DictReader(handle))
+    assert [(row["MinuteOfDay"], row["Duration"]) for row in rows] == [("0", "1.5"), ("60", "0.5")]
+    assert (
+        export_reels_watch_time(input_file, output_csv, 30, "2024-01-01", "2025-01-01", session_grouping=False) == 4
+    )
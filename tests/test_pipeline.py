@@ -5,7 +5,7 @@ from pathlib import Path
 
 import pytest
 
-from pipeline import ensure_output_folder, file_exists, load_config
+from pipeline import ensure_output_folder, load_config
 
 
 def test_load_config_reads_json(tmp_path: Path):
@@ -20,13 +20,6 @@ def test_load_config_raises_for_missing(tmp_path: Path):
         load_config(tmp_path / "missing.json")
 
 
-def test_file_exists(tmp_path: Path):
-    file_path = tmp_path / "file.txt"
-    file_path.write_text("hello", encoding="utf-8")
-    assert file_exists(file_path)
-    assert not file_exists(tmp_path / "missing.txt")
-
-
 def test_ensure_output_folder(tmp_path: Path):
     path = ensure_output_folder(tmp_path / "out")
     assert path.exists()
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+from preview import run_preview, sample_inbox, sample_records
+
+
+def test_sample_records_keeps_whole_days():
+    records = [{"day": day, "n": n} for day in range(10) for n in range(3)]
+
+    by_day = sample_records(records, 5, day_key=lambda record: record["day"])
+    assert sorted({record["day"] for record in by_day}) == [0, 5]
+    assert len(by_day) == 6
+    assert sample_records(records, 10) == [records[0], records[10], records[20]]
+
+
+def test_sample_inbox_copies_every_nth_file(tmp_path: Path):
+    inbox = tmp_path / "inbox"
+    for index in range(7):
+        conversation = inbox / f"chat_{index}"
+        conversation.mkdir(parents=True)
+        (conversation / "message_1.json").write_text("[]", encoding="utf-8")
+
+    assert sample_inbox(inbox, tmp_path / "sample", 3) == 3
+    assert sorted(path.parent.name for path in (tmp_path / "sample").rglob("*.json")) == ["chat_0", "chat_3", "chat_6"]
+
+
+def test_run_preview_scales_sampled_totals(tmp_path: Path, capsys):
+    base = 1704067200  # 2024-01-01T00:00:00Z
+    likes = [{"string_list_data": [{"timestamp": base + day * 86400 + 9 * 3600}]} for day in range(20)]
+    likes_file = tmp_path / "likes.json"
+    likes_file.write_text(json.dumps({"likes_media_likes": likes}), encoding="utf-8")
+    config = {
+        "global": {"output_folder": str(tmp_path / "out"), "start_date": "2024-01-01", "end_date": "2025-01-01"},
+        "export_reels_watch_time": {
+            "input_file": str(likes_file),
+            "output_csv": "reels.csv",
+            "default_video_duration_seconds": 60,
+        },
+    }
+
+    assert run_preview(config, every=4) == 0
+
+    output = capsys.readouterr().out
+    reels_line = next(line for line in output.splitlines() if line.startswith("reels"))
+    assert reels_line.split()[1:3] == ["20", "20.0"]
+    grid = [line.split("|")[1] for line in output.splitlines() if line.strip().split("|")[0].strip().isdigit()]
+    assert len(grid) == 5
+    for row in grid:
+        assert len(row) == 288
+        # One minute of activity in the 09:00 bin.
+        assert row[108] != " " and row.replace(row[108], " ", 1).strip() == ""
+    assert not (tmp_path / "out").exists()
+
+
+def test_run_preview_uses_checkpointed_youtube_durations_only(tmp_path: Path, capsys, monkeypatch):
+    monkeypatch.delenv("FAKE_YT_KEY", raising=False)
+    history = tmp_path / "history.json"
+    history.write_text(
+        json.dumps(
+            [
+                {"time": f"2024-01-{day:02d}T10:00:00Z", "titleUrl": f"https://www.youtube.com/watch?v=v{day}"}
+                for day in range(1, 21)
+            ]
+        ),
+        encoding="utf-8",
+    )
+    out = tmp_path / "out"
+    config = {
+        "global": {"output_folder": str(out), "start_date": "2024-01-01", "end_date": "2025-01-01"},
+        "youtube_watch_time": {
+            "input_file": str(history),
+            "output_csv": "yt.csv",
+            "playback_speed": 1.0,
+            "api_key_env": "FAKE_YT_KEY",
+        },
+    }
+
+    # Without a checkpoint YouTube is skipped rather than looked up.
+    assert run_preview(config, every=2) == 0
+    assert "youtube" not in capsys.readouterr().out
+
+    out.mkdir()
+    ids = [f"v{day}" for day in range(1, 21)]
+    checkpoint = {"ids": ids, "durations": {video_id: 600.0 for video_id in ids}}
+    (out / "yt_durations.jsonl").write_text(json.dumps(checkpoint) + "\n", encoding="utf-8")
+    assert run_preview(config, every=2) == 0
+    youtube_line = next(line for line in capsys.readouterr().out.splitlines() if line.startswith("youtube"))
+    assert youtube_line.split()[1:3] == ["20", "200.0"]
+    assert sorted(path.name for path in out.iterdir()) == ["yt_durations.jsonl"]
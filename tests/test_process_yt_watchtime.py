@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import csv
+import json
+from pathlib import Path
+
+import pytest
+
+from process_yt_watchtime import DurationCheckpoint, process_yt_watchtime
+
+
+class FlakyFetcher:
+    """Offline stand-in for the YouTube API that fails after ``fail_after`` batches."""
+
+    def __init__(self, fail_after=None):
+        self.fail_after = fail_after
+        self.batches = []
+
+    def __call__(self, video_ids, api_key):
+        if self.fail_after is not None and len(self.batches) >= self.fail_after:
+            raise RuntimeError("quotaExceeded")
+        self.batches.append(list(video_ids))
+        return {video_id: 60.0 for video_id in video_ids if video_id != "gone"}
+
+
+def _write_history(path: Path, video_ids) -> None:
+    path.write_text(
+        json.dumps(
+            [
+                {"time": f"2024-01-01T10:{index % 60:02d}:00Z", "titleUrl": f"https://www.youtube.com/watch?v={vid}"}
+                for index, vid in enumerate(video_ids)
+            ]
+        ),
+        encoding="utf-8",
+    )
+
+
+def _run(tmp_path: Path, fetcher, **options) -> int:
+    return process_yt_watchtime(
+        input_file=tmp_path / "history.json",
+        output_csv=tmp_path / "yt.csv",
+        playback_speed=1.0,
+        api_key_env="FAKE_YT_KEY",
+        start_date="2024-01-01",
+        end_date="2024-02-01",
+        fetcher=fetcher,
+        checkpoint_file=tmp_path / "yt_checkpoint.jsonl",
+        **options,
+    )
+
+
+def test_process_yt_watchtime_resumes_from_checkpoint(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("FAKE_YT_KEY", "secret")
+    video_ids = [f"v{i}" for i in range(119)] + ["gone"]
+    _write_history(tmp_path / "history.json", video_ids)
+
+    with pytest.raises(RuntimeError):
+        _run(tmp_path, FlakyFetcher(fail_after=1))
+    assert not (tmp_path / "yt.csv").exists()
+
+    # The rerun resumes after the checkpointed batch and fails on the third.
+    assert _run(tmp_path, FlakyFetcher(fail_after=1), allow_partial=True) == 100
+    assert (tmp_path / "yt_unresolved.txt").read_text().split() == video_ids[100:]
+
+    # A line cut short by a crash is ignored.
+    with (tmp_path / "yt_checkpoint.jsonl").open("a") as handle:
+        handle.write('{"ids": ["v110"')
+    fetcher = FlakyFetcher()
+    assert _run(tmp_path, fetcher, allow_partial=True) == 119
+    assert fetcher.batches == [video_ids[100:]]
+    assert not (tmp_path / "yt_unresolved.txt").exists()
+    with (tmp_path / "yt.csv").open() as handle:
+        assert len(list(csv.DictReader(handle))) == 119
+
+    # Everything, including the video without a duration, is now known.
+    fetcher = FlakyFetcher()
+    assert _run(tmp_path, fetcher) == 119
+    assert fetcher.batches == []
+    assert DurationCheckpoint(tmp_path / "yt_checkpoint.jsonl").missing(video_ids) == []
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import struct
+from pathlib import Path
+
+from render_heatmaps import RenderJob, RenderSource, load_source_events, rasterize_grid, render_many
+
+
+def _write_csv(path: Path, rows):
+    lines = ["DayOfYear,MinuteOfDay,Duration"] + [",".join(str(value) for value in row) for row in rows]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def test_rasterize_grid_paints_bar_from_start_bin(tmp_path: Path):
+    csv_path = tmp_path / "events.csv"
+    _write_csv(csv_path, [(2, 60, 600)])  # 10 minutes starting at 01:00 on day 2
+    source = RenderSource(key="YouTube", csv_path=str(csv_path), color="#64B5F6")
+    job = RenderJob(sources=(source,), output_png=str(tmp_path / "out.png"), first_day=1, last_day=3, bin_height=1, day_width=1)
+
+    events = load_source_events(source, job.first_day, job.last_day)
+    image = rasterize_grid([events], [source.color], 3, job)
+
+    assert image.shape == (288, 3, 3)
+    painted = [row for row in range(288) if tuple(image[row, 1]) == (0x64, 0xB5, 0xF6)]
+    assert painted == [12, 13]
+    assert tuple(image[13, 0]) == (255, 255, 255)
+
+
+def test_render_many_writes_pngs(tmp_path: Path):
+    csv_path = tmp_path / "events.csv"
+    _write_csv(csv_path, [(1, 0, 300), (5, 720, 1200)])
+    source = RenderSource(key="Reels", csv_path=str(csv_path), color="#81C784")
+    jobs = [
+        RenderJob(sources=(source,), output_png=str(tmp_path / f"{view}.png"), view=view, last_day=10)
+        for view in ("grid", "stacked")
+    ]
+
+    paths = render_many(jobs, max_workers=2)
+
+    assert paths == [job.output_png for job in jobs]
+    for path in paths:
+        data = Path(path).read_bytes()
+        assert data.startswith(b"\x89PNG\r\n\x1a\n")
+        width, height = struct.unpack(">II", data[16:24])
+        assert (width, height) == (10 * 3, 288 * 2)
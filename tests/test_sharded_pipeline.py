@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import sharded_pipeline
+from parse_chats import collect_chat_file_shard
+from pipeline import run_tasks
+from sharded_pipeline import month_shards, run_pipeline_sharded
+
+
+def test_month_shards_split_at_month_starts():
+    assert month_shards("2023-11-15", "2024-02-10") == [
+        ("2023-11-15", "2023-12-01"),
+        ("2023-12-01", "2024-01-01"),
+        ("2024-01-01", "2024-02-01"),
+        ("2024-02-01", "2024-02-10"),
+    ]
+    assert month_shards("2024-01-01", "2024-01-01") == []
+
+
+def _write_inputs(folder: Path, output_folder: Path) -> dict:
+    start = datetime(2024, 1, 30, 23, 50)
+    moments = [start + timedelta(minutes=7 * step, seconds=20 * (step % 3)) for step in range(700)]
+
+    tiktok = folder / "tiktok.json"
+    tiktok.write_text(
+        json.dumps(
+            {
+                "Activity": {
+                    "Like List": {"ItemFavoriteList": [{"Date": m.strftime("%Y-%m-%d %H:%M:%S")} for m in moments]}
+                }
+            }
+        ),
+        encoding="utf-8",
+    )
+    reels = folder / "reels.json"
+    reels.write_text(
+        json.dumps(
+            {
+                "likes_media_likes": [
+                    {"string_list_data": [{"timestamp": int(m.replace(tzinfo=timezone.utc).timestamp())}]}
+                    for m in moments
+                ]
+            }
+        ),
+        encoding="utf-8",
+    )
+
+    messages = []
+    for index, moment in enumerate(moments):
+        friend = f"Friend{index % 3}"
+        mine = index % 5 == 4
+        messages.append(
+            {
+                "sender_name": "Me" if mine else friend,
+                "receiver_name": friend if mine else "Me",
+                "timestamp": moment.isoformat(),
+                "content": "x" * (index % 40 + 1),
+            }
+        )
+    # Unread before the month boundary, answered after it.
+    messages.append({"sender_name": "Late", "receiver_name": "Me", "timestamp": "2024-01-31T23:59:00", "content": "hi" * 50})
+    messages.append({"sender_name": "Me", "receiver_name": "Late", "timestamp": "2024-02-03T08:00:00", "content": "ok"})
+    messages.append({"sender_name": "Late", "receiver_name": "Me", "timestamp": "2024-02-03T09:00:00", "call_duration": 90})
+    chat = folder / "chat.json"
+    chat.write_text(json.dumps({"messages": messages[::-1]}), encoding="utf-8")
+
+    return {
+        "global": {
+            "output_folder": str(output_folder),
+            "start_date": "2024-01-15",
+            "end_date": "2024-03-20",
+            "timezone": "Europe/Berlin",
+            "coalesce_gap_minutes": 10,
+        },
+        "process_chat_data": {
+            "chat_file": str(chat),
+            "output_csv": "chat.csv",
+            "calls_csv": "calls.csv",
+            "your_name": "Me",
+            "reading_speed_cpm": 900,
+            "typing_speed_cpm": 180,
+            "per_contact": True,
+        },
+        "export_tiktok_watch_time": {
+            "input_file": str(tiktok),
+            "output_csv": "tiktok.csv",
+            "default_video_duration_seconds": 30,
+        },
+        "export_reels_watch_time": {
+            "input_file": str(reels),
+            "output_csv": "reels.csv",
+            "default_video_duration_seconds": 20,
+            "group_sessions": True,
+        },
+    }
+
+
+def test_run_pipeline_sharded_matches_unsharded_run(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(sharded_pipeline.os, "cpu_count", lambda: 8)
+    serial_out = tmp_path / "serial"
+    sharded_out = tmp_path / "sharded"
+    config = _write_inputs(tmp_path, serial_out)
+    assert run_tasks(config, serial_out) == 0
+
+    config["global"]["output_folder"] = str(sharded_out)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        assert run_pipeline_sharded(config, sharded_out, executor=executor) == 0
+
+    serial_files = sorted(path.name for path in serial_out.iterdir())
+    assert {"participants.csv", "chat_contact3.csv", "calls_contact3.csv"} <= set(serial_files)
+    assert serial_files == sorted(path.name for path in sharded_out.iterdir())
+    for name in serial_files:
+        assert (sharded_out / name).read_bytes() == (serial_out / name).read_bytes(), name
+
+
+def test_run_pipeline_sharded_splits_memory_budget_between_chat_workers(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(sharded_pipeline.os, "cpu_count", lambda: 4)
+    budgets, windows = [], set()
+
+    def recording_collect(*args, **kwargs):
+        budgets.append(args[4])
+        windows.add((kwargs["start_date"], kwargs["end_date"]))
+        return collect_chat_file_shard(*args, **kwargs)
+
+    monkeypatch.setattr(sharded_pipeline, "collect_chat_file_shard", recording_collect)
+    config = _write_inputs(tmp_path, tmp_path / "out")
+    config["global"]["memory_budget_mb"] = 1
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        assert run_pipeline_sharded(config, tmp_path / "out", executor=executor) == 0
+    assert budgets == [1024 * 1024 // 3] * 3
+    # Every worker builds its timezone table for the configured window up front.
+    assert windows == {(config["global"]["start_date"], config["global"]["end_date"])}
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import tasks
+from tasks import file_exists, task_inputs
+
+
+def test_file_exists(tmp_path: Path):
+    file_path = tmp_path / "file.txt"
+    file_path.write_text("hello", encoding="utf-8")
+    assert file_exists(file_path)
+    assert not file_exists(tmp_path / "missing.txt")
+
+
+def test_run_tasks_only_runs_selected(tmp_path: Path, monkeypatch):
+    calls = []
+    for name in tasks.TASKS:
+        monkeypatch.setitem(tasks.TASKS, name, lambda config, folder, name=name: calls.append(name))
+
+    assert tasks.run_tasks({}, tmp_path, ["export_reels_watch_time", "clean_and_combine_json_files"]) == 0
+    assert calls == ["clean_and_combine_json_files", "export_reels_watch_time"]
+
+
+def test_task_inputs_maps_configured_paths():
+    config = {
+        "global": {},
+        "clean_and_combine_json_files": {"input_folder": "inbox"},
+        "export_reels_watch_time": {"input_file": "likes.json"},
+    }
+    assert task_inputs(config) == {
+        "clean_and_combine_json_files": Path("inbox"),
+        "export_reels_watch_time": Path("likes.json"),
+    }
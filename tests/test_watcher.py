@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from watcher import PathWatcher
+
+
+def test_wait_for_changes_debounces_bursts(tmp_path: Path):
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    single = tmp_path / "likes.json"
+    single.write_text("[]", encoding="utf-8")
+    untouched = tmp_path / "tiktok.json"
+
+    writes = iter(
+        [
+            lambda: (inbox / "message_1.json").write_text("[]", encoding="utf-8"),
+            lambda: single.write_text("[1, 2]", encoding="utf-8"),
+        ]
+    )
+    sleeps = []
+
+    def fake_sleep(seconds: float) -> None:
+        sleeps.append(seconds)
+        action = next(writes, None)
+        if action is not None:
+            action()
+
+    watcher = PathWatcher([inbox, single, untouched], poll_interval=0.5, debounce_seconds=1.0, sleep=fake_sleep)
+    changed = watcher.wait_for_changes()
+
+    assert changed == {inbox, single}
+    assert len(sleeps) == 4  # two polls with changes, then two quiet polls
+    assert watcher.poll() == set()
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import gzip
+import json
+import threading
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from process_yt_watchtime import fetch_video_durations
+from youtube_client import DURATION_FIELDS, YouTubeAPIError, YouTubeClient, close_all
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Answers ``videos.list`` like the YouTube Data API, gzip-encoded when asked."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):  # noqa: N802 - http.server naming
+        parsed = urllib.parse.urlsplit(self.path)
+        query = dict(urllib.parse.parse_qsl(parsed.query))
+        self.server.requests.append((self.client_address, parsed.path, query))
+        if query.get("key") != "secret":
+            status = 403
+            payload = {"error": {"code": 403, "message": "quota", "errors": [{"reason": "quotaExceeded"}]}}
+        else:
+            status = 200
+            durations = {"long": "PT4H"}
+            payload = {
+                "items": [
+                    {"id": vid, "contentDetails": {"duration": durations.get(vid, "PT1M5S")}}
+                    for vid in query["id"].split(",")
+                    if vid != "missing"
+                ]
+            }
+        body = json.dumps(payload).encode()
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            self.send_response(status)
+            self.send_header("Content-Encoding", "gzip")
+        else:
+            self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        # Like a server timing out idle keep-alive connections, without announcing it.
+        self.close_connection = self.server.close_idle
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stand_in():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.requests = []
+    server.close_idle = False
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_video_durations_reuses_one_connection(stand_in):
+    base_url = f"http://127.0.0.1:{stand_in.server_port}/youtube/v3"
+    video_ids = [f"v{i}" for i in range(118)] + ["long", "missing"]
+
+    with YouTubeClient("secret", base_url) as client:
+        durations = client.video_durations(video_ids)
+
+    assert len(durations) == 118 and durations["v0"] == 65.0
+    assert "long" not in durations and "missing" not in durations
+    assert len(stand_in.requests) == 3
+    assert len({address for address, _, _ in stand_in.requests}) == 1
+    for _, path, query in stand_in.requests:
+        assert path == "/youtube/v3/videos"
+        assert query["part"] == "contentDetails" and query["fields"] == DURATION_FIELDS
+
+
+def test_fetch_video_durations_raises_api_errors(stand_in):
+    base_url = f"http://127.0.0.1:{stand_in.server_port}"
+    with pytest.raises(YouTubeAPIError) as excinfo:
+        fetch_video_durations(["v1"], "wrong", base_url=base_url)
+    assert excinfo.value.status == 403
+    assert excinfo.value.reason == "quotaExceeded"
+
+    assert fetch_video_durations(["v1"], "secret", base_url=base_url) == {"v1": 65.0}
+    assert fetch_video_durations([], "secret", base_url=base_url) == {}
+
+
+def test_video_durations_retries_once_on_a_stale_connection(stand_in, monkeypatch):
+    stand_in.close_idle = True
+    base_url = f"http://127.0.0.1:{stand_in.server_port}"
+    attempts = []
+    original_connect = YouTubeClient._connect
+
+    def counting_connect(self):
+        attempts.append(self._connection is not None)
+        return original_connect(self)
+
+    monkeypatch.setattr(YouTubeClient, "_connect", counting_connect)
+    with YouTubeClient("secret", base_url) as client:
+        durations = client.video_durations([f"v{i}" for i in range(120)])
+
+    assert len(durations) == 120
+    # Each later batch first tries the closed connection, then reconnects once.
+    assert attempts == [False, True, False, True, False]
+    assert len(stand_in.requests) == 3
+    assert len({address for address, _, _ in stand_in.requests}) == 3
+
+
+def test_close_all_closes_worker_thread_clients(stand_in):
+    base_url = f"http://127.0.0.1:{stand_in.server_port}"
+    close_all()
+    barrier = threading.Barrier(2)
+
+    def lookup(video_id):
+        # Keep both workers busy so each thread creates its own client.
+        barrier.wait()
+        return fetch_video_durations([video_id], "secret", base_url=base_url)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        assert list(pool.map(lookup, ["a", "b"])) == [{"a": 65.0}, {"b": 65.0}]
+
+    assert close_all() == 2
+    assert close_all() == 0
+    # A closed client is replaced on the next lookup.
+    assert fetch_video_durations(["c"], "secret", base_url=base_url) == {"c": 65.0}
+    assert close_all() == 1